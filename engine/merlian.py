@@ -9,10 +9,14 @@ This is intentionally minimal and not production-ready.
 
 from __future__ import annotations
 
+import hashlib
+import io
 import json
 import os
+import shutil
 import sqlite3
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import cached_property
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Iterable, List, Optional, Tuple
@@ -28,19 +32,35 @@ from tqdm import tqdm
 import sys
 import subprocess
 import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 console = Console()
 
 SUPPORTED_EXTS = {".png", ".jpg", ".jpeg", ".webp"}
 
+# Embedding store tiers (see EmbeddingStore).
+STORE_TIERS = ("float32", "float16", "int8", "pq")
+# How many coarse candidates a compressed tier re-ranks against exact float32 rows.
+STORE_RERANK = 512
+# Rows per block when scanning compressed codes (bounds the float32 scratch buffer).
+SCAN_BLOCK = 65536
+# Filtered float32 scans gather the passing rows up to this fraction of the store;
+# above it, one full scan sliced afterwards is cheaper than the gather.
+FILTER_GATHER_MAX = 0.25
+
 
 @dataclass
 class DbPaths:
     root: Path
     db: Path
     embeddings: Path
+    codes: Path
     meta: Path
+    thumbs: Path
 
 
 def _legacy_app_dir() -> Path:
@@ -60,7 +80,6 @@ def app_dir() -> Path:
     if old.is_dir() and any(old.iterdir()):
         # Only migrate if new dir is empty (first run after upgrade).
         if not any(d.iterdir()):
-            import shutil
             for item in old.iterdir():
                 shutil.move(str(item), str(d / item.name))
 
@@ -73,7 +92,9 @@ def get_dbpaths() -> DbPaths:
         root=root,
         db=root / "merlian.sqlite",
         embeddings=root / "embeddings.npy",
+        codes=root / "embeddings.codes.npz",
         meta=root / "meta.json",
+        thumbs=root / "thumbs",
     )
 
 
@@ -110,17 +131,320 @@ def ensure_schema(conn: sqlite3.Connection) -> None:
     _add("quality_score", "quality_score REAL")
     _add("dup_group", "dup_group TEXT")
     _add("ocr_text", "ocr_text TEXT")
-
-    # OCR full-text index (SQLite FTS5).
-    # We keep this separate and simple to avoid trigger complexity.
+    # Near-duplicate group: asset id of the group's representative (NULL = no duplicates).
+    _add("group_id", "group_id INTEGER")
+    # Perceptual hash as a signed 64-bit integer (kind recorded in meta.json "hash").
+    _add("hash64", "hash64 INTEGER")
+    conn.execute("CREATE INDEX IF NOT EXISTS assets_group ON assets(group_id)")
+
+    # OCR full-text index (SQLite FTS5), external-content over assets.ocr_text and
+    # keyed by assets.id, so the text is stored once and kept in sync by triggers.
+    # Only assets with OCR text get an FTS row (keeps bm25 corpus stats unchanged).
+    _migrate_ocr_fts(conn)
     conn.execute(
         """
         CREATE VIRTUAL TABLE IF NOT EXISTS ocr_fts
-        USING fts5(path UNINDEXED, ocr_text);
+        USING fts5(ocr_text, content='assets', content_rowid='id');
+        """
+    )
+    conn.executescript(
+        """
+        CREATE TRIGGER IF NOT EXISTS assets_ocr_fts_ai AFTER INSERT ON assets
+        WHEN coalesce(new.ocr_text, '') != '' BEGIN
+            INSERT INTO ocr_fts(rowid, ocr_text) VALUES (new.id, new.ocr_text);
+        END;
+        CREATE TRIGGER IF NOT EXISTS assets_ocr_fts_ad AFTER DELETE ON assets
+        WHEN coalesce(old.ocr_text, '') != '' BEGIN
+            INSERT INTO ocr_fts(ocr_fts, rowid, ocr_text) VALUES ('delete', old.id, old.ocr_text);
+        END;
+        CREATE TRIGGER IF NOT EXISTS assets_ocr_fts_au AFTER UPDATE OF ocr_text ON assets BEGIN
+            INSERT INTO ocr_fts(ocr_fts, rowid, ocr_text)
+                SELECT 'delete', old.id, old.ocr_text WHERE coalesce(old.ocr_text, '') != '';
+            INSERT INTO ocr_fts(rowid, ocr_text)
+                SELECT new.id, new.ocr_text WHERE coalesce(new.ocr_text, '') != '';
+        END;
+        """
+    )
+
+    # Trigram index over the same OCR text, for substring, digit and typo-tolerant
+    # matches the word index misses (e.g. "403" inside "e403", "err0r").
+    _ensure_ocr_trigram(conn)
+
+    # OCR lines with normalized boxes (x, y, w, h in 0..1, top-left origin) and a
+    # line-level FTS index for evidence snippets / highlight regions.
+    _ensure_ocr_lines(conn)
+
+    # Lens labels (Errors, Receipts, ...) assigned at index time; see classify_lenses().
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS asset_lenses (
+            asset_id INTEGER NOT NULL,
+            lens TEXT NOT NULL,
+            score REAL NOT NULL,       -- zero-shot probability from the image embedding
+            ocr INTEGER NOT NULL,      -- 1 if the OCR text matches the lens pattern
+            PRIMARY KEY (asset_id, lens)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS asset_lenses_lens ON asset_lenses(lens, ocr, score);
+        CREATE TRIGGER IF NOT EXISTS assets_lenses_ad AFTER DELETE ON assets BEGIN
+            DELETE FROM asset_lenses WHERE asset_id = old.id;
+        END;
+        """
+    )
+
+    # Related images: each searchable asset's nearest neighbors; see update_knn().
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS asset_knn (
+            asset_id INTEGER PRIMARY KEY,
+            ids BLOB NOT NULL,         -- neighbor asset ids, int32 little-endian, best first
+            scores BLOB NOT NULL       -- cosine similarities, float16 little-endian
+        );
+        CREATE TRIGGER IF NOT EXISTS assets_knn_ad AFTER DELETE ON assets BEGIN
+            DELETE FROM asset_knn WHERE asset_id = old.id;
+        END;
         """
     )
 
+    # Standing (saved) queries and the new images that matched them; see match_standing_queries().
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS standing_queries (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            query TEXT,                -- text query or example path (for display)
+            fts TEXT,                  -- OCR match expression (all terms), or NULL
+            kinds TEXT,                -- comma-separated assets.kind filter, or NULL
+            min_score REAL,            -- cosine threshold for vec
+            vec BLOB,                  -- unit query vector, float32 little-endian, or NULL
+            created_at TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS standing_matches (
+            query_id INTEGER NOT NULL,
+            asset_id INTEGER NOT NULL,
+            score REAL,
+            matched_at TEXT NOT NULL,
+            seen INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (query_id, asset_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS standing_matches_recent ON standing_matches(query_id, seen, matched_at);
+        CREATE TRIGGER IF NOT EXISTS assets_standing_ad AFTER DELETE ON assets BEGIN
+            DELETE FROM standing_matches WHERE asset_id = old.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS standing_queries_ad AFTER DELETE ON standing_queries BEGIN
+            DELETE FROM standing_matches WHERE query_id = old.id;
+        END;
+        """
+    )
+
+    # Library statistics (counts per kind / month / lens / root ...), kept current by triggers.
+    conn.execute("CREATE INDEX IF NOT EXISTS assets_indexed_at ON assets(indexed_at)")
+    _ensure_library_stats(conn)
+
+    conn.commit()
+
+
+def _ensure_library_stats(conn: sqlite3.Connection) -> None:
+    """Create `library_stats` and its triggers; fill it from the tables once.
+
+    Rows are (dim, key, n): ("all", "assets"), ("kind", k), ("month", "YYYY-MM" of mtime),
+    ("ocr", "with_text"), ("lens", name), ("pattern", name) follow the assets /
+    asset_lenses triggers; ("root", folder) and ("index", ...) are written by the indexer.
+    """
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='library_stats'"
+    ).fetchone()
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS library_stats (
+            dim TEXT NOT NULL,
+            key TEXT NOT NULL,
+            n INTEGER NOT NULL,
+            PRIMARY KEY (dim, key)
+        ) WITHOUT ROWID;
+        CREATE TRIGGER IF NOT EXISTS assets_stats_ai AFTER INSERT ON assets BEGIN
+            INSERT INTO library_stats(dim, key, n) VALUES
+                ('all', 'assets', 1),
+                ('kind', coalesce(new.kind, 'unknown'), 1),
+                ('month', strftime('%Y-%m', new.mtime, 'unixepoch'), 1),
+                ('ocr', 'with_text', coalesce(new.ocr_text, '') != '')
+            ON CONFLICT(dim, key) DO UPDATE SET n = n + excluded.n;
+        END;
+        CREATE TRIGGER IF NOT EXISTS assets_stats_ad AFTER DELETE ON assets BEGIN
+            INSERT INTO library_stats(dim, key, n) VALUES
+                ('all', 'assets', -1),
+                ('kind', coalesce(old.kind, 'unknown'), -1),
+                ('month', strftime('%Y-%m', old.mtime, 'unixepoch'), -1),
+                ('ocr', 'with_text', -(coalesce(old.ocr_text, '') != ''))
+            ON CONFLICT(dim, key) DO UPDATE SET n = n + excluded.n;
+        END;
+        CREATE TRIGGER IF NOT EXISTS assets_stats_au AFTER UPDATE OF kind, mtime, ocr_text ON assets BEGIN
+            INSERT INTO library_stats(dim, key, n) VALUES
+                ('kind', coalesce(old.kind, 'unknown'), -1),
+                ('kind', coalesce(new.kind, 'unknown'), 1),
+                ('month', strftime('%Y-%m', old.mtime, 'unixepoch'), -1),
+                ('month', strftime('%Y-%m', new.mtime, 'unixepoch'), 1),
+                ('ocr', 'with_text', (coalesce(new.ocr_text, '') != '') - (coalesce(old.ocr_text, '') != ''))
+            ON CONFLICT(dim, key) DO UPDATE SET n = n + excluded.n;
+        END;
+        CREATE TRIGGER IF NOT EXISTS asset_lenses_stats_ai AFTER INSERT ON asset_lenses BEGIN
+            INSERT INTO library_stats(dim, key, n) VALUES ('lens', new.lens, 1), ('pattern', new.lens, new.ocr)
+            ON CONFLICT(dim, key) DO UPDATE SET n = n + excluded.n;
+        END;
+        CREATE TRIGGER IF NOT EXISTS asset_lenses_stats_ad AFTER DELETE ON asset_lenses BEGIN
+            INSERT INTO library_stats(dim, key, n) VALUES ('lens', old.lens, -1), ('pattern', old.lens, -old.ocr)
+            ON CONFLICT(dim, key) DO UPDATE SET n = n + excluded.n;
+        END;
+        """
+    )
+    if row is None:
+        conn.executescript(
+            """
+            INSERT INTO library_stats(dim, key, n)
+                SELECT 'all', 'assets', count(*) FROM assets;
+            INSERT INTO library_stats(dim, key, n)
+                SELECT 'kind', coalesce(kind, 'unknown'), count(*) FROM assets GROUP BY 2;
+            INSERT INTO library_stats(dim, key, n)
+                SELECT 'month', strftime('%Y-%m', mtime, 'unixepoch'), count(*) FROM assets GROUP BY 2;
+            INSERT INTO library_stats(dim, key, n)
+                SELECT 'ocr', 'with_text', count(*) FROM assets WHERE coalesce(ocr_text, '') != '';
+            INSERT INTO library_stats(dim, key, n)
+                SELECT 'lens', lens, count(*) FROM asset_lenses GROUP BY lens;
+            INSERT INTO library_stats(dim, key, n)
+                SELECT 'pattern', lens, sum(ocr) FROM asset_lenses GROUP BY lens;
+            """
+        )
+
+
+def library_stats(conn: sqlite3.Connection) -> dict[str, dict[str, int]]:
+    """{dim: {key: count}} from `library_stats` (zero counts dropped)."""
+    out: dict[str, dict[str, int]] = {}
+    for dim, key, n in conn.execute("SELECT dim, key, n FROM library_stats WHERE n != 0"):
+        out.setdefault(dim, {})[key] = int(n)
+    return out
+
+
+def update_index_stats(conn: sqlite3.Connection, roots: List[str], n_embs: int, n_reps: int) -> None:
+    """Indexer-owned stats: images per root folder and embedding / searchable row counts."""
+    conn.execute("DELETE FROM library_stats WHERE dim IN ('root', 'index')")
+    rows = [("index", "embeddings", n_embs), ("index", "searchable", n_reps)]
+    for r in roots:
+        # Range over the path index: every path under r sorts between "r/" and "r0".
+        prefix = r.rstrip(os.sep) + os.sep
+        n = conn.execute(
+            "SELECT count(*) FROM assets WHERE path >= ? AND path < ?",
+            (prefix, prefix[:-1] + chr(ord(os.sep) + 1)),
+        ).fetchone()[0]
+        rows.append(("root", r, int(n)))
+    conn.executemany("INSERT OR REPLACE INTO library_stats(dim, key, n) VALUES (?, ?, ?)", rows)
+    conn.commit()
+
+
+def _ensure_ocr_lines(conn: sqlite3.Connection) -> None:
+    """Create `ocr_lines` + `ocr_lines_fts`; backfill box-less lines from assets.ocr_text once."""
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='ocr_lines'"
+    ).fetchone()
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS ocr_lines (
+            id INTEGER PRIMARY KEY,
+            asset_id INTEGER NOT NULL,
+            line_no INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            x REAL, y REAL, w REAL, h REAL   -- NULL for lines backfilled without boxes
+        );
+        CREATE INDEX IF NOT EXISTS ocr_lines_asset ON ocr_lines(asset_id, line_no);
+        CREATE VIRTUAL TABLE IF NOT EXISTS ocr_lines_fts
+        USING fts5(text, content='ocr_lines', content_rowid='id');
+        CREATE TRIGGER IF NOT EXISTS ocr_lines_fts_ai AFTER INSERT ON ocr_lines BEGIN
+            INSERT INTO ocr_lines_fts(rowid, text) VALUES (new.id, new.text);
+        END;
+        CREATE TRIGGER IF NOT EXISTS ocr_lines_fts_ad AFTER DELETE ON ocr_lines BEGIN
+            INSERT INTO ocr_lines_fts(ocr_lines_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        END;
+        CREATE TRIGGER IF NOT EXISTS assets_ocr_lines_ad AFTER DELETE ON assets BEGIN
+            DELETE FROM ocr_lines WHERE asset_id = old.id;
+        END;
+        """
+    )
+    if row is None:
+        for aid, txt in conn.execute(
+            "SELECT id, ocr_text FROM assets WHERE ocr_text != ''"
+        ).fetchall():
+            save_ocr_lines(conn, aid, [(t, None) for t in txt.splitlines()])
+
+
+def save_ocr_lines(
+    conn: sqlite3.Connection, asset_id: int, lines: List[Tuple[str, Optional[Tuple[float, float, float, float]]]]
+) -> None:
+    """Replace the OCR lines of one asset (blank lines are dropped)."""
+    kept = [(t.strip(), box) for t, box in lines if t.strip()]
+    conn.execute("DELETE FROM ocr_lines WHERE asset_id=?", (asset_id,))
+    conn.executemany(
+        "INSERT INTO ocr_lines(asset_id, line_no, text, x, y, w, h) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(asset_id, n, t, *(box or (None, None, None, None))) for n, (t, box) in enumerate(kept)],
+    )
+
+
+def _ensure_ocr_trigram(conn: sqlite3.Connection) -> None:
+    """Create (and fill once) the external-content trigram FTS table `ocr_trgm`.
+
+    Needs SQLite >= 3.34; without the trigram tokenizer searches fall back to LIKE.
+    """
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='ocr_trgm'"
+    ).fetchone()
+    if row is None:
+        try:
+            conn.execute(
+                "CREATE VIRTUAL TABLE ocr_trgm "
+                "USING fts5(ocr_text, content='assets', content_rowid='id', tokenize='trigram')"
+            )
+        except sqlite3.OperationalError:
+            return
+        conn.execute(
+            "INSERT INTO ocr_trgm(rowid, ocr_text) SELECT id, ocr_text FROM assets WHERE ocr_text != ''"
+        )
+    conn.executescript(
+        """
+        CREATE TRIGGER IF NOT EXISTS assets_ocr_trgm_ai AFTER INSERT ON assets
+        WHEN coalesce(new.ocr_text, '') != '' BEGIN
+            INSERT INTO ocr_trgm(rowid, ocr_text) VALUES (new.id, new.ocr_text);
+        END;
+        CREATE TRIGGER IF NOT EXISTS assets_ocr_trgm_ad AFTER DELETE ON assets
+        WHEN coalesce(old.ocr_text, '') != '' BEGIN
+            INSERT INTO ocr_trgm(ocr_trgm, rowid, ocr_text) VALUES ('delete', old.id, old.ocr_text);
+        END;
+        CREATE TRIGGER IF NOT EXISTS assets_ocr_trgm_au AFTER UPDATE OF ocr_text ON assets BEGIN
+            INSERT INTO ocr_trgm(ocr_trgm, rowid, ocr_text)
+                SELECT 'delete', old.id, old.ocr_text WHERE coalesce(old.ocr_text, '') != '';
+            INSERT INTO ocr_trgm(rowid, ocr_text)
+                SELECT new.id, new.ocr_text WHERE coalesce(new.ocr_text, '') != '';
+        END;
+        """
+    )
+
+
+def _migrate_ocr_fts(conn: sqlite3.Connection) -> None:
+    """Replace the pre-v0.3 standalone `ocr_fts(path UNINDEXED, ocr_text)` table.
+
+    The external-content table is filled from assets once; VACUUM then returns the
+    space the duplicated OCR text used.
+    """
+    row = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type='table' AND name='ocr_fts'"
+    ).fetchone()
+    if row is None or "content=" in (row[0] or ""):
+        return
+    conn.execute("DROP TABLE ocr_fts")
+    conn.execute(
+        "CREATE VIRTUAL TABLE ocr_fts USING fts5(ocr_text, content='assets', content_rowid='id')"
+    )
+    conn.execute(
+        "INSERT INTO ocr_fts(rowid, ocr_text) SELECT id, ocr_text FROM assets WHERE ocr_text != ''"
+    )
     conn.commit()
+    conn.execute("VACUUM")
 
 
 def iter_images(folder: Path) -> Iterable[Path]:
@@ -145,12 +469,15 @@ def load_model(device: str = "cpu"):
 
 
 def image_embedding(
-    model, preprocess, device: str, image_path: Path
+    model, preprocess, device: str, image_path: Path | Image.Image
 ) -> Optional[np.ndarray]:
-    try:
-        img = Image.open(image_path).convert("RGB")
-    except Exception:
-        return None
+    if isinstance(image_path, Image.Image):
+        img = image_path
+    else:
+        try:
+            img = Image.open(image_path).convert("RGB")
+        except Exception:
+            return None
 
     with torch.no_grad():
         image = preprocess(img).unsqueeze(0).to(device)
@@ -165,6 +492,16 @@ def ocr_text_apple_vision(image_path: Path) -> str:
 
     Returns empty string if OCR is unavailable or fails.
     """
+    return "\n".join(t for t, _ in ocr_lines_apple_vision(image_path)).strip()
+
+
+def ocr_lines_apple_vision(
+    image_path: Path,
+) -> List[Tuple[str, Tuple[float, float, float, float]]]:
+    """OCR lines with normalized boxes (x, y, w, h; top-left origin) via Apple Vision.
+
+    Returns an empty list if OCR is unavailable or fails.
+    """
 
     try:
         from Foundation import NSURL
@@ -177,12 +514,12 @@ def ocr_text_apple_vision(image_path: Path) -> str:
         url = NSURL.fileURLWithPath_(str(image_path))
         src = CGImageSourceCreateWithURL(url, None)
         if src is None:
-            return ""
+            return []
         cg_img = CGImageSourceCreateImageAtIndex(src, 0, None)
         if cg_img is None:
-            return ""
+            return []
 
-        out: list[str] = []
+        out: list[Tuple[str, Tuple[float, float, float, float]]] = []
 
         def handler(request, error):
             if error is not None:
@@ -190,7 +527,12 @@ def ocr_text_apple_vision(image_path: Path) -> str:
             for obs in request.results() or []:
                 top = obs.topCandidates_(1)
                 if top and len(top) > 0:
-                    out.append(str(top[0].string()))
+                    # Vision boxes are normalized with a bottom-left origin.
+                    bb = obs.boundingBox()
+                    x, y = float(bb.origin.x), float(bb.origin.y)
+                    w, h = float(bb.size.width), float(bb.size.height)
+                    box = (round(x, 4), round(1.0 - y - h, 4), round(w, 4), round(h, 4))
+                    out.append((str(top[0].string()), box))
 
         req = VNRecognizeTextRequest.alloc().initWithCompletionHandler_(handler)
         # Practical defaults for screenshots.
@@ -202,13 +544,83 @@ def ocr_text_apple_vision(image_path: Path) -> str:
         )
         ok = img_handler.performRequests_error_([req], None)
         if not ok:
-            return ""
+            return []
 
-        text = "\n".join(out)
-        return text.strip()
+        return out
 
     except Exception:
-        return ""
+        return []
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form for cache keys (the CLIP tokenizer lowercases and collapses whitespace too)."""
+    return " ".join(query.lower().split())
+
+
+def index_generation(meta: dict) -> str:
+    """Cache tag for one version of the index: its creation epoch plus the generation counter.
+
+    The epoch is random per index, so the tag never repeats after `reset` and a re-index.
+    """
+    return f"{meta.get('epoch', '')}:{int(meta.get('generation', 0))}"
+
+
+class LRUCache:
+    """Small thread-safe LRU map with hit/miss counters; entries expire after `ttl` seconds if set."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.data: "OrderedDict[object, object]" = OrderedDict()
+        self.expires: dict = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key in self.data and self.ttl is not None and self.expires[key] < time.monotonic():
+                del self.data[key]
+                del self.expires[key]
+            if key in self.data:
+                self.data.move_to_end(key)
+                self.hits += 1
+                return self.data[key]
+            self.misses += 1
+            return default
+
+    def peek(self, key, default=None):
+        """Like get(), but without touching recency or the hit/miss counters."""
+        with self.lock:
+            if key not in self.data or (self.ttl is not None and self.expires[key] < time.monotonic()):
+                return default
+            return self.data[key]
+
+    def put(self, key, value) -> None:
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            if self.ttl is not None:
+                self.expires[key] = time.monotonic() + self.ttl
+            while len(self.data) > self.maxsize:
+                old, _ = self.data.popitem(last=False)
+                self.expires.pop(old, None)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.data.clear()
+            self.expires.clear()
+
+    def stats(self) -> dict:
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self.data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else None,
+            }
 
 
 def text_embedding(model, tokenizer, device: str, query: str) -> np.ndarray:
@@ -219,6 +631,15 @@ def text_embedding(model, tokenizer, device: str, query: str) -> np.ndarray:
         return feats.detach().cpu().numpy().astype("float32")[0]
 
 
+def text_embeddings(model, tokenizer, device: str, queries: List[str]) -> np.ndarray:
+    """Batched text_embedding: one forward pass for all `queries` (rows align with input)."""
+    with torch.no_grad():
+        text = tokenizer(list(queries)).to(device)
+        feats = model.encode_text(text)
+        feats = feats / feats.norm(dim=-1, keepdim=True)
+        return feats.detach().cpu().numpy().astype("float32")
+
+
 def get_file_stats(path: Path) -> Tuple[float, int]:
     st = path.stat()
     return st.st_mtime, st.st_size
@@ -238,6 +659,216 @@ def load_embeddings(emb_path: Path) -> Optional[np.ndarray]:
     return np.load(emb_path)
 
 
+def save_npy_atomic(path: Path, arr: np.ndarray) -> None:
+    """Write an .npy file via rename so readers holding a memmap never see a torn file."""
+    tmp = path.with_name(path.name + ".tmp.npy")
+    np.save(tmp, arr)
+    os.replace(tmp, path)
+
+
+def _pq_layout(dim: int) -> Tuple[int, int]:
+    """(subspaces, dims per subspace) for product quantization; prefers 8-dim subvectors."""
+    for dsub in (8, 4, 2, 1):
+        if dim % dsub == 0:
+            return dim // dsub, dsub
+    return dim, 1
+
+
+def _kmeans(x: np.ndarray, k: int, iters: int = 8, seed: int = 0) -> np.ndarray:
+    """Plain Lloyd k-means (float32). Small and dependency-free; used to train PQ codebooks."""
+    rng = np.random.default_rng(seed)
+    k = min(k, x.shape[0])
+    cent = x[rng.choice(x.shape[0], size=k, replace=False)].copy()
+    for _ in range(iters):
+        d = (x * x).sum(1, keepdims=True) - 2.0 * (x @ cent.T) + (cent * cent).sum(1)
+        assign = d.argmin(1)
+        sums = np.zeros_like(cent)
+        np.add.at(sums, assign, x)
+        counts = np.bincount(assign, minlength=k).astype(np.float32)
+        empty = counts == 0
+        cent = np.where(empty[:, None], cent, sums / np.maximum(counts, 1.0)[:, None])
+    return cent.astype(np.float32)
+
+
+def encode_store(embs: np.ndarray, tier: str) -> dict[str, np.ndarray]:
+    """Compress a float32 embedding matrix into the arrays for `tier`.
+
+    - float16: half-precision copy
+    - int8: symmetric per-row scalar quantization (codes + one float scale per row)
+    - pq: product quantization, 256 centroids per subspace (one byte per subvector)
+    """
+    embs = np.asarray(embs, dtype=np.float32)
+    if tier == "float16":
+        return {"codes": embs.astype(np.float16)}
+    if tier == "int8":
+        scale = np.abs(embs).max(axis=1) / 127.0
+        scale[scale == 0] = 1.0
+        codes = np.rint(embs / scale[:, None]).clip(-127, 127).astype(np.int8)
+        return {"codes": codes, "scale": scale.astype(np.float32)}
+    if tier == "pq":
+        n, dim = embs.shape
+        m, dsub = _pq_layout(dim)
+        sub = embs.reshape(n, m, dsub)
+        rng = np.random.default_rng(0)
+        sample = sub[rng.choice(n, size=min(n, 20000), replace=False)]
+        k = min(256, n)
+        codebooks = np.zeros((m, k, dsub), dtype=np.float32)
+        codes = np.zeros((n, m), dtype=np.uint8)
+        for j in range(m):
+            codebooks[j] = _kmeans(sample[:, j, :], k, seed=j)
+            for s in range(0, n, SCAN_BLOCK):
+                blk = sub[s : s + SCAN_BLOCK, j, :]
+                d = -2.0 * (blk @ codebooks[j].T) + (codebooks[j] ** 2).sum(1)
+                codes[s : s + SCAN_BLOCK, j] = d.argmin(1)
+        return {"codes": codes, "codebooks": codebooks}
+    raise ValueError(f"unknown store tier: {tier}")
+
+
+def save_store_codes(paths: DbPaths, embs: np.ndarray, tier: str) -> None:
+    """(Re)build the compressed codes next to embeddings.npy. float32 needs none."""
+    if tier == "float32":
+        paths.codes.unlink(missing_ok=True)
+        return
+    arrays = encode_store(embs, tier)
+    tmp = paths.codes.with_name(paths.codes.name + ".tmp.npz")
+    np.savez(tmp, tier=np.array(tier), **arrays)
+    os.replace(tmp, paths.codes)
+
+
+class EmbeddingStore:
+    """Scan-side view of the embedding matrix.
+
+    embeddings.npy (float32) stays the source of truth. For the float32 tier it is
+    loaded as-is; compressed tiers keep only their codes resident, memory-map the
+    exact rows, scan the codes and re-rank the best coarse candidates exactly.
+    """
+
+    def __init__(self, tier: str, exact: np.ndarray, arrays: dict[str, np.ndarray] | None = None):
+        self.tier = tier
+        self.exact = exact
+        self.arrays = arrays or {}
+        self.n = int(exact.shape[0])
+        self.dim = int(exact.shape[1]) if exact.ndim == 2 else 0
+        # Scan counters; head() views share their parent's, so stats() covers every scan.
+        self.timing = {"scans": 0, "total_ms": 0.0, "last_ms": 0.0}
+
+    def head(self, r: int) -> "EmbeddingStore":
+        """View of the first `r` rows (no copy); used to scan group representatives only."""
+        if r >= self.n:
+            return self
+        arrays = {k: (a[:r] if k in ("codes", "scale") else a) for k, a in self.arrays.items()}
+        view = EmbeddingStore(self.tier, self.exact[:r], arrays)
+        view.timing = self.timing
+        return view
+
+    @property
+    def resident_bytes(self) -> int:
+        if self.tier == "float32":
+            return int(self.exact.nbytes)
+        return int(sum(a.nbytes for a in self.arrays.values()))
+
+    def _coarse_block(
+        self, s: int, e: int, Q: np.ndarray, luts: np.ndarray | None, rows: np.ndarray | None = None
+    ) -> np.ndarray:
+        """Approximate (len(Q), e - s) scores for rows s:e (of `rows`, if given) from the compressed codes."""
+        sel = slice(s, e) if rows is None else rows[s:e]
+        codes = self.arrays["codes"][sel]
+        if self.tier == "float16":
+            return Q @ codes.astype(np.float32).T
+        if self.tier == "int8":
+            return (Q @ codes.astype(np.float32).T) * self.arrays["scale"][sel]
+        # pq: asymmetric distance via per-subspace lookup tables.
+        sub = np.arange(luts.shape[1])
+        return np.stack([lut[sub, codes].sum(axis=1) for lut in luts])
+
+    def scores(self, q: np.ndarray, rerank: int = STORE_RERANK, rows: np.ndarray | None = None) -> np.ndarray:
+        """Cosine scores for every row, or for `rows` only (exact for the top `rerank` coarse candidates)."""
+        return self.scores_batch(np.asarray(q, dtype=np.float32).reshape(1, -1), rerank=rerank, rows=rows)[0]
+
+    def scores_batch(self, Q: np.ndarray, rerank: int = STORE_RERANK, rows: np.ndarray | None = None) -> np.ndarray:
+        """(len(Q), n) score matrix from one matrix-matrix product over the store.
+
+        With `rows` (sorted indices, e.g. from filter_rows) only those rows are scanned
+        and the matrix is (len(Q), len(rows)).
+        """
+        t0 = time.perf_counter()
+        Q = np.asarray(Q, dtype=np.float32).reshape(-1, self.dim)
+        n = self.n if rows is None else len(rows)
+        if self.tier == "float32":
+            if rows is None:
+                out = Q @ self.exact.T
+            elif n <= FILTER_GATHER_MAX * self.n:
+                out = Q @ self.exact[rows].T
+            else:
+                out = (Q @ self.exact.T)[:, rows]
+            out = out.astype(np.float32, copy=False)
+        else:
+            luts = None
+            if self.tier == "pq":
+                cb = self.arrays["codebooks"]
+                luts = np.einsum("mkd,qmd->qmk", cb, Q.reshape(Q.shape[0], cb.shape[0], cb.shape[2]))
+            out = np.empty((Q.shape[0], n), dtype=np.float32)
+            for s in range(0, n, SCAN_BLOCK):
+                e = min(n, s + SCAN_BLOCK)
+                out[:, s:e] = self._coarse_block(s, e, Q, luts, rows)
+            r = min(n, max(0, rerank))
+            if r:
+                # Re-rank each query's coarse top-r; rows are gathered once for all queries.
+                tops = np.argpartition(-out, r - 1, axis=1)[:, :r]
+                cand = np.unique(tops)  # sorted: sequential reads from the memmap
+                src = cand if rows is None else rows[cand]
+                exact = np.asarray(self.exact[src], dtype=np.float32) @ Q.T
+                pos = np.searchsorted(cand, tops)
+                qi = np.arange(Q.shape[0])[:, None]
+                out[qi, tops] = exact[pos, qi]
+        t = self.timing
+        t["last_ms"] = (time.perf_counter() - t0) * 1000.0
+        t["total_ms"] += t["last_ms"]
+        t["scans"] += 1
+        return out
+
+    def vector(self, i: int) -> np.ndarray:
+        """Exact stored embedding of row `i`."""
+        return np.asarray(self.exact[i], dtype=np.float32)
+
+    def stats(self) -> dict:
+        return {
+            "tier": self.tier,
+            "rows": self.n,
+            "dim": self.dim,
+            "resident_bytes": self.resident_bytes,
+            "float32_bytes": int(self.n * self.dim * 4),
+            "bytes_per_row": (self.resident_bytes / self.n) if self.n else 0.0,
+            "scans": self.timing["scans"],
+            "last_scan_ms": round(self.timing["last_ms"], 3),
+            "avg_scan_ms": round(self.timing["total_ms"] / self.timing["scans"], 3) if self.timing["scans"] else None,
+        }
+
+
+def store_tier(meta: dict) -> str:
+    tier = (meta.get("store") or {}).get("tier", "float32")
+    return tier if tier in STORE_TIERS else "float32"
+
+
+def load_store(paths: DbPaths, meta: dict, mmap: bool = False) -> Optional[EmbeddingStore]:
+    """Open the embedding store using the tier recorded in meta.json.
+
+    Falls back to float32 if the codes file is missing or stale. With `mmap`, float32
+    rows are memory-mapped instead of read (for callers that only need the stats).
+    """
+    if not paths.embeddings.exists():
+        return None
+    tier = store_tier(meta)
+    if tier != "float32" and paths.codes.exists():
+        exact = np.load(paths.embeddings, mmap_mode="r")
+        with np.load(paths.codes) as z:
+            arrays = {k: z[k] for k in z.files if k != "tier"}
+            codes_tier = str(z["tier"]) if "tier" in z.files else ""
+        if codes_tier == tier and arrays.get("codes") is not None and arrays["codes"].shape[0] == exact.shape[0]:
+            return EmbeddingStore(tier, exact, arrays)
+    return EmbeddingStore("float32", np.load(paths.embeddings, mmap_mode="r" if mmap else None))
+
+
 def guess_kind(path: Path, w: int | None, h: int | None) -> str:
     """Best-effort, cheap content-type guess.
 
@@ -287,24 +918,1490 @@ def quality_score(path: Path, w: int | None, h: int | None, size_bytes: int) ->
     return float(0.35 + 0.35 * dim_score + 0.30 * size_score)
 
 
+# ── Thumbnails ────────────────────────────────────────────────────────────────
+
+# Rendered thumbnail sizes (longest side); requests are served the next size up.
+THUMB_SIZES = (160, 320, 640, 1280)
+# Sizes the indexer writes ahead of time: the gallery's /thumbs (320) and thumb_url (640).
+THUMB_PREGEN_SIZES = (320, 640)
+THUMB_QUALITY = 85
+# Thumbnails kept in memory in front of the disk store.
+THUMB_MEMORY_ITEMS = 2048
+# Minimum disk budget for the thumbnail store; least recently used files go first.
+THUMB_DISK_BYTES = 1 << 30
+# Budget per indexed image (both pre-generated sizes plus some on-demand ones), so the
+# default budget grows with the library and index-time thumbnails are not pruned away.
+THUMB_BYTES_PER_IMAGE = 160 << 10
+
+
+def thumb_budget(n_images: int, budget_mb: int | None = None) -> int:
+    """Disk budget for the thumbnail store: `budget_mb` if set, else scaled to the library."""
+    if budget_mb:
+        return int(budget_mb) << 20
+    return max(THUMB_DISK_BYTES, n_images * THUMB_BYTES_PER_IMAGE)
+
+
+def thumb_size(px: int) -> int:
+    return next((s for s in THUMB_SIZES if s >= px), THUMB_SIZES[-1])
+
+
+def thumb_key(path: Path, px: int, st: os.stat_result | None = None) -> str:
+    """Content key of one thumbnail: resolved source path, mtime, size and thumbnail size.
+
+    The path is resolved so the indexer (paths as walked) and the server (resolved
+    request paths) agree under symlinked folders.
+    """
+    st = st or path.stat()
+    return hashlib.sha1(f"{path.resolve()}\0{st.st_mtime_ns}\0{st.st_size}\0{px}".encode()).hexdigest()
+
+
+def render_thumb(src: Path | Image.Image, px: int) -> bytes:
+    """JPEG thumbnail (longest side <= px) of a file or an already decoded image.
+
+    Files are decoded downscaled where the codec allows it (JPEG draft mode decodes at
+    1/2..1/8 scale), then reduced by integer box steps before the final resample.
+    """
+    if isinstance(src, Image.Image):
+        img = src if src.mode == "RGB" else src.convert("RGB")
+        img = img.copy()
+    else:
+        with Image.open(src) as im:
+            im.draft("RGB", (px, px))
+            img = im.convert("RGB")
+    img.thumbnail((px, px), reducing_gap=2.0)
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=THUMB_QUALITY)
+    return buf.getvalue()
+
+
+def render_thumbs(img: Image.Image, sizes: Iterable[int] = THUMB_SIZES) -> dict[int, bytes]:
+    """JPEG thumbnails of one decoded image at each size; each size is reduced from the next larger."""
+    out = {}
+    for px in sorted(sizes, reverse=True):
+        img = img.copy()
+        img.thumbnail((px, px), reducing_gap=2.0)
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=THUMB_QUALITY)
+        out[px] = buf.getvalue()
+    return out
+
+
+class ThumbCache:
+    """Thumbnails keyed by thumb_key(): an in-memory LRU over a content-keyed disk store."""
+
+    def __init__(self, root: Path, mem_items: int = THUMB_MEMORY_ITEMS):
+        self.root = root
+        self.mem = LRUCache(maxsize=mem_items)
+
+    def file(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.jpg"
+
+    def get(self, key: str) -> Optional[bytes]:
+        data = self.mem.get(key)
+        if data is not None:
+            return data
+        f = self.file(key)
+        try:
+            data = f.read_bytes()
+            os.utime(f)  # recency for prune()
+        except OSError:
+            return None
+        self.mem.put(key, data)
+        return data
+
+    def put(self, key: str, data: bytes, remember: bool = True) -> None:
+        f = self.file(key)
+        f.parent.mkdir(parents=True, exist_ok=True)
+        tmp = f.with_name(f"{f.name}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, f)
+        if remember:
+            self.mem.put(key, data)
+
+    def put_all(self, path: Path, img: Image.Image, st: os.stat_result | None = None) -> int:
+        """Store the pre-generated sizes of `path` from its decoded image; returns thumbnails written."""
+        st = st or path.stat()
+        keys = {px: thumb_key(path, px, st) for px in THUMB_PREGEN_SIZES}
+        missing = [px for px, k in keys.items() if not self.file(k).exists()]
+        if not missing:
+            return 0
+        for px, data in render_thumbs(img, missing).items():
+            self.put(keys[px], data, remember=False)
+        return len(missing)
+
+    def get_or_render(self, path: Path, px: int, key: str | None = None) -> bytes:
+        key = key or thumb_key(path, px)
+        data = self.get(key)
+        if data is None:
+            data = render_thumb(path, px)
+            self.put(key, data)
+        return data
+
+    def prune(self, max_bytes: int = THUMB_DISK_BYTES) -> int:
+        """Delete the least recently used files until the store fits `max_bytes`; returns files removed."""
+        if not self.root.is_dir():
+            return 0
+        files = []
+        for d in os.scandir(self.root):
+            if d.is_dir():
+                for e in os.scandir(d.path):
+                    st = e.stat()
+                    files.append((st.st_mtime, st.st_size, e.path))
+        total = sum(sz for _, sz, _ in files)
+        removed = 0
+        for _, sz, p in sorted(files):
+            if total <= max_bytes:
+                break
+            try:
+                os.unlink(p)
+            except OSError:
+                continue
+            total -= sz
+            removed += 1
+        return removed
+
+
+# ── Perceptual hashes ─────────────────────────────────────────────────────────
+
+# ahash: pixels vs mean; dhash: horizontal gradients; phash: low DCT frequencies vs median.
+HASH_KINDS = ["ahash", "dhash", "phash"]
+_HASH_SIZE = {"ahash": (8, 8), "dhash": (9, 8), "phash": (32, 32)}
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    m = np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    m[0] /= np.sqrt(2.0)
+    return m.astype(np.float32)
+
+
+_DCT32 = _dct_matrix(32)
+
+
+def hash_pixels(path: Path | Image.Image, kind: str = "ahash") -> Optional[np.ndarray]:
+    """Grayscale thumbnail a hash of `kind` is computed from a file or a decoded image (None if unreadable)."""
+    if isinstance(path, Image.Image):
+        return np.asarray(path.convert("L").resize(_HASH_SIZE[kind]), dtype=np.float32)
+    try:
+        with Image.open(path) as img:
+            return np.asarray(img.convert("L").resize(_HASH_SIZE[kind]), dtype=np.float32)
+    except Exception:
+        return None
+
+
+def hash_batch(pixels: np.ndarray, kind: str = "ahash") -> np.ndarray:
+    """uint64 hashes for a (N, h, w) stack of hash_pixels() arrays, in one vectorized pass.
+
+    Bits are packed row-major, first pixel in the most significant bit.
+    """
+    px = np.asarray(pixels, dtype=np.float32)
+    if kind == "ahash":
+        bits = px.reshape(len(px), -1) > px.reshape(len(px), -1).mean(axis=1, keepdims=True)
+    elif kind == "dhash":
+        bits = (px[:, :, 1:] > px[:, :, :-1]).reshape(len(px), -1)
+    else:
+        low = (_DCT32 @ px @ _DCT32.T)[:, :8, :8].reshape(len(px), -1)
+        bits = low > np.median(low[:, 1:], axis=1, keepdims=True)
+    return np.packbits(bits, axis=1).view(">u8").astype(np.uint64).reshape(-1)
+
+
+def perceptual_hash(path: Path | Image.Image, kind: str = "ahash") -> Optional[int]:
+    px = hash_pixels(path, kind)
+    return None if px is None else int(hash_batch(px[None], kind)[0])
+
+
+def hash_label(h: Optional[int], kind: str = "ahash") -> str:
+    """Text form kept in assets.dup_group (hash fallback for older rows, UI)."""
+    return "" if h is None else f"{kind[0]}{h:016x}"
+
+
+def to_sql_int(h: Optional[int]) -> Optional[int]:
+    """uint64 -> SQLite's signed 64-bit INTEGER (same bits)."""
+    return None if h is None else (h - (1 << 64) if h >= (1 << 63) else h)
+
+
 def ahash64(path: Path) -> str:
     """Cheap perceptual hash for near-duplicate grouping.
 
     Not cryptographic; not stable across large transforms. Good enough to collapse
     common “same screenshot twice” patterns.
     """
+    return hash_label(perceptual_hash(path, "ahash"), "ahash")
+
+
+def popcount64(x: np.ndarray) -> np.ndarray:
+    x = np.asarray(x, dtype=np.uint64)
+    if hasattr(np, "bitwise_count"):  # numpy >= 2.0
+        return np.bitwise_count(x)
+    return np.unpackbits(x.reshape(-1, 1).view(np.uint8), axis=1).sum(axis=1).reshape(x.shape)
+
+
+class HammingIndex:
+    """All 64-bit hashes within Hamming distance d, via multi-index hashing.
+
+    Hashes are split into d + 1 chunks; two hashes within d bits agree exactly on at
+    least one chunk, so each chunk's sorted values give the candidates (verified with
+    popcount). Built for `max_dist`; queries may use any d <= max_dist.
+    """
+
+    # Every row is compared with the WINDOW rows after it in chunk order; runs of equal
+    # chunk values up to MAX_RUN long are then checked all-pairs in blocks. Longer
+    # (degenerate) runs keep only the window comparisons, which bounds their cost.
+    WINDOW = 64
+    MAX_RUN = 8192
+    # Hash comparisons per block of the all-pairs check.
+    BLOCK_ELEMS = 1 << 18
+
+    def __init__(self, hashes: np.ndarray, max_dist: int = 3):
+        self.hashes = np.asarray(hashes, dtype=np.uint64)
+        self.max_dist = int(max_dist)
+        m = self.max_dist + 1
+        self.chunks: list[tuple[np.uint64, np.uint64, np.ndarray, np.ndarray]] = []
+        shift = 0
+        for c in range(m):
+            width = 64 // m + (1 if c < 64 % m else 0)
+            mask = np.uint64((1 << width) - 1)
+            vals = (self.hashes >> np.uint64(shift)) & mask
+            order = np.lexsort((self.hashes, vals))
+            self.chunks.append((np.uint64(shift), mask, vals[order], order))
+            shift += width
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def query(self, h: int, d: Optional[int] = None) -> np.ndarray:
+        """Sorted indices of the hashes within `d` bits of `h`."""
+        d = self.max_dist if d is None else min(int(d), self.max_dist)
+        h = np.uint64(h)
+        cands = []
+        for shift, mask, svals, order in self.chunks:
+            v = (h >> shift) & mask
+            lo, hi = np.searchsorted(svals, v, "left"), np.searchsorted(svals, v, "right")
+            cands.append(order[lo:hi])
+        c = np.unique(np.concatenate(cands)) if cands else np.zeros(0, dtype=int)
+        return c[popcount64(self.hashes[c] ^ h) <= d]
+
+    def pairs(self, d: Optional[int] = None) -> np.ndarray:
+        """(P, 2) array of index pairs i < j whose hashes are within `d` bits."""
+        d = self.max_dist if d is None else min(int(d), self.max_dist)
+        found = []
+        for _, _, svals, order in self.chunks:
+            # Compare each row with the rows k places after it while they share the chunk.
+            for k in range(1, min(len(svals), self.WINDOW + 1)):
+                same = np.flatnonzero(svals[:-k] == svals[k:])
+                if not len(same):
+                    break
+                i, j = order[same], order[same + k]
+                ok = popcount64(self.hashes[i] ^ self.hashes[j]) <= d
+                found.append(np.stack([np.minimum(i, j)[ok], np.maximum(i, j)[ok]], axis=1))
+            # Runs longer than the window: the remaining pairs (offset > WINDOW), in blocks.
+            starts = np.flatnonzero(np.r_[True, svals[1:] != svals[:-1]])
+            ends = np.r_[starts[1:], len(svals)]
+            for s, e in zip(starts.tolist(), ends.tolist()):
+                if e - s <= self.WINDOW + 1 or e - s > self.MAX_RUN:
+                    continue
+                rows = order[s:e]
+                h = self.hashes[rows]
+                step = max(1, self.BLOCK_ELEMS // len(rows))
+                for b in range(0, len(rows) - self.WINDOW - 1, step):
+                    blk = h[b : b + step]
+                    far = h[b + self.WINDOW + 1 :]
+                    ii, jj = np.nonzero(popcount64(blk[:, None] ^ far[None, :]) <= d)
+                    jj = jj + self.WINDOW + 1  # offset from row b
+                    keep = jj > ii + self.WINDOW
+                    i, j = rows[b + ii[keep]], rows[b + jj[keep]]
+                    found.append(np.stack([np.minimum(i, j), np.maximum(i, j)], axis=1))
+        if not found:
+            return np.zeros((0, 2), dtype=np.int64)
+        return np.unique(np.concatenate(found).astype(np.int64), axis=0)
+
+
+def asset_hashes(conn: sqlite3.Connection) -> Tuple[List[int], List[str], np.ndarray, np.ndarray]:
+    """(asset ids, paths, uint64 hashes, has-hash mask) for every asset.
+
+    Uses assets.hash64, falling back to the hex label in dup_group for older rows.
+    """
+    ids: List[int] = []
+    paths: List[str] = []
+    vals: List[int] = []
+    has: List[bool] = []
+    for aid, p, hv, dg in conn.execute("SELECT id, path, hash64, COALESCE(dup_group,'') FROM assets"):
+        ids.append(aid)
+        paths.append(p)
+        if hv is None and len(dg) == 17:
+            try:
+                hv = to_sql_int(int(dg[1:], 16))
+            except ValueError:
+                hv = None
+        vals.append(0 if hv is None else int(hv))
+        has.append(hv is not None)
+    return ids, paths, np.array(vals, dtype=np.int64).view(np.uint64), np.array(has, dtype=bool)
+
+
+def rehash_assets(conn: sqlite3.Connection, paths: List[str], kind: str, batch: int = 256) -> None:
+    """Recompute hash64/dup_group of `paths` with hash `kind` (images decoded in threads)."""
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        for s in range(0, len(paths), batch):
+            chunk = paths[s : s + batch]
+            px = list(executor.map(lambda p: hash_pixels(Path(p), kind), chunk))
+            ok = [i for i, a in enumerate(px) if a is not None]
+            hv: dict[str, int] = {}
+            if ok:
+                hv = dict(zip((chunk[i] for i in ok), hash_batch(np.stack([px[i] for i in ok]), kind).tolist()))
+            conn.executemany(
+                "UPDATE assets SET hash64=?, dup_group=? WHERE path=?",
+                [(to_sql_int(hv.get(p)), hash_label(hv.get(p), kind), p) for p in chunk],
+            )
+    conn.commit()
+
+
+def union_find_groups(n: int, pairs: Iterable[Tuple[int, int]]) -> List[List[int]]:
+    """Connected components (size >= 2) over `pairs`, largest first."""
+    parent = list(range(n))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in pairs:
+        ri, rj = find(int(i)), find(int(j))
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+    groups: dict[int, List[int]] = {}
+    for i in range(n):
+        groups.setdefault(find(i), []).append(i)
+    return sorted((g for g in groups.values() if len(g) > 1), key=len, reverse=True)
+
+
+# ── Near-duplicate groups (computed at index time) ────────────────────────────
+
+# Perceptual hashes within this many bits are near-duplicate candidates.
+DUP_HAMMING = 3
+# Embedding cosine at or above this is a near-duplicate candidate.
+DUP_COSINE = 0.97
+# Candidates are only merged if their OCR words agree this much (keeps distinct texts apart).
+DUP_OCR_JACCARD = 0.8
+
+
+def compute_dup_groups(
+    conn: sqlite3.Connection, paths_list: List[str], embs: np.ndarray, changed: set[str]
+) -> Tuple[List[int], int]:
+    """Group near-duplicates and pick one representative per group.
+
+    Candidates are perceptual-hash neighbors (HammingIndex, <= DUP_HAMMING bits) and, for rows
+    indexed in this run, embedding neighbors (cosine >= DUP_COSINE) against the whole
+    library; a candidate pair is merged only if the OCR texts agree. Groups of rows
+    that did not change are kept. The representative is the best quality (then most
+    recent) member. Writes assets.group_id and returns (row order with representatives
+    first, number of representatives).
+    """
+    n = len(paths_list)
+    row_of = {p: i for i, p in enumerate(paths_list)}
+    ids = np.full(n, -1, dtype=np.int64)
+    hashes = np.zeros(n, dtype=np.uint64)
+    has_hash = np.zeros(n, dtype=bool)
+    quality = np.zeros(n, dtype=np.float32)
+    mtime = np.zeros(n, dtype=np.float64)
+    old_group: dict[int, int] = {}
+    cur_gid: dict[int, int] = {}
+    a_ids, a_paths, a_hashes, a_has = asset_hashes(conn)
+    for p, hv, ok in zip(a_paths, a_hashes, a_has):
+        i = row_of.get(p)
+        if i is not None and ok:
+            hashes[i], has_hash[i] = hv, True
+    for aid, p, qs, mt, gid in conn.execute(
+        "SELECT id, path, COALESCE(quality_score,0.5), mtime, group_id FROM assets"
+    ):
+        i = row_of.get(p)
+        if i is None:
+            continue
+        ids[i], quality[i], mtime[i] = aid, qs, mt
+        if gid is not None:
+            cur_gid[i] = int(gid)
+            if p not in changed:
+                old_group[i] = int(gid)
+
+    parent = list(range(n))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i: int, j: int) -> None:
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+
+    words: dict[int, set[str]] = {}
+
+    def ocr_words(i: int) -> set[str]:
+        if i not in words:
+            row = conn.execute("SELECT COALESCE(ocr_text,'') FROM assets WHERE id=?", (int(ids[i]),)).fetchone()
+            words[i] = set(re.findall(r"[a-z0-9]+", (row[0] if row else "").lower()))
+        return words[i]
+
+    def compatible(i: int, j: int) -> bool:
+        a, b = ocr_words(i), ocr_words(j)
+        if not a and not b:
+            return True
+        return len(a & b) / max(1, len(a | b)) >= DUP_OCR_JACCARD
+
+    # Keep existing groups of unchanged rows.
+    by_gid: dict[int, int] = {}
+    for i, gid in old_group.items():
+        if gid in by_gid:
+            union(by_gid[gid], i)
+        else:
+            by_gid[gid] = i
+
+    # Perceptual-hash neighbors (identical hashes first, then near ones between hash values).
+    hrows = np.flatnonzero(has_hash)
+    uniq, inv = np.unique(hashes[hrows], return_inverse=True)
+    leaders: dict[int, List[int]] = {}
+    for r, u in zip(hrows.tolist(), inv.tolist()):
+        ls = leaders.setdefault(u, [])
+        for lead in ls:
+            if compatible(lead, r):
+                union(lead, r)
+                break
+        else:
+            ls.append(r)
+    for a, b in HammingIndex(uniq, DUP_HAMMING).pairs().tolist():
+        for i in leaders[a]:
+            for j in leaders[b]:
+                if compatible(i, j):
+                    union(i, j)
+
+    # Embedding neighbors of the rows indexed in this run: each fresh block against all
+    # stale rows and the fresh rows after it (each pair once), on one reordered copy.
+    is_fresh = np.zeros(n, dtype=bool)
+    is_fresh[[row_of[p] for p in changed if p in row_of]] = True
+    cols = np.concatenate([np.flatnonzero(~is_fresh), np.flatnonzero(is_fresh)])
+    n_stale = n - int(is_fresh.sum())
+    er = embs[cols] if n_stale < n else np.empty((0, embs.shape[1]), dtype=embs.dtype)
+    for s in range(n_stale, n, 1024):
+        blk = er[s : s + 1024]
+        spans = [(c, min(n_stale, c + 16384)) for c in range(0, n_stale, 16384)]
+        spans += [(c, min(n, c + 16384)) for c in range(s, n, 16384)]
+        for c0, c1 in spans:
+            sims = blk @ er[c0:c1].T
+            for h in np.flatnonzero(sims >= DUP_COSINE):
+                a, b = divmod(int(h), c1 - c0)
+                i, j = int(cols[s + a]), int(cols[c0 + b])
+                if i != j and find(i) != find(j) and compatible(i, j):
+                    union(i, j)
+
+    groups: dict[int, List[int]] = {}
+    for i in range(n):
+        groups.setdefault(find(i), []).append(i)
+    reps: List[int] = []
+    members: List[int] = []
+    updates: List[Tuple[Optional[int], int]] = []
+    for rows in groups.values():
+        rep = max(rows, key=lambda i: (quality[i], mtime[i]))
+        reps.append(rep)
+        members.extend(i for i in rows if i != rep)
+        gid = int(ids[rep]) if len(rows) > 1 else None
+        updates.extend((gid, int(ids[i])) for i in rows if ids[i] >= 0 and cur_gid.get(i) != gid)
+    conn.executemany("UPDATE assets SET group_id=? WHERE id=?", updates)
+    conn.commit()
+    reps.sort()
+    members.sort()
+    return reps + members, len(reps)
+
+
+def search_row_count(meta: dict, n: int) -> int:
+    """Rows a search scans: the group representatives stored first (all rows for old indexes)."""
+    return min(n, int(meta.get("n_reps", n)))
+
+
+def search_rows(conn: sqlite3.Connection, rep_paths: List[str]) -> dict[str, int]:
+    """path -> scanned row; group members map to their representative's row."""
+    index = {p: i for i, p in enumerate(rep_paths)}
+    for p, rp in conn.execute(
+        "SELECT a.path, r.path FROM assets a JOIN assets r ON r.id = a.group_id WHERE a.id != r.id"
+    ):
+        i = index.get(rp)
+        if i is not None:
+            index[p] = i
+    return index
+
+
+def example_row(paths_list: List[str], path_index: dict[str, int], n_search: int, path: str) -> Optional[int]:
+    """Store row of an indexed image's own embedding (group members sit after the representatives)."""
+    i = path_index.get(path)
+    if i is None:
+        return None
+    if paths_list[i] == path:
+        return i
     try:
-        with Image.open(path) as img:
-            im = img.convert("L").resize((8, 8))
-            arr = np.asarray(im, dtype=np.float32)
-            avg = float(arr.mean())
-            bits = (arr > avg).astype(np.uint8).reshape(-1)
-            val = 0
-            for b in bits:
-                val = (val << 1) | int(b)
-            return f"a{val:016x}"
-    except Exception:
-        return ""
+        return paths_list.index(path, n_search)
+    except ValueError:
+        return None
+
+
+def similarity_scores(
+    store: EmbeddingStore,
+    example: np.ndarray,
+    text: np.ndarray | None = None,
+    text_weight: float = 0.5,
+    rerank: int = STORE_RERANK,
+    rows: np.ndarray | None = None,
+) -> np.ndarray:
+    """Query-by-example scores: cosine to `example`, blended with a text query's when given.
+
+    Both queries go through one scores_batch() product over the store.
+    """
+    if text is None:
+        return store.scores(example, rerank=rerank, rows=rows)
+    S = store.scores_batch(np.stack([example, text]), rerank=rerank, rows=rows)
+    return (1.0 - text_weight) * S[0] + text_weight * S[1]
+
+
+# ── Lenses (zero-shot labels computed at index time) ──────────────────────────
+
+
+@dataclass(frozen=True)
+class Lens:
+    name: str
+    label: str                # suggestion text shown in the UI
+    prompts: Tuple[str, ...]  # averaged into one CLIP text embedding
+    pattern: str              # OCR regex (case-insensitive)
+
+
+LENSES: List[Lens] = [
+    Lens("errors", "error message",
+         ("a screenshot of an error message", "a screenshot of an exception stack trace", "an error dialog box"),
+         r"error|exception|traceback|failed|errno"),
+    Lens("codes", "confirmation code",
+         ("a screenshot of a verification code", "a screenshot of a confirmation number", "a one-time passcode message"),
+         r"confirm|code|verification|OTP|2FA"),
+    Lens("receipts", "receipt or invoice",
+         ("a photo of a receipt", "a screenshot of an invoice with a total amount", "a screenshot of a payment summary"),
+         r"\$\d+|total|invoice|receipt"),
+    Lens("charts", "dashboard or chart",
+         ("a screenshot of an analytics dashboard", "a bar chart or line graph", "a screenshot of charts and metrics"),
+         r"dashboard|analytics|chart|graph|metrics"),
+    Lens("calendar", "calendar or meeting",
+         ("a screenshot of a calendar", "a screenshot of a meeting invite", "a schedule or agenda"),
+         r"meeting|calendar|invite|schedule|agenda"),
+    Lens("terminal", "terminal output",
+         ("a screenshot of a terminal window", "a screenshot of command line output", "a screenshot of source code"),
+         r"terminal|bash|\$\s|>>>"),
+    Lens("orders", "order or shipping",
+         ("a screenshot of an order confirmation", "a screenshot of package tracking", "a shipping notification"),
+         r"order|shipping|tracking|delivered"),
+]
+LENS_BY_NAME = {l.name: l for l in LENSES}
+# Extra zero-shot classes that absorb images belonging to no lens.
+LENS_BACKGROUND = (
+    "a photo", "a photo of a person", "a screenshot of a website", "a screenshot of a chat conversation",
+    "a screenshot of an app", "a text document", "an illustration",
+)
+# A lens is kept for an image at this zero-shot probability (or on an OCR pattern hit).
+LENS_MIN_SCORE = 0.35
+# Bump when LENSES / LENS_BACKGROUND change so the next index run relabels everything.
+LENS_VERSION = 1
+
+_LENS_RES = [re.compile(l.pattern, re.I) for l in LENSES]
+
+
+def lens_matrix(model, tokenizer, device: str) -> np.ndarray:
+    """(len(LENSES) + len(LENS_BACKGROUND), dim) unit text embeddings, lenses first."""
+    prompts = [p for l in LENSES for p in l.prompts] + list(LENS_BACKGROUND)
+    T = text_embeddings(model, tokenizer, device, prompts)
+    rows, s = [], 0
+    for l in LENSES:
+        m = T[s : s + len(l.prompts)].mean(axis=0)
+        rows.append(m / np.linalg.norm(m))
+        s += len(l.prompts)
+    return np.concatenate([np.stack(rows), T[s:]]).astype("float32")
+
+
+def classify_lenses(embs: np.ndarray, M: np.ndarray, block: int = 8192) -> np.ndarray:
+    """(N, len(LENSES)) zero-shot probabilities: softmax(100 * cos) over lenses + background."""
+    out = np.zeros((len(embs), len(LENSES)), dtype="float32")
+    for s in range(0, len(embs), block):
+        logits = 100.0 * (np.asarray(embs[s : s + block], dtype="float32") @ M.T)
+        logits -= logits.max(axis=1, keepdims=True)
+        p = np.exp(logits)
+        out[s : s + block] = (p / p.sum(axis=1, keepdims=True))[:, : len(LENSES)]
+    return out
+
+
+def save_lenses(conn: sqlite3.Connection, paths_list: List[str], rows: np.ndarray, probs: np.ndarray) -> int:
+    """Replace the lens labels of paths_list[rows] (probs aligned with rows); returns labels written."""
+    ids = dict(conn.execute("SELECT path, id FROM assets"))
+    written = 0
+    for s in range(0, len(rows), 500):
+        chunk = [(int(r), ids.get(paths_list[int(r)])) for r in rows[s : s + 500]]
+        chunk = [(r, aid) for r, aid in chunk if aid is not None]
+        if not chunk:
+            continue
+        ph = ",".join(["?"] * len(chunk))
+        texts = dict(conn.execute(f"SELECT id, COALESCE(ocr_text,'') FROM assets WHERE id IN ({ph})", [a for _, a in chunk]))
+        conn.execute(f"DELETE FROM asset_lenses WHERE asset_id IN ({ph})", [a for _, a in chunk])
+        out = []
+        for k, (_, aid) in enumerate(chunk, start=s):
+            txt = texts.get(aid, "")
+            for j, lens in enumerate(LENSES):
+                hit = 1 if txt and _LENS_RES[j].search(txt) else 0
+                if hit or probs[k, j] >= LENS_MIN_SCORE:
+                    out.append((aid, lens.name, float(probs[k, j]), hit))
+        conn.executemany("INSERT INTO asset_lenses(asset_id, lens, score, ocr) VALUES (?, ?, ?, ?)", out)
+        written += len(out)
+    conn.commit()
+    return written
+
+
+def lens_counts(conn: sqlite3.Connection) -> dict[str, int]:
+    """Images per lens (from library_stats)."""
+    return dict(conn.execute("SELECT key, n FROM library_stats WHERE dim = 'lens' AND n > 0"))
+
+
+def lens_assets(conn: sqlite3.Connection, lens: str, k: int = 60, offset: int = 0) -> List[Tuple[str, float, int]]:
+    """(path, score, ocr hit) of one lens, OCR pattern hits first, then by zero-shot score."""
+    return conn.execute(
+        """
+        SELECT a.path, l.score, l.ocr FROM asset_lenses l JOIN assets a ON a.id = l.asset_id
+        WHERE l.lens = ? AND (a.group_id IS NULL OR a.group_id = a.id)
+        ORDER BY l.ocr DESC, l.score DESC LIMIT ? OFFSET ?
+        """,
+        (lens, int(k), int(offset)),
+    ).fetchall()
+
+
+# ── Related images (kNN graph) ────────────────────────────────────────────────
+
+# Neighbors kept per searchable asset.
+KNN_K = 20
+# Score-matrix elements per block product (rows x library); 2^25 floats = 128 MB.
+KNN_BLOCK_ELEMS = 1 << 25
+
+
+def knn_rows(embs: np.ndarray, rows: np.ndarray, k: int = KNN_K) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k neighbors (row indices, cosine) of embs[rows] among all rows, self excluded, best first."""
+    n = embs.shape[0]
+    kk = min(k, n - 1)
+    idx = np.empty((len(rows), kk), dtype=np.int64)
+    sims = np.empty((len(rows), kk), dtype=np.float32)
+    block = max(1, KNN_BLOCK_ELEMS // max(1, n))
+    for s in range(0, len(rows), block):
+        r = rows[s : s + block]
+        S = np.asarray(embs[r], dtype=np.float32) @ np.asarray(embs, dtype=np.float32).T
+        S[np.arange(len(r)), r] = -np.inf
+        idx[s : s + len(r)], sims[s : s + len(r)] = _top_sorted(S, kk)
+    return idx, sims
+
+
+def _top_sorted(S: np.ndarray, k: int, cols: np.ndarray | None = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-row top-k (column index, value) of S, best first; `cols` maps columns to row ids."""
+    part = np.argpartition(-S, k - 1, axis=1)[:, :k] if k < S.shape[1] else np.tile(np.arange(S.shape[1]), (len(S), 1))
+    vals = np.take_along_axis(S, part, axis=1)
+    order = np.argsort(-vals, axis=1)
+    part = np.take_along_axis(part, order, axis=1)
+    return (part if cols is None else cols[part]), np.take_along_axis(vals, order, axis=1)
+
+
+def update_knn(conn: sqlite3.Connection, paths_list: List[str], n_reps: int, embs: np.ndarray, changed: set[str]) -> int:
+    """Bring asset_knn up to date for the searchable rows (paths_list[:n_reps]); returns lists rewritten.
+
+    Lists of new or changed rows (and lists that point at a changed, removed or folded
+    asset) are recomputed with blocked products against the library. Every other list is
+    only merged with the new/changed rows, which is one small product per block.
+    """
+    rep_paths = paths_list[:n_reps]
+    E = embs[:n_reps]
+    ids = dict(conn.execute("SELECT path, id FROM assets"))
+    row_ids = np.array([ids.get(p, -1) for p in rep_paths], dtype=np.int64)
+    row_of = {int(a): i for i, a in enumerate(row_ids)}
+    kk = min(KNN_K, n_reps - 1)
+
+    cur_i = np.full((n_reps, max(kk, 0)), -1, dtype=np.int64)
+    cur_s = np.full((n_reps, max(kk, 0)), -np.inf, dtype=np.float32)
+    fresh = np.zeros(n_reps, dtype=bool)   # row not in the graph yet, or its vector changed
+    dirty = np.zeros(n_reps, dtype=bool)   # list must be recomputed
+    stale_ids = []
+    for aid, ib, sb in conn.execute("SELECT asset_id, ids, scores FROM asset_knn"):
+        i = row_of.get(int(aid))
+        if i is None:
+            stale_ids.append(int(aid))
+            continue
+        nb = np.frombuffer(ib, dtype="<i4")
+        rows = [row_of.get(int(x)) for x in nb]
+        if len(rows) == kk and None not in rows:
+            cur_i[i] = rows
+            cur_s[i] = np.frombuffer(sb, dtype="<f2")
+        else:
+            dirty[i] = True
+    for i, p in enumerate(rep_paths):
+        if p in changed or cur_i.shape[1] == 0 or cur_i[i, 0] < 0:
+            fresh[i] = True
+    dirty |= fresh
+    if kk > 0:
+        dirty |= fresh[np.maximum(cur_i, 0)].any(axis=1) & ~dirty
+
+    conn.executemany("DELETE FROM asset_knn WHERE asset_id = ?", [(a,) for a in stale_ids])
+    if kk <= 0:
+        conn.execute("DELETE FROM asset_knn")
+        conn.commit()
+        return 0
+
+    redo = np.flatnonzero(dirty)
+    if len(redo):
+        cur_i[redo], cur_s[redo] = knn_rows(E, redo, kk)
+
+    # Clean lists: merge in the fresh rows that beat their current k-th neighbor.
+    touched = dirty.copy()
+    cand = np.flatnonzero(fresh)
+    clean = np.flatnonzero(~dirty)
+    if len(cand) and len(clean):
+        Ec = np.asarray(E[cand], dtype=np.float32)
+        block = max(1, KNN_BLOCK_ELEMS // len(cand))
+        for s in range(0, len(clean), block):
+            r = clean[s : s + block]
+            S = np.asarray(E[r], dtype=np.float32) @ Ec.T
+            better = (S > cur_s[r, -1:]).any(axis=1)
+            if not better.any():
+                continue
+            r, S = r[better], S[better]
+            ci, cs = _top_sorted(S, min(kk, len(cand)), cand)
+            mi, ms = _top_sorted(np.concatenate([cur_s[r], cs], axis=1), kk)
+            cur_i[r] = np.take_along_axis(np.concatenate([cur_i[r], ci], axis=1), mi, axis=1)
+            cur_s[r] = ms
+            touched[r] = True
+
+    out = [
+        (int(row_ids[i]), row_ids[cur_i[i]].astype("<i4").tobytes(), cur_s[i].astype("<f2").tobytes())
+        for i in np.flatnonzero(touched) if row_ids[i] >= 0
+    ]
+    conn.executemany(
+        "INSERT INTO asset_knn(asset_id, ids, scores) VALUES (?, ?, ?) "
+        "ON CONFLICT(asset_id) DO UPDATE SET ids = excluded.ids, scores = excluded.scores",
+        out,
+    )
+    conn.commit()
+    return len(out)
+
+
+def related_assets(conn: sqlite3.Connection, asset_id: int, k: int = KNN_K) -> List[Tuple[str, float]]:
+    """(path, cosine) of an asset's stored neighbors, best first (empty if it has no list)."""
+    row = conn.execute("SELECT ids, scores FROM asset_knn WHERE asset_id = ?", (int(asset_id),)).fetchone()
+    if row is None:
+        return []
+    nb = np.frombuffer(row[0], dtype="<i4")[:k].tolist()
+    sc = np.frombuffer(row[1], dtype="<f2")[:k].tolist()
+    if not nb:
+        return []
+    paths = dict(conn.execute(f"SELECT id, path FROM assets WHERE id IN ({','.join('?' * len(nb))})", nb))
+    return [(paths[a], float(s)) for a, s in zip(nb, sc) if a in paths]
+
+
+# ── Standing queries (saved searches matched against new images) ──────────────
+
+# Default cosine thresholds: text query vs image, and image vs image ("like this").
+STANDING_TEXT_MIN = 0.27
+STANDING_EXAMPLE_MIN = 0.85
+
+
+@dataclass(frozen=True)
+class StandingQuery:
+    id: int
+    name: str
+    query: Optional[str]
+    fts: Optional[str]
+    kinds: Tuple[str, ...]
+    min_score: Optional[float]
+    vec: Optional[np.ndarray] = field(default=None, compare=False, repr=False)
+
+
+def save_standing_query(
+    conn: sqlite3.Connection,
+    name: str,
+    query: str | None = None,
+    vec: np.ndarray | None = None,
+    ocr: str | None = None,
+    kinds: Iterable[str] = (),
+    min_score: float | None = None,
+) -> int:
+    """Create or replace a standing query; returns its id.
+
+    `vec` is the pre-encoded query (text or example image); `ocr` terms must all appear in
+    the OCR text. At least one of the two is required.
+    """
+    fts = " AND ".join(query_tokens(ocr)) if ocr else None
+    if vec is None and not fts:
+        raise ValueError("a standing query needs a vector or OCR terms")
+    blob = None if vec is None else np.asarray(vec, dtype="<f4").tobytes()
+    conn.execute(
+        """
+        INSERT INTO standing_queries(name, query, fts, kinds, min_score, vec, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(name) DO UPDATE SET query=excluded.query, fts=excluded.fts, kinds=excluded.kinds,
+            min_score=excluded.min_score, vec=excluded.vec
+        """,
+        (name, query, fts, ",".join(kinds) or None, min_score if vec is not None else None, blob,
+         datetime.now(timezone.utc).isoformat()),
+    )
+    conn.commit()
+    return int(conn.execute("SELECT id FROM standing_queries WHERE name = ?", (name,)).fetchone()[0])
+
+
+def standing_queries(conn: sqlite3.Connection) -> List[StandingQuery]:
+    return [
+        StandingQuery(
+            id=int(i), name=n, query=q, fts=f, kinds=tuple(k.split(",")) if k else (), min_score=m,
+            vec=np.frombuffer(v, dtype="<f4") if v else None,
+        )
+        for i, n, q, f, k, m, v in conn.execute(
+            "SELECT id, name, query, fts, kinds, min_score, vec FROM standing_queries ORDER BY id"
+        )
+    ]
+
+
+def match_standing_queries(
+    conn: sqlite3.Connection, paths_list: List[str], embs: np.ndarray, new_paths: Iterable[str]
+) -> dict[str, int]:
+    """Record which of the new images match each standing query; returns {query name: new matches}.
+
+    All vector queries are scored against the new rows in one matrix product; OCR terms are
+    one FTS query per standing query, restricted to the new rows.
+    """
+    sq = standing_queries(conn)
+    new = set(new_paths)
+    rows = np.array([i for i, p in enumerate(paths_list) if p in new], dtype=np.int64)
+    if not sq or not len(rows):
+        return {}
+    info = {}
+    for s in range(0, len(rows), 500):
+        chunk = [paths_list[int(i)] for i in rows[s : s + 500]]
+        ph = ",".join("?" * len(chunk))
+        for p, aid, kind in conn.execute(f"SELECT path, id, kind FROM assets WHERE path IN ({ph})", chunk):
+            info[p] = (int(aid), kind)
+    rows = np.array([i for i in rows if paths_list[int(i)] in info], dtype=np.int64)
+    aids = [info[paths_list[int(i)]][0] for i in rows]
+    kinds = [info[paths_list[int(i)]][1] for i in rows]
+
+    with_vec = [q for q in sq if q.vec is not None and q.vec.shape[0] == embs.shape[1]]
+    S = np.asarray(embs[rows], dtype=np.float32) @ np.stack([q.vec for q in with_vec]).T if with_vec else None
+    col = {q.id: j for j, q in enumerate(with_vec)}
+
+    now = datetime.now(timezone.utc).isoformat()
+    out: dict[str, int] = {}
+    for q in sq:
+        if q.vec is not None and q.id not in col:
+            continue  # encoded with another model
+        ok = np.ones(len(rows), dtype=bool)
+        score = np.ones(len(rows), dtype=np.float32)
+        if q.kinds:
+            ok &= np.array([k in q.kinds for k in kinds], dtype=bool)
+        if q.id in col:
+            score = S[:, col[q.id]]
+            ok &= score >= (q.min_score if q.min_score is not None else STANDING_TEXT_MIN)
+        if q.fts and ok.any():
+            cand = [aids[i] for i in np.flatnonzero(ok)]
+            hit: set[int] = set()
+            for s in range(0, len(cand), 500):
+                part = cand[s : s + 500]
+                try:
+                    hit.update(r for (r,) in conn.execute(
+                        f"SELECT rowid FROM ocr_fts WHERE ocr_fts MATCH ? AND rowid IN ({','.join('?' * len(part))})",
+                        [q.fts, *part],
+                    ))
+                except sqlite3.OperationalError:
+                    pass
+            ok &= np.array([a in hit for a in aids], dtype=bool)
+        matched = [(q.id, aids[i], float(score[i]), now) for i in np.flatnonzero(ok)]
+        conn.executemany(
+            "INSERT INTO standing_matches(query_id, asset_id, score, matched_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(query_id, asset_id) DO UPDATE SET score = excluded.score, matched_at = excluded.matched_at, seen = 0",
+            matched,
+        )
+        if matched:
+            out[q.name] = len(matched)
+    conn.commit()
+    return out
+
+
+def standing_matches(
+    conn: sqlite3.Connection, query_id: int | None = None, unseen: bool = False, limit: int = 100
+) -> List[Tuple[str, str, float, str, int]]:
+    """(query name, path, score, matched_at, seen) of recorded matches, newest first."""
+    where, args = [], []
+    if query_id is not None:
+        where.append("m.query_id = ?")
+        args.append(int(query_id))
+    if unseen:
+        where.append("m.seen = 0")
+    return conn.execute(
+        f"""
+        SELECT q.name, a.path, m.score, m.matched_at, m.seen
+        FROM standing_matches m JOIN standing_queries q ON q.id = m.query_id JOIN assets a ON a.id = m.asset_id
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY m.matched_at DESC, m.score DESC LIMIT ?
+        """,
+        (*args, int(limit)),
+    ).fetchall()
+
+
+# ── Search pipeline (shared by the API and `search --queries-file`) ───────────
+
+# Queries containing these (or digits) are "texty": OCR weight is boosted.
+TEXTY_KEYWORDS = [
+    "error", "code", "http", "forbidden", "denied",
+    "invoice", "receipt", "total", "$", "usd", "cad",
+]
+
+# Best OCR matches for an FTS5 expression: (path, bm25) with lower bm25 = better.
+OCR_FTS_SQL = """
+    SELECT a.path, bm25(ocr_fts) AS score
+    FROM ocr_fts
+    JOIN assets a ON a.id = ocr_fts.rowid
+    WHERE ocr_fts MATCH ?
+    ORDER BY score
+    LIMIT 2000
+"""
+
+# Characters OCR commonly confuses; folded together for typo-tolerant matching.
+OCR_CONFUSIONS = {"o": "0", "0": "o", "l": "1i", "i": "1l", "1": "li", "s": "5", "5": "s"}
+OCR_FOLD = str.maketrans("01i5", "olls")
+# Minimum similarity for a substring / fuzzy (typo-tolerant) OCR token match.
+FUZZY_MIN_SIM = 0.4
+
+# Matching OCR lines returned per result as evidence.
+EVIDENCE_LINES = 3
+
+# Queries per matrix-matrix scan in batch mode (bounds the score matrix).
+SEARCH_BATCH = 64
+# Hybrid planner: CLIP candidates taken in the first round (grown until the result is provably exact).
+PLANNER_TOP_M = 256
+# Upper bound of the recency multiplier in hybrid_scores.
+RECENCY_MAX = 1.15
+
+
+@dataclass
+class AssetSignals:
+    """Per-row ranking signals aligned with meta.json `paths`."""
+
+    textiness: np.ndarray
+    quality: np.ndarray
+    mtime: np.ndarray
+    kind: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int16))      # codes into kind_names
+    folder: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int32))    # codes into folder_names
+    kind_names: List[str] = field(default_factory=list)
+    folder_names: List[str] = field(default_factory=list)   # parent directory of each path
+    filter_cache: LRUCache = field(default_factory=lambda: LRUCache(maxsize=64), repr=False)
+
+    @cached_property
+    def damp_max(self) -> float:
+        """Largest quality damping factor in the library (used as a score bound)."""
+        return float((0.3 + 0.7 * self.quality).max()) if len(self.quality) else 1.0
+
+    @cached_property
+    def folder_real(self) -> List[str]:
+        """folder_names with symlinks, `..` and relative spellings resolved (for folder filters)."""
+        return [os.path.realpath(d) for d in self.folder_names]
+
+    def take(self, idx: np.ndarray) -> "AssetSignals":
+        return AssetSignals(
+            textiness=self.textiness[idx],
+            quality=self.quality[idx],
+            mtime=self.mtime[idx],
+            kind=self.kind[idx] if len(self.kind) else self.kind,
+            folder=self.folder[idx] if len(self.folder) else self.folder,
+            kind_names=self.kind_names,
+            folder_names=self.folder_names,
+        )
+
+
+@dataclass(frozen=True)
+class SearchFilter:
+    """Metadata predicates a search is restricted to (all must hold)."""
+
+    folders: Tuple[str, ...] = ()       # path is under one of these folders
+    kinds: Tuple[str, ...] = ()         # assets.kind
+    since: Optional[float] = None       # mtime >= since (unix seconds)
+    until: Optional[float] = None       # mtime < until
+    min_quality: Optional[float] = None
+    has_ocr: Optional[bool] = None
+
+    @property
+    def active(self) -> bool:
+        return bool(self.folders or self.kinds) or any(
+            v is not None for v in (self.since, self.until, self.min_quality, self.has_ocr)
+        )
+
+
+def filter_rows(sig: AssetSignals, flt: SearchFilter | None) -> Optional[np.ndarray]:
+    """Sorted rows passing `flt` (None when there is nothing to filter).
+
+    Evaluated as boolean masks over the columnar signals; folder and kind predicates
+    are resolved against the (small) folder / kind vocabularies first. Results are
+    cached per filter on `sig`, so repeated filters cost nothing.
+    """
+    if flt is None or not flt.active:
+        return None
+    hit = sig.filter_cache.get(flt)
+    if hit is None:
+        hit = _filter_mask_rows(sig, flt)
+        sig.filter_cache.put(flt, hit)
+    # A filter every row passes is no filter (plain full scan).
+    return None if len(hit) == len(sig.quality) else hit
+
+
+def _filter_mask_rows(sig: AssetSignals, flt: SearchFilter) -> np.ndarray:
+    mask = np.ones(len(sig.quality), dtype=bool)
+    if flt.folders:
+        # Match whole path components on resolved paths: `~/shots` and a symlinked
+        # spelling both work, and `/a/shots` does not match `/a/shots2`.
+        roots = [os.path.realpath(os.path.expanduser(f)) for f in flt.folders]
+        prefixes = tuple(r if r.endswith(os.sep) else r + os.sep for r in roots)
+        codes = [c for c, d in enumerate(sig.folder_real) if d in roots or d.startswith(prefixes)]
+        mask &= np.isin(sig.folder, codes)
+    if flt.kinds:
+        mask &= np.isin(sig.kind, [c for c, k in enumerate(sig.kind_names) if k in flt.kinds])
+    if flt.since is not None:
+        mask &= sig.mtime >= flt.since
+    if flt.until is not None:
+        mask &= sig.mtime < flt.until
+    if flt.min_quality is not None:
+        mask &= sig.quality >= flt.min_quality
+    if flt.has_ocr is not None:
+        mask &= (sig.textiness > 0) == flt.has_ocr
+    return np.flatnonzero(mask)
+
+
+def query_tokens(query: str) -> List[str]:
+    return [t for t in re.split(r"[^a-zA-Z0-9]+", query.lower()) if len(t) >= 3 or t.isdigit()]
+
+
+def looks_texty(query: str) -> bool:
+    q_lower = query.lower()
+    return any(ch.isdigit() for ch in query) or any(k in q_lower for k in TEXTY_KEYWORDS)
+
+
+def load_signals(conn: sqlite3.Connection, paths_list: List[str]) -> AssetSignals:
+    n = len(paths_list)
+    sig = AssetSignals(
+        textiness=np.zeros(n, dtype="float32"),
+        quality=np.full(n, 0.5, dtype="float32"),
+        mtime=np.zeros(n, dtype="float64"),
+        kind=np.zeros(n, dtype=np.int16),
+        folder=np.zeros(n, dtype=np.int32),
+        kind_names=["unknown"],
+    )
+    kind_codes = {"unknown": 0}
+    folder_codes: dict[str, int] = {}
+    path_index: dict[str, int] = {}
+    for i, p in enumerate(paths_list):
+        path_index[p] = i
+        sig.folder[i] = folder_codes.setdefault(os.path.dirname(p), len(folder_codes))
+    sig.folder_names = list(folder_codes)
+    rows = conn.execute(
+        "SELECT path, COALESCE(textiness,0), COALESCE(quality_score,0.5), COALESCE(mtime,0), "
+        "COALESCE(kind,'unknown') FROM assets"
+    ).fetchall()
+    for p, txty, qs, mt, knd in rows:
+        i = path_index.get(p)
+        if i is not None:
+            sig.textiness[i] = float(txty)
+            sig.quality[i] = float(qs)
+            sig.mtime[i] = float(mt)
+            sig.kind[i] = kind_codes.setdefault(knd, len(kind_codes))
+    sig.kind_names = list(kind_codes)
+    return sig
+
+
+def ocr_scores(
+    conn: sqlite3.Connection, q_tokens: List[str], path_index: dict[str, int], n: int
+) -> np.ndarray:
+    """0..1 OCR score per row: FTS5 bm25 (AND, then OR), else trigram substring/fuzzy matches."""
+    out = np.zeros(n, dtype="float32")
+    idx, vals = ocr_hits(conn, q_tokens, path_index)
+    out[idx] = vals
+    return out
+
+
+def ocr_hits(
+    conn: sqlite3.Connection, q_tokens: List[str], path_index: dict[str, int]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Sparse form of ocr_scores: (sorted row indices, 0..1 scores) of the OCR matches."""
+    hits: dict[int, float] = {}
+    if not q_tokens:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype="float32")
+
+    rows = conn.execute(OCR_FTS_SQL, (" AND ".join(q_tokens),)).fetchall()
+    if not rows and len(q_tokens) > 1:
+        rows = conn.execute(OCR_FTS_SQL, (" OR ".join(q_tokens),)).fetchall()
+
+    if rows:
+        # bm25: lower is better; convert to 0..1 where 1 is best.
+        # Normalise in float64 throughout: a float32 `best` against float64 row
+        # scores pushed ties just past 1.0.
+        raw = np.array([float(r[1]) for r in rows], dtype=np.float64)
+        best = raw.min()
+        norm = np.clip(1.0 - (raw - best) / max(1e-6, raw.max() - best), 0.0, 1.0)
+        for (p, _), s in zip(rows, norm):
+            i = path_index.get(str(p))
+            if i is not None:
+                hits[i] = max(hits.get(i, 0.0), float(s))
+    else:
+        # Word index missed (numbers inside words, OCR typos): use the trigram index.
+        for p, s, _ in ocr_trigram_matches(conn, q_tokens):
+            i = path_index.get(p)
+            if i is not None:
+                hits[i] = max(hits.get(i, 0.0), min(1.0, max(0.0, float(s))))
+
+    idx = np.array(sorted(hits), dtype=int)
+    return idx, np.array([hits[i] for i in idx], dtype="float32")
+
+
+def _trigrams(s: str) -> set[str]:
+    return {s[i : i + 3] for i in range(len(s) - 2)}
+
+
+def _confusable_trigrams(tok: str, cap: int = 64) -> List[str]:
+    """Trigrams of `tok` plus their OCR-confusion variants (bounded)."""
+    out: set[str] = set()
+    for tri in _trigrams(tok):
+        variants = [""]
+        for ch in tri:
+            variants = [v + c for v in variants for c in ch + OCR_CONFUSIONS.get(ch, "")]
+        out.update(variants)
+        if len(out) >= cap:
+            break
+    return sorted(out)
+
+
+def _substring_sim(tok: str, text: str) -> float:
+    """How well `tok` matches as a substring: numbers count fully, words by coverage."""
+    best = 0.0
+    for w in re.split(r"[^a-z0-9]+", text.lower()):
+        if tok in w:
+            if tok.isdigit():
+                return 1.0
+            best = max(best, len(tok) / len(w))
+    return best
+
+
+def _fuzzy_sim(tok: str, text: str) -> float:
+    """Best trigram overlap of `tok` with a word of `text`, after OCR folding."""
+    qt = _trigrams(tok.translate(OCR_FOLD))
+    if not qt:
+        return 0.0
+    best = 0.0
+    for w in re.split(r"[^a-z0-9]+", text.lower().translate(OCR_FOLD)):
+        if len(w) >= 3:
+            wt = _trigrams(w)
+            best = max(best, 2.0 * len(qt & wt) / (len(qt) + len(wt)))
+    return best
+
+
+def ocr_trigram_matches(
+    conn: sqlite3.Connection, q_tokens: List[str], limit: int = 2000
+) -> List[Tuple[str, float, List[str]]]:
+    """Substring + typo-tolerant OCR matches: (path, 0..0.95 score, matched tokens).
+
+    Each token is looked up as a substring through the trigram index ("403" in "e403",
+    "confirm" in "confirmation"); tokens of 4+ characters with no substring hit are
+    matched fuzzily (trigram overlap after folding OCR confusions like 0/o, 1/l).
+    Per-token matches below FUZZY_MIN_SIM are dropped; the score is 0.95 x their mean.
+    """
+    if not q_tokens:
+        return []
+    per_row: dict[int, dict[str, float]] = {}
+    paths: dict[int, str] = {}
+    try:
+        for t in q_tokens:
+            rows = conn.execute(
+                "SELECT a.id, a.path, a.ocr_text FROM ocr_trgm JOIN assets a ON a.id = ocr_trgm.rowid "
+                "WHERE ocr_trgm.ocr_text LIKE ? LIMIT ?",
+                (f"%{t}%", limit),
+            ).fetchall()
+            for rid, p, txt in rows:
+                sim = _substring_sim(t, txt or "")
+                if sim >= FUZZY_MIN_SIM:
+                    per_row.setdefault(rid, {})[t] = sim
+                    paths[rid] = p
+            if rows or len(t) < 4:
+                continue
+            expr = " OR ".join(f'"{tri}"' for tri in _confusable_trigrams(t))
+            cand = conn.execute(
+                "SELECT a.id, a.path, a.ocr_text FROM ocr_trgm JOIN assets a ON a.id = ocr_trgm.rowid "
+                "WHERE ocr_trgm MATCH ? ORDER BY bm25(ocr_trgm) LIMIT 200",
+                (expr,),
+            ).fetchall()
+            for rid, p, txt in cand:
+                sim = _fuzzy_sim(t, txt or "")
+                if sim >= FUZZY_MIN_SIM:
+                    per_row.setdefault(rid, {})[t] = sim
+                    paths[rid] = p
+    except sqlite3.OperationalError:
+        # No trigram index (old SQLite): plain substring scan.
+        per_row.clear()
+        clauses = " OR ".join(["ocr_text LIKE ?" for _ in q_tokens])
+        rows = conn.execute(
+            f"SELECT id, path, ocr_text FROM assets WHERE {clauses} LIMIT ?",
+            (*[f"%{t}%" for t in q_tokens], limit),
+        ).fetchall()
+        for rid, p, txt in rows:
+            m = {t: _substring_sim(t, txt or "") for t in q_tokens}
+            m = {t: v for t, v in m.items() if v >= FUZZY_MIN_SIM}
+            if m:
+                per_row[rid] = m
+                paths[rid] = p
+
+    out = [
+        (paths[rid], 0.95 * sum(m.values()) / len(q_tokens), sorted(m))
+        for rid, m in per_row.items()
+    ]
+    out.sort(key=lambda r: -r[1])
+    return out[:limit]
+
+
+def _highlight_spans(marked: str) -> Tuple[str, List[List[int]]]:
+    """Split FTS5 highlight() output (\x02/\x03 markers) into plain text + [start, end) spans."""
+    plain: list[str] = []
+    spans: List[List[int]] = []
+    pos = 0
+    for ch in marked:
+        if ch == "\x02":
+            spans.append([pos, pos])
+        elif ch == "\x03":
+            spans[-1][1] = pos
+        else:
+            plain.append(ch)
+            pos += 1
+    return "".join(plain), spans
+
+
+def ocr_evidence(
+    conn: sqlite3.Connection, paths: List[str], q_tokens: List[str], per_asset: int = EVIDENCE_LINES
+) -> dict[str, List[dict]]:
+    """Best matching OCR lines of each path: {line, text, spans, box}, best first.
+
+    Lines come from the line-level FTS (highlight()) and are ordered by distinct query
+    terms, then hits; paths with no word-level hit (trigram/fuzzy OCR matches) fall back
+    to substring / fuzzy word spans in their lines.
+    """
+    if not paths or not q_tokens:
+        return {}
+    ph = ",".join(["?"] * len(paths))
+    lines = conn.execute(
+        f"""
+        SELECT l.id, a.path, l.line_no, l.text, l.x, l.y, l.w, l.h
+        FROM assets a JOIN ocr_lines l ON l.asset_id = a.id
+        WHERE a.path IN ({ph})
+        ORDER BY l.asset_id, l.line_no
+        """,
+        tuple(paths),
+    ).fetchall()
+    if not lines:
+        return {}
+
+    # Restrict the MATCH to these rows by rowid. No bm25/rank: its IDF pass walks the
+    # term's whole doclist, which dominates for common words.
+    marked: dict[int, str] = {}
+    try:
+        ph = ",".join(["?"] * len(lines))
+        marked = dict(
+            conn.execute(
+                f"""
+                SELECT rowid, highlight(ocr_lines_fts, 0, char(2), char(3))
+                FROM ocr_lines_fts
+                WHERE ocr_lines_fts MATCH ? AND rowid IN ({ph})
+                """,
+                (" OR ".join(q_tokens), *[ln[0] for ln in lines]),
+            ).fetchall()
+        )
+    except sqlite3.OperationalError:
+        pass
+
+    by_path: dict[str, List[Tuple[Tuple[int, int], dict]]] = {}
+    fts_paths = {p for rid, p, *_ in lines if rid in marked}
+    for rid, p, line_no, text, x, y, w, h in lines:
+        if rid in marked:
+            text, spans = _highlight_spans(marked[rid])
+        elif p not in fts_paths:
+            # No word-level hit in this asset (trigram/fuzzy OCR match): word spans here.
+            spans = []
+            for m in re.finditer(r"[A-Za-z0-9]+", text):
+                word = m.group().lower()
+                for t in q_tokens:
+                    i = word.find(t)
+                    if i >= 0:
+                        spans.append([m.start() + i, m.start() + i + len(t)])
+                    elif len(t) >= 4 and _fuzzy_sim(t, word) >= FUZZY_MIN_SIM:
+                        spans.append([m.start(), m.end()])
+        else:
+            continue
+        if spans:
+            box = [x, y, w, h] if x is not None else None
+            terms = len({text[a:b].lower() for a, b in spans})
+            by_path.setdefault(p, []).append(
+                ((-terms, -len(spans)), {"line": line_no, "text": text, "spans": sorted(spans), "box": box})
+            )
+    out = {}
+    for p, hits in by_path.items():
+        hits.sort(key=lambda r: r[0])  # stable: ties keep reading order
+        out[p] = [ln for _, ln in hits[:per_asset]]
+    return out
+
+
+def hybrid_scores(
+    clip_scores: np.ndarray,
+    ocr: np.ndarray,
+    sig: AssetSignals,
+    query: str,
+    ocr_weight: float,
+    now: float | None = None,
+) -> Tuple[np.ndarray, float]:
+    """Blend CLIP + OCR with per-asset OCR weight, quality damping and recency.
+
+    Returns (scores, base OCR weight after the texty-query boost).
+    """
+    base_w = float(ocr_weight)
+    if looks_texty(query):
+        base_w = max(base_w, 0.80)
+
+    # Per-asset OCR weight based on textiness.
+    w_per = np.clip(base_w + 0.25 * sig.textiness, 0.0, 1.0)
+    scores = (1.0 - w_per) * clip_scores + w_per * ocr
+
+    # Quality score dampening.
+    scores = scores * (0.3 + 0.7 * sig.quality)
+
+    # Recency bias.
+    now_ts = time.time() if now is None else now
+    days_ago = (now_ts - sig.mtime) / 86400.0
+    recency = 1.0 + 0.15 * np.clip(1.0 - days_ago / 365.0, 0.0, 1.0)
+    return (scores * recency).astype("float32"), base_w
+
+
+def rank_top(scores: np.ndarray, k: int) -> np.ndarray:
+    """Top-k row indices, best first (ties by row index).
+
+    Searchable rows are near-duplicate group representatives already (see
+    compute_dup_groups), so there is nothing left to collapse here.
+    """
+    n = len(scores)
+    k = min(k, n)
+    if k <= 0:
+        return np.zeros(0, dtype=int)
+    top = np.argpartition(-scores, k - 1)[:k] if k < n else np.arange(n)
+    return top[np.lexsort((top, -scores[top]))]
+
+
+def plan_hybrid(
+    query: str,
+    clip_scores: np.ndarray,
+    hit_idx: np.ndarray,
+    hit_val: np.ndarray,
+    sig: AssetSignals,
+    ocr_weight: float,
+    k: int,
+    top_m: int = PLANNER_TOP_M,
+) -> Optional[Tuple[np.ndarray, np.ndarray, float]]:
+    """Two-stage hybrid ranking over candidates = OCR hits ∪ CLIP top-M.
+
+    A row outside the candidates has no OCR score and a CLIP score <= the M-th best,
+    so its hybrid score is at most RECENCY_MAX * (1 - base_w) * damp_max * clip_M.
+    Once the k-th best candidate beats that bound, the candidates' top k is exactly
+    the dense top k. Otherwise M grows; returns None
+    when it would cover the whole library (caller then runs the dense path).
+
+    Returns (candidate row indices, their hybrid scores, base OCR weight).
+    """
+    n = len(clip_scores)
+    need = min(n, k)
+    base_w = max(float(ocr_weight), 0.80) if looks_texty(query) else float(ocr_weight)
+    m = max(top_m, need)
+    while m < n:
+        top = np.argpartition(-clip_scores, m - 1)[:m]
+        cand = np.union1d(top, hit_idx)
+        ocr = np.zeros(len(cand), dtype="float32")
+        ocr[np.searchsorted(cand, hit_idx)] = hit_val
+        scores, base_w = hybrid_scores(clip_scores[cand], ocr, sig.take(cand), query, ocr_weight)
+
+        clip_m = float(clip_scores[top].min())
+        bound = RECENCY_MAX * (1.0 - base_w) * sig.damp_max * max(clip_m, 0.0)
+        kth = -np.partition(-scores, need - 1)[need - 1]
+        if kth > bound:
+            return cand, scores, base_w
+        m *= 4
+    return None
+
+
+def score_query(
+    query: str,
+    clip_scores: np.ndarray,
+    conn: sqlite3.Connection,
+    path_index: dict[str, int],
+    sig: AssetSignals | None,
+    mode: str,
+    ocr_weight: float,
+    k: int,
+    planner: bool = True,
+    hits: Tuple[np.ndarray, np.ndarray] | None = None,
+    rows: np.ndarray | None = None,
+) -> dict:
+    """Rank one query given its CLIP scores (the /search ranking, minus I/O).
+
+    Hybrid mode goes through plan_hybrid unless `planner` is off; the result is the
+    same either way, but planned `scores` are only filled in for the candidates.
+    `hits` may carry a precomputed ocr_hits() result (then `conn` is not used for it).
+    With `rows` (from filter_rows; needs `sig`), `clip_scores` covers just those rows
+    and ranking is restricted to them; the returned arrays are full-length again.
+    """
+    q_tokens = query_tokens(query)
+    hit_idx, hit_val = hits if hits is not None else ocr_hits(conn, q_tokens, path_index)
+    if rows is not None:
+        pos = np.minimum(np.searchsorted(rows, hit_idx), max(0, len(rows) - 1))
+        keep = (rows[pos] == hit_idx) if len(rows) else np.zeros(len(hit_idx), dtype=bool)
+        sub = score_query(
+            query, clip_scores, conn, path_index, sig.take(rows), mode, ocr_weight, k,
+            planner=planner, hits=(pos[keep], hit_val[keep]),
+        )
+        full = {"scores": np.full(len(sig.quality), -np.inf, dtype="float32")}
+        for key in ("clip", "ocr"):
+            full[key] = np.zeros(len(sig.quality), dtype="float32")
+        for key, arr in full.items():
+            arr[rows] = sub[key]
+        return {**sub, **full, "top": rows[sub["top"]]}
+    n = len(clip_scores)
+    ocr = np.zeros(n, dtype="float32")
+    ocr[hit_idx] = hit_val
+    base_w = None
+    planned = None
+    if mode == "hybrid" and planner:
+        planned = plan_hybrid(query, clip_scores, hit_idx, hit_val, sig, ocr_weight, k)
+
+    if planned is not None:
+        cand, cand_scores, base_w = planned
+        top = cand[rank_top(cand_scores, k)]
+        scores = np.full(n, -np.inf, dtype="float32")
+        scores[cand] = cand_scores
+    else:
+        if mode == "clip":
+            scores = clip_scores
+        elif mode == "ocr":
+            scores = ocr
+        else:
+            scores, base_w = hybrid_scores(clip_scores, ocr, sig, query, ocr_weight)
+        top = rank_top(scores, k)
+    return {
+        "top": top,
+        "scores": scores,
+        "clip": clip_scores,
+        "ocr": ocr,
+        "q_tokens": q_tokens,
+        "ocr_weight": base_w,
+        "planned": planned is not None,
+    }
 
 
 @click.group()
@@ -343,9 +2440,54 @@ def cli():
     default=None,
     help="Cap the number of images indexed (pairs well with --recent-only).",
 )
-def index(folder: tuple[Path, ...], device: str, ocr: bool, recent_only: bool, max_items: int | None):
+@click.option(
+    "--store-tier",
+    "store_tier_opt",
+    type=click.Choice(STORE_TIERS),
+    default=None,
+    help="Embedding store tier for this index (default: keep the current one, else float32).",
+)
+@click.option(
+    "--hash",
+    "hash_kind_opt",
+    type=click.Choice(HASH_KINDS),
+    default=None,
+    help="Perceptual hash for near-duplicates (default: keep the current one, else ahash).",
+)
+@click.option(
+    "--thumbs/--no-thumbs",
+    default=True,
+    show_default=True,
+    help="Write gallery thumbnails from the image decoded for embedding.",
+)
+@click.option(
+    "--thumb-budget-mb",
+    type=click.IntRange(min=0),
+    default=None,
+    help="Disk budget for thumbnails in MB (remembered; 0 = scale with the library).",
+)
+@click.option(
+    "--progress-json",
+    is_flag=True,
+    default=False,
+    help="Also print progress as JSON lines (stage timings, throughput, ETA) for the local API.",
+)
+def index(folder: tuple[Path, ...], device: str, ocr: bool, recent_only: bool, max_items: int | None, store_tier_opt: str | None, hash_kind_opt: str | None, thumbs: bool, thumb_budget_mb: int | None, progress_json: bool):
     """Index images under FOLDER(s) (or the last indexed folders)."""
 
+    t_start = time.perf_counter()
+    stage_t = [t_start]
+
+    def emit(event: str, **fields) -> None:
+        if progress_json:
+            print(json.dumps({"event": event, **fields}), flush=True)
+
+    def stage_done(name: str, items: int) -> None:
+        now = time.perf_counter()
+        secs = now - stage_t[0]
+        stage_t[0] = now
+        emit("stage", stage=name, items=items, seconds=round(secs, 3), rate=round(items / secs, 2) if secs > 0 else None)
+
     paths = get_dbpaths()
     paths.root.mkdir(parents=True, exist_ok=True)
 
@@ -395,6 +2537,13 @@ def index(folder: tuple[Path, ...], device: str, ocr: bool, recent_only: bool, m
     meta.setdefault("model", {"name": model_name, "pretrained": pretrained})
     meta["model"] = {"name": model_name, "pretrained": pretrained}
     meta["roots"] = [str(f) for f in folders]
+    meta.setdefault("epoch", uuid.uuid4().hex)  # new index (first run or after reset)
+    prev_tier = store_tier(meta)
+    meta["store"] = {"tier": store_tier_opt or prev_tier}
+    prev_hash_kind = meta.get("hash", "ahash")
+    hash_kind = meta["hash"] = hash_kind_opt or prev_hash_kind
+    if thumb_budget_mb is not None:
+        meta["thumb_budget_mb"] = thumb_budget_mb
     # Keep legacy "root" for backwards compat
     meta["root"] = str(folders[0]) if folders else ""
 
@@ -459,19 +2608,33 @@ def index(folder: tuple[Path, ...], device: str, ocr: bool, recent_only: bool, m
         to_process.append((p, mtime, size))
 
     console.print(f"[dim]Skipped {skipped} unchanged, processing {len(to_process)} images…[/dim]")
+    stage_done("scan", len(images))
+
+    thumb_cache = ThumbCache(paths.thumbs) if thumbs else None
 
     def _process_one(p: Path, do_ocr: bool) -> Optional[dict]:
-        """Compute embedding + OCR for one image (thread-safe)."""
-        vec = image_embedding(model, preprocess, device, p)
+        """Compute embedding + OCR (+ thumbnails) for one image (thread-safe)."""
+        try:
+            img = Image.open(p).convert("RGB")
+        except Exception:
+            return None
+        vec = image_embedding(model, preprocess, device, img)
         if vec is None:
             return None
+        if thumb_cache is not None:
+            try:
+                thumb_cache.put_all(p, img)
+            except OSError:
+                pass  # thumbnails are rendered on demand instead
         w, h = get_image_size(p)
-        ocr_txt = ocr_text_apple_vision(p) if do_ocr else ""
+        ocr_lines = ocr_lines_apple_vision(p) if do_ocr else []
+        ocr_txt = "\n".join(t for t, _ in ocr_lines).strip()
         knd = guess_kind(p, w, h)
         txty = textiness_from_ocr(ocr_txt)
         qs = quality_score(p, w, h, p.stat().st_size)
-        dg = ahash64(p)
-        return {"vec": vec, "w": w, "h": h, "ocr_txt": ocr_txt, "kind": knd, "textiness": txty, "quality_score": qs, "dup_group": dg}
+        hv = perceptual_hash(img, hash_kind)  # same pixels as the embedding; no second decode
+        return {"vec": vec, "w": w, "h": h, "ocr_txt": ocr_txt, "ocr_lines": ocr_lines, "kind": knd, "textiness": txty, "quality_score": qs,
+                "dup_group": hash_label(hv, hash_kind), "hash64": to_sql_int(hv)}
 
     # Parallel indexing: CLIP + OCR in threads, DB writes on main thread.
     n_workers = min(4, max(1, len(to_process)))
@@ -479,6 +2642,7 @@ def index(folder: tuple[Path, ...], device: str, ocr: bool, recent_only: bool, m
     total_count = len(to_process)
 
     iterator = tqdm(total=total_count, desc="indexing") if use_tqdm else None
+    last_emit = 0.0
 
     with ThreadPoolExecutor(max_workers=n_workers) as executor:
         future_to_info = {}
@@ -495,6 +2659,12 @@ def index(folder: tuple[Path, ...], device: str, ocr: bool, recent_only: bool, m
                 iterator.update(1)
             elif processed_count % 25 == 0:
                 console.print(f"… processed {processed_count}/{total_count}")
+            now = time.perf_counter()
+            if now - last_emit >= 0.2 or processed_count == total_count:
+                last_emit = now
+                rate = processed_count / max(now - stage_t[0], 1e-9)
+                emit("progress", stage="embed", processed=processed_count, total=total_count,
+                     rate=round(rate, 2), eta_s=round((total_count - processed_count) / rate, 1))
 
             result = fut.result()
             if result is None:
@@ -507,8 +2677,8 @@ def index(folder: tuple[Path, ...], device: str, ocr: bool, recent_only: bool, m
 
             conn.execute(
                 """
-                INSERT INTO assets(path, mtime, size_bytes, width, height, kind, textiness, quality_score, dup_group, ocr_text, indexed_at)
-                VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                INSERT INTO assets(path, mtime, size_bytes, width, height, kind, textiness, quality_score, dup_group, hash64, ocr_text, indexed_at)
+                VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ON CONFLICT(path) DO UPDATE SET
                   mtime=excluded.mtime,
                   size_bytes=excluded.size_bytes,
@@ -518,19 +2688,17 @@ def index(folder: tuple[Path, ...], device: str, ocr: bool, recent_only: bool, m
                   textiness=excluded.textiness,
                   quality_score=excluded.quality_score,
                   dup_group=excluded.dup_group,
+                  hash64=excluded.hash64,
                   ocr_text=excluded.ocr_text,
                   indexed_at=excluded.indexed_at
                 """,
                 (p_str, mtime, size, w, h, result["kind"], result["textiness"],
-                 result["quality_score"], result["dup_group"], ocr_txt, now),
+                 result["quality_score"], result["dup_group"], result["hash64"], ocr_txt, now),
             )
 
-            # Update OCR full-text index.
-            conn.execute("DELETE FROM ocr_fts WHERE path=?", (p_str,))
-            if ocr_txt:
-                conn.execute(
-                    "INSERT INTO ocr_fts(path, ocr_text) VALUES(?, ?)", (p_str, ocr_txt)
-                )
+            # (ocr_fts follows assets.ocr_text via triggers.)
+            asset_id = conn.execute("SELECT id FROM assets WHERE path=?", (p_str,)).fetchone()[0]
+            save_ocr_lines(conn, asset_id, result["ocr_lines"])
 
             if p_str in path_to_idx:
                 vecs[path_to_idx[p_str]] = vec
@@ -551,10 +2719,9 @@ def index(folder: tuple[Path, ...], device: str, ocr: bool, recent_only: bool, m
         removed = len(paths_list) - len(keep_indices)
         if removed > 0:
             removed_paths = [p for p in paths_list if p not in seen]
-            # Remove from DB + FTS.
+            # Remove from DB (triggers drop the FTS rows).
             for rp in removed_paths:
                 conn.execute("DELETE FROM assets WHERE path=?", (rp,))
-                conn.execute("DELETE FROM ocr_fts WHERE path=?", (rp,))
 
             paths_list = [paths_list[i] for i in keep_indices]
             vecs = [vecs[i] for i in keep_indices]
@@ -565,19 +2732,72 @@ def index(folder: tuple[Path, ...], device: str, ocr: bool, recent_only: bool, m
         raise click.ClickException("No embeddings produced. Check supported file types.")
 
     embs = np.stack(vecs).astype("float32")
-    np.save(paths.embeddings, embs)
+    stage_done("embed", total_count)
+
+    # A different hash kind makes stored hashes incomparable: rehash the rest, regroup all.
+    changed = {str(p) for p, _, _ in to_process}
+    if hash_kind != prev_hash_kind:
+        stale = [p for p in paths_list if p not in changed]
+        console.print(f"[dim]Rehashing {len(stale)} images with {hash_kind}…[/dim]")
+        rehash_assets(conn, stale, hash_kind)
+        changed = set(paths_list)
+
+    # Near-duplicate groups; representatives go first so searches scan a prefix.
+    order, n_reps = compute_dup_groups(conn, paths_list, embs, changed)
+    embs = embs[order]
+    paths_list = [paths_list[i] for i in order]
+    stage_done("groups", len(changed))
+
+    # Lens labels: the rows indexed in this run (everything when the lens set changed).
+    relabel = meta.get("lenses") != LENS_VERSION
+    if not relabel:
+        lens_rows = np.array(sorted(i for i, p in enumerate(paths_list) if p in changed), dtype=np.int64)
+    else:
+        lens_rows = np.arange(len(paths_list))
+    if len(lens_rows):
+        probs = classify_lenses(embs[lens_rows], lens_matrix(model, tokenizer, device))
+        save_lenses(conn, paths_list, lens_rows, probs)
+    meta["lenses"] = LENS_VERSION
+    stage_done("lenses", len(lens_rows))
+
+    # Related-images graph over the searchable rows (incremental).
+    n_knn = update_knn(conn, paths_list, n_reps, embs, changed)
+    stage_done("related", n_knn)
+
+    # Standing queries: only the images indexed in this run are checked.
+    indexed_now = {str(p) for p, _, _ in to_process}
+    standing = match_standing_queries(conn, paths_list, embs, indexed_now)
+    stage_done("standing", len(indexed_now))
+
+    update_index_stats(conn, meta["roots"], embs.shape[0], n_reps)
+
+    save_npy_atomic(paths.embeddings, embs)
+    save_store_codes(paths, embs, meta["store"]["tier"])
     meta["paths"] = paths_list
+    meta["n_reps"] = n_reps
+    # Bumped whenever search results can differ; server-side result caches are keyed by it.
+    if added or updated or removed or relabel or hash_kind != prev_hash_kind or meta["store"]["tier"] != prev_tier:
+        meta["generation"] = int(meta.get("generation", 0)) + 1
     paths.meta.write_text(json.dumps(meta, indent=2))
+    stage_done("save", embs.shape[0])
+    emit("done", images=int(embs.shape[0]), added=added, updated=updated, removed=removed, skipped=skipped,
+         searchable=n_reps, watches=standing, seconds=round(time.perf_counter() - t_start, 3))
 
     console.print(
         f"[green]Done[/green]. Total {embs.shape[0]} images. +{added} new, ~{updated} updated, -{removed} removed, ={skipped} unchanged."
     )
-    console.print(f"Embeddings: {paths.embeddings}")
+    console.print(f"Groups:     {n_reps} searchable ({embs.shape[0] - n_reps} near-duplicates folded)")
+    counts = lens_counts(conn)
+    console.print("Lenses:     " + (", ".join(f"{l.name} {counts[l.name]}" for l in LENSES if counts.get(l.name)) or "none"))
+    if standing:
+        console.print("Watches:    " + ", ".join(f"{name} +{n}" for name, n in standing.items()))
+    console.print(f"Embeddings: {paths.embeddings} ({meta['store']['tier']})")
     console.print(f"DB:         {paths.db}")
+    (thumb_cache or ThumbCache(paths.thumbs)).prune(thumb_budget(embs.shape[0], meta.get("thumb_budget_mb")))
 
 
 @cli.command()
-@click.argument("query", type=str)
+@click.argument("query", type=str, required=False)
 @click.option("--k", type=int, default=12, show_default=True)
 @click.option(
     "--device",
@@ -619,8 +2839,20 @@ def index(folder: tuple[Path, ...], device: str, ocr: bool, recent_only: bool, m
     default=None,
     help="Reveal the Nth result in Finder (1-based) after searching.",
 )
+@click.option(
+    "--queries-file",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    default=None,
+    help="Run every query in FILE (one per line) as a batch; prints JSON lines.",
+)
+@click.option("--folder", "folders", multiple=True, help="Only images under this folder (repeatable).")
+@click.option("--kind", "kinds", multiple=True, help="Only images of this kind, e.g. screenshot (repeatable).")
+@click.option("--since", type=click.DateTime(), default=None, help="Only images modified at or after this date.")
+@click.option("--until", type=click.DateTime(), default=None, help="Only images modified before this date.")
+@click.option("--min-quality", type=float, default=None, help="Only images with quality_score >= this (0..1).")
+@click.option("--with-ocr/--without-ocr", "has_ocr", default=None, help="Only images with (or without) OCR text.")
 def search(
-    query: str,
+    query: str | None,
     k: int,
     device: str,
     mode: str,
@@ -628,187 +2860,61 @@ def search(
     why: bool,
     open_rank: int | None,
     reveal_rank: int | None,
+    queries_file: Path | None,
+    folders: tuple[str, ...],
+    kinds: tuple[str, ...],
+    since: datetime | None,
+    until: datetime | None,
+    min_quality: float | None,
+    has_ocr: bool | None,
 ):
     """Search indexed images by text."""
 
     if device == "auto":
         device = "mps" if torch.backends.mps.is_available() else "cpu"
 
-    paths = get_dbpaths()
-    if not paths.embeddings.exists() or not paths.meta.exists():
-        raise click.ClickException("No index found. Run: merlian index <folder>")
-
-    meta = json.loads(paths.meta.read_text())
-    embs = load_embeddings(paths.embeddings)
-    if embs is None:
-        raise click.ClickException("No embeddings found. Run: merlian index <folder>")
-
-    paths_list: List[str] = meta.get("paths", [])
-    if len(paths_list) != embs.shape[0]:
-        raise click.ClickException(
-            "Index metadata mismatch. Re-run: merlian reset && merlian index <folder>"
-        )
+    flt = SearchFilter(
+        folders=tuple(folders),
+        kinds=tuple(kinds),
+        since=since.timestamp() if since else None,
+        until=until.timestamp() if until else None,
+        min_quality=min_quality,
+        has_ocr=has_ocr,
+    )
+    flt = flt if flt.active else None
 
-    # Build CLIP score
-    model_name = meta.get("model", {}).get("name", "ViT-B-32")
-    pretrained = meta.get("model", {}).get("pretrained", "laion2b_s34b_b79k")
+    if queries_file is not None:
+        _search_batch(_read_queries(queries_file), k, device, mode, ocr_weight, flt)
+        return
+    if not query:
+        raise click.UsageError("Provide QUERY or --queries-file.")
 
-    model, _, _ = open_clip.create_model_and_transforms(model_name, pretrained=pretrained)
-    tokenizer = open_clip.get_tokenizer(model_name)
-    model.to(device)
-    model.eval()
+    # Same ranking as /search and --queries-file: score_query over the near-duplicate
+    # group representatives (a duplicate's OCR match counts for its representative).
+    paths_list, store, path_index, model, tokenizer, conn = _open_for_queries(device)
+    sig = load_signals(conn, paths_list) if mode == "hybrid" or flt is not None else None
+    rows = filter_rows(sig, flt) if sig is not None else None
 
     q = text_embedding(model, tokenizer, device, query)
-
-    # Cosine similarity via dot product (vectors are normalized).
-    clip_scores = (embs @ q.reshape(-1, 1)).reshape(-1)
-
-    # Build OCR score using SQLite FTS5 (much better than naive substring matching).
-    # We score only files that match the OCR query, and normalize bm25 scores to 0..1.
-    q_tokens = [
-        t for t in re.split(r"[^a-zA-Z0-9]+", query.lower()) if len(t) >= 3 or t.isdigit()
-    ]
-    ocr_scores = np.zeros_like(clip_scores)
-    ocr_hits: dict[str, list[str]] = {}
-
-    if q_tokens:
-        conn = sqlite3.connect(paths.db)
-
-        # Prefer AND for precision; fall back to OR if nothing matches.
-        match_and = " AND ".join(q_tokens)
-        match_or = " OR ".join(q_tokens)
-
-        try:
-            rows = conn.execute(
-                """
-                SELECT path, bm25(ocr_fts) as score
-                FROM ocr_fts
-                WHERE ocr_fts MATCH ?
-                ORDER BY score
-                LIMIT 2000
-                """,
-                (match_and,),
-            ).fetchall()
-
-            if not rows and len(q_tokens) > 1:
-                rows = conn.execute(
-                    """
-                    SELECT path, bm25(ocr_fts) as score
-                    FROM ocr_fts
-                    WHERE ocr_fts MATCH ?
-                    ORDER BY score
-                    LIMIT 2000
-                    """,
-                    (match_or,),
-                ).fetchall()
-
-            # Some SQLite builds/tokenizers can be surprisingly bad at indexing pure-number tokens.
-            # If FTS yields nothing and the query contains digits (e.g. "403"), fall back to LIKE.
-            if not rows:
-                digit_tokens = [t for t in q_tokens if t.isdigit()]
-                if digit_tokens:
-                    clauses = " OR ".join(["ocr_text LIKE ?" for _ in digit_tokens])
-                    like_args = [f"%{t}%" for t in digit_tokens]
-                    like_rows = conn.execute(
-                        f"SELECT path FROM assets WHERE {clauses} LIMIT 2000",
-                        tuple(like_args),
-                    ).fetchall()
-                    if like_rows:
-                        # Give a decent OCR score to digit matches.
-                        for (p,) in like_rows:
-                            try:
-                                i = paths_list.index(str(p))
-                                ocr_scores[i] = max(ocr_scores[i], 0.95)
-                            except ValueError:
-                                pass
-                        if why:
-                            for (p,) in like_rows[: min(len(like_rows), k * 5)]:
-                                ocr_hits[str(p)] = digit_tokens
-
-            # bm25: lower is better; convert to 0..1 where 1 is best.
-            if rows:
-                raw = np.array([float(r[1]) for r in rows], dtype="float32")
-                best = float(raw.min())
-                worst = float(raw.max())
-                denom = max(1e-6, worst - best)
-
-                score_map = {}
-                for (p, s) in rows:
-                    s = float(s)
-                    norm = 1.0 - ((s - best) / denom)
-                    score_map[str(p)] = float(norm)
-
-                for i, p in enumerate(paths_list):
-                    v = score_map.get(p)
-                    if v is not None:
-                        ocr_scores[i] = v
-
-                if why:
-                    # Fetch snippets for the top candidates we might display.
-                    # For debug only — keep it lightweight.
-                    top_paths = [p for (p, _) in rows[: min(len(rows), k * 5)]]
-                    ph = ",".join("?" for _ in top_paths)
-                    texts = conn.execute(
-                        f"SELECT path, COALESCE(ocr_text,'') FROM assets WHERE path IN ({ph})",
-                        tuple(top_paths),
-                    ).fetchall()
-                    for p, txt in texts:
-                        txt_l = (txt or "").lower()
-                        ocr_hits[str(p)] = [t for t in q_tokens if t in txt_l]
-
-        except sqlite3.OperationalError:
-            # FTS not available; fall back to naive matching.
-            rows = conn.execute("SELECT path, COALESCE(ocr_text, '') FROM assets").fetchall()
-            ocr_map = {p: (txt or "").lower() for p, txt in rows}
-            for i, p in enumerate(paths_list):
-                txt = ocr_map.get(p, "")
-                if not txt:
-                    continue
-                hits = sum(1 for t in q_tokens if t in txt)
-                ocr_scores[i] = hits / max(1, len(q_tokens))
-                if why and hits:
-                    ocr_hits[p] = [t for t in q_tokens if t in txt]
-
-    # Choose scoring mode
-    if mode == "clip":
-        scores = clip_scores
-    elif mode == "ocr":
-        scores = ocr_scores
-    else:
-        # hybrid
-        w = float(ocr_weight)
-
-        # Auto-boost OCR for “texty” queries (very common for screenshots):
-        # - contains digits (error codes, amounts, dates)
-        # - contains likely keywords
-        q_lower = query.lower()
-        has_digits = any(ch.isdigit() for ch in query)
-        texty_keywords = [
-            "error",
-            "code",
-            "http",
-            "forbidden",
-            "denied",
-            "invoice",
-            "receipt",
-            "total",
-            "$",
-            "usd",
-            "cad",
-        ]
-        looks_texty = has_digits or any(k in q_lower for k in texty_keywords)
-
-        if looks_texty:
-            w = max(w, 0.80)
-
-        w = 0.0 if w < 0 else (1.0 if w > 1 else w)
-        scores = (1.0 - w) * clip_scores + w * ocr_scores
-
-    topk = np.argsort(-scores)[:k]
+    clip_scores = store.scores(q, rerank=max(STORE_RERANK, k * 5), rows=rows)
+    ranked = score_query(query, clip_scores, conn, path_index, sig, mode, ocr_weight, k, rows=rows)
+    topk = ranked["top"]
+
+    why_tokens: dict[str, list[str]] = {}
+    if why and ranked["q_tokens"] and len(topk):
+        top_paths = [paths_list[int(i)] for i in topk]
+        ph = ",".join("?" for _ in top_paths)
+        for p, txt in conn.execute(
+            f"SELECT path, COALESCE(ocr_text, '') FROM assets WHERE path IN ({ph})", tuple(top_paths)
+        ):
+            txt_l = txt.lower()
+            why_tokens[p] = [
+                t for t in ranked["q_tokens"] if t in txt_l or _fuzzy_sim(t, txt_l) >= FUZZY_MIN_SIM
+            ]
 
     title_extra = ""
-    if mode == "hybrid":
-        title_extra = f" w={w:.2f}"
+    if ranked["ocr_weight"] is not None:
+        title_extra = f" w={ranked['ocr_weight']:.2f}"
 
     table = Table(title=f"Merlian results for: {query!r} ({mode}{title_extra})")
     table.add_column("rank", justify="right")
@@ -821,18 +2927,17 @@ def search(
 
     ranked_paths: List[str] = []
     for rank, idx_id in enumerate(topk, start=1):
-        p = paths_list[idx_id]
+        p = paths_list[int(idx_id)]
         ranked_paths.append(p)
 
         row = [
             str(rank),
-            f"{float(scores[idx_id]):.3f}",
-            f"{float(clip_scores[idx_id]):.3f}",
-            f"{float(ocr_scores[idx_id]):.2f}",
+            f"{float(ranked['scores'][idx_id]):.3f}",
+            f"{float(ranked['clip'][idx_id]):.3f}",
+            f"{float(ranked['ocr'][idx_id]):.2f}",
         ]
         if why:
-            row.append(", ".join(ocr_hits.get(p, []))
-            )
+            row.append(", ".join(why_tokens.get(p, [])))
         row.append(p)
         table.add_row(*row)
 
@@ -859,6 +2964,134 @@ def search(
         subprocess.run(["open", "-R", target_reveal], check=False)
 
 
+def _open_for_queries(device: str):
+    """(rep paths, rep store, path_index, model, tokenizer, conn) for the batch-style CLI commands."""
+    paths = get_dbpaths()
+    if not paths.embeddings.exists() or not paths.meta.exists():
+        raise click.ClickException("No index found. Run: merlian index <folder>")
+
+    meta = json.loads(paths.meta.read_text())
+    store = load_store(paths, meta)
+    paths_list: List[str] = meta.get("paths", [])
+    if store is None or len(paths_list) != store.n:
+        raise click.ClickException(
+            "Index metadata mismatch. Re-run: merlian reset && merlian index <folder>"
+        )
+
+    model_name = meta.get("model", {}).get("name", "ViT-B-32")
+    pretrained = meta.get("model", {}).get("pretrained", "laion2b_s34b_b79k")
+    model, _, _ = open_clip.create_model_and_transforms(model_name, pretrained=pretrained)
+    tokenizer = open_clip.get_tokenizer(model_name)
+    model.to(device)
+    model.eval()
+
+    conn = sqlite3.connect(paths.db)
+    r = search_row_count(meta, store.n)
+    return paths_list[:r], store.head(r), search_rows(conn, paths_list[:r]), model, tokenizer, conn
+
+
+def _read_queries(queries_file: Path) -> List[str]:
+    return [
+        ln.strip() for ln in queries_file.read_text().splitlines()
+        if ln.strip() and not ln.strip().startswith("#")
+    ]
+
+
+def _search_batch(
+    queries: List[str], k: int, device: str, mode: str, ocr_weight: float, flt: SearchFilter | None = None
+) -> None:
+    """`search --queries-file`: one batched encode, one matrix product per SEARCH_BATCH queries,
+    the same hybrid ranking as the API's /search. Emits one JSON object per query."""
+    paths_list, store, path_index, model, tokenizer, conn = _open_for_queries(device)
+    sig = load_signals(conn, paths_list) if mode == "hybrid" or flt is not None else None
+    rows = filter_rows(sig, flt) if sig is not None else None
+
+    for s in range(0, len(queries), SEARCH_BATCH):
+        chunk = queries[s : s + SEARCH_BATCH]
+        Q = text_embeddings(model, tokenizer, device, chunk)
+        clip_mat = store.scores_batch(Q, rerank=max(STORE_RERANK, k * 5), rows=rows)
+        for j, query in enumerate(chunk):
+            ranked = score_query(query, clip_mat[j], conn, path_index, sig, mode, ocr_weight, k, rows=rows)
+            results = [
+                {
+                    "rank": rank,
+                    "path": paths_list[int(i)],
+                    "score": round(float(ranked["scores"][int(i)]), 6),
+                    "clip": round(float(ranked["clip"][int(i)]), 6),
+                    "ocr": round(float(ranked["ocr"][int(i)]), 6),
+                }
+                for rank, i in enumerate(ranked["top"], start=1)
+            ]
+            click.echo(json.dumps({"query": query, "results": results}))
+
+
+@cli.command()
+@click.option(
+    "--queries-file",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    required=True,
+    help="Benchmark queries, one per line.",
+)
+@click.option("--k", type=int, default=12, show_default=True)
+@click.option(
+    "--device",
+    type=click.Choice(["auto", "cpu", "mps"]),
+    default="auto",
+    show_default=True,
+)
+@click.option("--ocr-weight", type=float, default=0.55, show_default=True)
+def bench(queries_file: Path, k: int, device: str, ocr_weight: float):
+    """Compare the hybrid planner against the dense path (same top-k? how fast?)."""
+    if device == "auto":
+        device = "mps" if torch.backends.mps.is_available() else "cpu"
+
+    queries = _read_queries(queries_file)
+    paths_list, store, path_index, model, tokenizer, conn = _open_for_queries(device)
+    sig = load_signals(conn, paths_list)
+
+    dense_ms: List[float] = []
+    plan_ms: List[float] = []
+    planned = 0
+    mismatches: List[str] = []
+    for s in range(0, len(queries), SEARCH_BATCH):
+        chunk = queries[s : s + SEARCH_BATCH]
+        clip_mat = store.scores_batch(text_embeddings(model, tokenizer, device, chunk))
+        for j, query in enumerate(chunk):
+            clip_scores = clip_mat[j]
+            hit_idx, hit_val = ocr_hits(conn, query_tokens(query), path_index)
+
+            t0 = time.perf_counter()
+            ocr = np.zeros(len(clip_scores), dtype="float32")
+            ocr[hit_idx] = hit_val
+            scores, _ = hybrid_scores(clip_scores, ocr, sig, query, ocr_weight)
+            dense_top = rank_top(scores, k)
+            t1 = time.perf_counter()
+            plan = plan_hybrid(query, clip_scores, hit_idx, hit_val, sig, ocr_weight, k)
+            if plan is not None:
+                cand, cand_scores, _ = plan
+                plan_top = cand[rank_top(cand_scores, k)]
+            else:
+                plan_top = dense_top
+            t2 = time.perf_counter()
+
+            dense_ms.append((t1 - t0) * 1000.0)
+            plan_ms.append((t2 - t1) * 1000.0)
+            planned += int(plan is not None)
+            if list(dense_top) != list(plan_top):
+                mismatches.append(query)
+
+    table = Table(title=f"Hybrid planner vs dense ({len(queries)} queries, {len(paths_list)} assets, k={k})")
+    table.add_column("metric")
+    table.add_column("value")
+    table.add_row("same top-k", f"{len(queries) - len(mismatches)}/{len(queries)}")
+    table.add_row("planned (no dense fallback)", f"{planned}/{len(queries)}")
+    table.add_row("dense rank ms (median)", f"{float(np.median(dense_ms)):.2f}" if dense_ms else "-")
+    table.add_row("planner rank ms (median)", f"{float(np.median(plan_ms)):.2f}" if plan_ms else "-")
+    console.print(table)
+    for q in mismatches:
+        console.print(f"[red]mismatch[/red] {q!r}")
+
+
 @cli.command()
 def status():
     """Show current index status."""
@@ -871,14 +3104,14 @@ def status():
     meta = json.loads(paths.meta.read_text())
     root = meta.get("root")
     model = meta.get("model", {})
-    embs = load_embeddings(paths.embeddings)
-    n_embs = int(embs.shape[0]) if embs is not None else 0
+    store = load_store(paths, meta, mmap=True)  # sizes only; nothing is scanned
+    n_embs = store.n if store is not None else 0
 
     conn = sqlite3.connect(paths.db)
-    total = conn.execute("SELECT count(*) FROM assets").fetchone()[0]
-    with_ocr = conn.execute(
-        "SELECT count(*) FROM assets WHERE length(coalesce(ocr_text,'')) > 0"
-    ).fetchone()[0]
+    ensure_schema(conn)
+    stats = library_stats(conn)
+    total = stats.get("all", {}).get("assets", 0)
+    with_ocr = stats.get("ocr", {}).get("with_text", 0)
 
     table = Table(title="Merlian index status")
     table.add_column("field")
@@ -888,19 +3121,304 @@ def status():
     table.add_row("assets (db)", str(total))
     table.add_row("with OCR", str(with_ocr))
     table.add_row("embeddings", str(n_embs))
+    table.add_row("searchable", f"{search_row_count(meta, n_embs)} (near-duplicates folded)")
+    lenses = stats.get("lens", {})
+    table.add_row("lenses", ", ".join(f"{l.name} {lenses[l.name]}" for l in LENSES if lenses.get(l.name)) or "-")
+    if store is not None:
+        st = store.stats()
+        table.add_row("store tier", st["tier"])
+        table.add_row(
+            "store memory",
+            f"{st['resident_bytes'] / 1e6:.2f} MB resident ({st['bytes_per_row']:.0f} B/image; float32 {st['float32_bytes'] / 1e6:.2f} MB)",
+        )
     table.add_row("db path", str(paths.db))
     table.add_row("embeddings path", str(paths.embeddings))
 
     console.print(table)
 
 
+@cli.command("store")
+@click.argument("tier", type=click.Choice(STORE_TIERS))
+def store_cmd(tier: str):
+    """Switch the embedding store tier of the current index (no re-indexing)."""
+    paths = get_dbpaths()
+    if not paths.embeddings.exists() or not paths.meta.exists():
+        raise click.ClickException("No index found. Run: merlian index <folder>")
+
+    meta = json.loads(paths.meta.read_text())
+    embs = load_embeddings(paths.embeddings)
+    t0 = time.perf_counter()
+    save_store_codes(paths, embs, tier)
+    meta["store"] = {"tier": tier}
+    meta["generation"] = int(meta.get("generation", 0)) + 1
+    paths.meta.write_text(json.dumps(meta, indent=2))
+
+    st = load_store(paths, meta).stats()
+    console.print(
+        f"[green]Store tier[/green] {tier}: {st['resident_bytes'] / 1e6:.2f} MB resident "
+        f"(float32 {st['float32_bytes'] / 1e6:.2f} MB), encoded in {time.perf_counter() - t0:.1f}s"
+    )
+
+
+@cli.command("find-duplicates")
+@click.option(
+    "--distance",
+    type=click.IntRange(0, 16),
+    default=DUP_HAMMING,
+    show_default=True,
+    help="Max Hamming distance between perceptual hashes.",
+)
+@click.option("--limit", type=int, default=50, show_default=True, help="Groups to print (largest first).")
+@click.option("--json", "as_json", is_flag=True, default=False, help="Print one JSON object per group.")
+def find_duplicates(distance: int, limit: int, as_json: bool):
+    """List groups of images whose perceptual hashes are within --distance bits."""
+    paths = get_dbpaths()
+    if not paths.db.exists():
+        raise click.ClickException("No index found. Run: merlian index <folder>")
+
+    conn = sqlite3.connect(paths.db)
+    ensure_schema(conn)
+    t0 = time.perf_counter()
+    _, a_paths, hashes, has = asset_hashes(conn)
+    rows = np.flatnonzero(has)
+    uniq, inv = np.unique(hashes[rows], return_inverse=True)
+    by_hash: dict[int, List[int]] = {}
+    for r, u in zip(rows.tolist(), inv.tolist()):
+        by_hash.setdefault(u, []).append(r)
+    # Identical hashes chain together; near ones link one member of each hash value.
+    pairs = [(ms[0], m) for ms in by_hash.values() for m in ms[1:]]
+    pairs += [(by_hash[a][0], by_hash[b][0]) for a, b in HammingIndex(uniq, distance).pairs().tolist()]
+    groups = union_find_groups(len(a_paths), pairs)
+    ms = (time.perf_counter() - t0) * 1000
+
+    for g in groups[: max(0, limit)]:
+        members = sorted(a_paths[i] for i in g)
+        if as_json:
+            click.echo(json.dumps({"size": len(members), "hash": f"{int(hashes[g[0]]):016x}", "paths": members}))
+        else:
+            table = Table(title=f"{len(members)} images")
+            table.add_column("path")
+            table.add_column("hash")
+            for i in sorted(g, key=lambda i: a_paths[i]):
+                table.add_row(a_paths[i], f"{int(hashes[i]):016x}")
+            console.print(table)
+    if not as_json:
+        console.print(
+            f"[dim]{len(groups)} groups, {sum(len(g) for g in groups)} images within {distance} bits "
+            f"({len(rows)} hashed, {ms:.1f} ms)[/dim]"
+        )
+
+
+@cli.command()
+@click.argument("path", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option("--text", default=None, help="Also match this text query (blended with the image).")
+@click.option("--text-weight", type=click.FloatRange(0.0, 1.0), default=0.5, show_default=True)
+@click.option("--k", type=int, default=12, show_default=True)
+@click.option(
+    "--device",
+    type=click.Choice(["auto", "cpu", "mps"]),
+    default="auto",
+    show_default=True,
+)
+@click.option("--json", "as_json", is_flag=True, default=False, help="Print one JSON object per result.")
+def similar(path: Path, text: str | None, text_weight: float, k: int, device: str, as_json: bool):
+    """Images that look like PATH.
+
+    An indexed image is looked up by its stored embedding (no model load); any other
+    image file is encoded first.
+    """
+    paths = get_dbpaths()
+    if not paths.embeddings.exists() or not paths.meta.exists():
+        raise click.ClickException("No index found. Run: merlian index <folder>")
+
+    meta = json.loads(paths.meta.read_text())
+    store = load_store(paths, meta)
+    paths_list: List[str] = meta.get("paths", [])
+    if store is None or len(paths_list) != store.n:
+        raise click.ClickException(
+            "Index metadata mismatch. Re-run: merlian reset && merlian index <folder>"
+        )
+
+    conn = sqlite3.connect(paths.db)
+    n_search = search_row_count(meta, store.n)
+    path_index = search_rows(conn, paths_list[:n_search])
+    p = str(path.resolve())
+    row = example_row(paths_list, path_index, n_search, p)
+
+    model = preprocess = tokenizer = None
+    if row is None or text:
+        if device == "auto":
+            device = "mps" if torch.backends.mps.is_available() else "cpu"
+        model_name = meta.get("model", {}).get("name", "ViT-B-32")
+        pretrained = meta.get("model", {}).get("pretrained", "laion2b_s34b_b79k")
+        model, _, preprocess = open_clip.create_model_and_transforms(model_name, pretrained=pretrained)
+        tokenizer = open_clip.get_tokenizer(model_name)
+        model.to(device)
+        model.eval()
+
+    vec = store.vector(row) if row is not None else image_embedding(model, preprocess, device, path)
+    if vec is None:
+        raise click.ClickException(f"Cannot read image: {path}")
+    t_vec = text_embedding(model, tokenizer, device, text) if text else None
+
+    scores = similarity_scores(store.head(n_search), vec, t_vec, text_weight, rerank=max(STORE_RERANK, (k + 1) * 5))
+    own = path_index.get(p)
+    if own is not None:
+        scores[own] = -np.inf  # the image itself (and its near-duplicates)
+    top = [int(i) for i in np.argsort(-scores)[:k] if np.isfinite(scores[i])]
+
+    if as_json:
+        for i in top:
+            click.echo(json.dumps({"path": paths_list[i], "score": round(float(scores[i]), 4)}))
+        return
+    title = f"Like {p}" + (f" + {text!r} (w={text_weight:.2f})" if text else "")
+    table = Table(title=title + ("" if row is not None else " (encoded)"))
+    table.add_column("rank", justify="right")
+    table.add_column("score", justify="right")
+    table.add_column("path")
+    for rank, i in enumerate(top, start=1):
+        table.add_row(str(rank), f"{float(scores[i]):.3f}", paths_list[i])
+    console.print(table)
+
+
+@cli.group()
+def watch():
+    """Standing queries: saved searches checked against newly indexed images."""
+
+
+@watch.command("add")
+@click.argument("name")
+@click.option("--query", "query", default=None, help="Text query (CLIP), e.g. 'analytics dashboard'.")
+@click.option("--like", "like", type=click.Path(exists=True, dir_okay=False, path_type=Path), default=None,
+              help="Match images that look like this one.")
+@click.option("--ocr", default=None, help="Words that must all appear in the OCR text, e.g. 'invoice'.")
+@click.option("--kind", "kinds", multiple=True, help="Only images of this kind, e.g. screenshot (repeatable).")
+@click.option("--min-score", type=float, default=None,
+              help=f"Cosine threshold (default {STANDING_TEXT_MIN} for --query, {STANDING_EXAMPLE_MIN} for --like).")
+@click.option(
+    "--device",
+    type=click.Choice(["auto", "cpu", "mps"]),
+    default="auto",
+    show_default=True,
+)
+def watch_add(name: str, query: str | None, like: Path | None, ocr: str | None, kinds: tuple[str, ...],
+              min_score: float | None, device: str):
+    """Save standing query NAME; later index runs record the new images it matches."""
+    if query and like:
+        raise click.UsageError("Use only one of --query or --like.")
+    paths = get_dbpaths()
+    if not paths.embeddings.exists() or not paths.meta.exists():
+        raise click.ClickException("No index found. Run: merlian index <folder>")
+    meta = json.loads(paths.meta.read_text())
+    conn = sqlite3.connect(paths.db)
+    ensure_schema(conn)
+
+    vec = None
+    if like is not None:
+        store = load_store(paths, meta)
+        paths_list: List[str] = meta.get("paths", [])
+        n_search = search_row_count(meta, store.n)
+        p = str(like.resolve())
+        row = example_row(paths_list, search_rows(conn, paths_list[:n_search]), n_search, p)
+        if row is not None:
+            vec = store.vector(row)
+    if query or (like is not None and vec is None):
+        if device == "auto":
+            device = "mps" if torch.backends.mps.is_available() else "cpu"
+        model_name, pretrained, model, preprocess, tokenizer = load_model(device=device)
+        vec = text_embedding(model, tokenizer, device, query) if query else image_embedding(model, preprocess, device, like)
+        if vec is None:
+            raise click.ClickException(f"Cannot read image: {like}")
+    if min_score is None and vec is not None:
+        min_score = STANDING_EXAMPLE_MIN if like is not None else STANDING_TEXT_MIN
+    try:
+        qid = save_standing_query(conn, name, query or (str(like) if like else None), vec, ocr, kinds, min_score)
+    except ValueError as e:
+        raise click.UsageError(f"{e} (use --query, --like and/or --ocr)")
+    console.print(f"[green]Saved[/green] standing query {name!r} (#{qid}); new images are checked on each index run.")
+
+
+@watch.command("list")
+def watch_list():
+    """List standing queries with their unseen match counts."""
+    paths = get_dbpaths()
+    if not paths.db.exists():
+        raise click.ClickException("No index found. Run: merlian index <folder>")
+    conn = sqlite3.connect(paths.db)
+    ensure_schema(conn)
+    unseen = dict(conn.execute("SELECT query_id, count(*) FROM standing_matches WHERE seen = 0 GROUP BY query_id"))
+    table = Table(title="Standing queries")
+    for c in ("name", "query", "ocr", "kinds", "min score", "unseen"):
+        table.add_column(c)
+    for q in standing_queries(conn):
+        table.add_row(q.name, q.query or "", q.fts or "", ",".join(q.kinds),
+                      "" if q.min_score is None else f"{q.min_score:.2f}", str(unseen.get(q.id, 0)))
+    console.print(table)
+
+
+@watch.command("remove")
+@click.argument("name")
+def watch_remove(name: str):
+    """Delete standing query NAME and its matches."""
+    paths = get_dbpaths()
+    conn = sqlite3.connect(paths.db)
+    ensure_schema(conn)
+    n = conn.execute("DELETE FROM standing_queries WHERE name = ?", (name,)).rowcount
+    conn.commit()
+    if not n:
+        raise click.ClickException(f"No standing query named {name!r}.")
+    console.print(f"Removed {name!r}")
+
+
+@watch.command("matches")
+@click.argument("name", required=False)
+@click.option("--unseen", is_flag=True, default=False, help="Only matches not yet marked seen.")
+@click.option("--mark-seen", is_flag=True, default=False, help="Mark the listed matches as seen.")
+@click.option("--limit", type=int, default=50, show_default=True)
+@click.option("--json", "as_json", is_flag=True, default=False, help="Print one JSON object per match.")
+def watch_matches(name: str | None, unseen: bool, mark_seen: bool, limit: int, as_json: bool):
+    """New images matched by standing queries (all, or NAME), newest first."""
+    paths = get_dbpaths()
+    if not paths.db.exists():
+        raise click.ClickException("No index found. Run: merlian index <folder>")
+    conn = sqlite3.connect(paths.db)
+    ensure_schema(conn)
+    qid = None
+    if name:
+        row = conn.execute("SELECT id FROM standing_queries WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise click.ClickException(f"No standing query named {name!r}.")
+        qid = row[0]
+    rows = standing_matches(conn, qid, unseen, limit)
+    if mark_seen and rows:
+        conn.executemany(
+            "UPDATE standing_matches SET seen = 1 WHERE asset_id = (SELECT id FROM assets WHERE path = ?) "
+            "AND query_id = (SELECT id FROM standing_queries WHERE name = ?)",
+            [(p, n) for n, p, *_ in rows],
+        )
+        conn.commit()
+    if as_json:
+        for n, p, sc, at, seen in rows:
+            click.echo(json.dumps({"query": n, "path": p, "score": sc, "matched_at": at, "seen": bool(seen)}))
+        return
+    table = Table(title="Standing query matches")
+    for c in ("query", "score", "matched", "path"):
+        table.add_column(c)
+    for n, p, sc, at, seen in rows:
+        table.add_row(n, f"{sc:.3f}", at[:19] + ("" if seen else " *"), p)
+    console.print(table)
+
+
 @cli.command()
 def reset():
     """Delete local index artifacts (repo-local)."""
     paths = get_dbpaths()
     if paths.root.exists():
         for p in paths.root.glob("*"):
-            p.unlink(missing_ok=True)
+            if p.is_dir():
+                shutil.rmtree(p, ignore_errors=True)  # e.g. thumbs/
+            else:
+                p.unlink(missing_ok=True)
         console.print(f"Removed {paths.root}")
 
 
@@ -16,28 +16,37 @@ Then:
 
 from __future__ import annotations
 
+from dataclasses import dataclass, field, replace
 from pathlib import Path
-from typing import Any, Literal
+from typing import Any, Callable, Iterator, Literal
 
+import hashlib
+import io
 import threading
 import time
 import uuid
 import re
+from urllib.parse import quote
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 
 from PIL import Image
-import io
 import os
 import subprocess
 import sys
 
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, Response
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
 # Cache CLIP model/tokenizer per device for reliability + speed.
-MODEL_CACHE: dict[str, tuple[str, str, Any, Any]] = {}
+MODEL_CACHE: dict[str, tuple[str, str, Any, Any, Any]] = {}
 MODEL_LOCK = threading.Lock()
 
+# Cache the opened index (store + ranking signals); reloaded when its files change on disk.
+INDEX_CACHE: dict[str, Any] = {}
+INDEX_LOCK = threading.Lock()
 from pydantic import BaseModel, Field
 
 
@@ -52,6 +61,33 @@ class Job(BaseModel):
     error: str | None = None
     started_at: float | None = None
     finished_at: float | None = None
+    stage: str | None = None
+    rate: float | None = None   # items/s in the current stage
+    eta_s: float | None = None
+
+
+@dataclass
+class JobState:
+    """Live job record, updated in place; each update is also queued as an event for /jobs/{id}/events."""
+
+    id: str
+    kind: str
+    status: str = "queued"
+    folder: str | None = None
+    processed: int = 0
+    total: int | None = None
+    message: str | None = None
+    error: str | None = None
+    started_at: float | None = None
+    finished_at: float | None = None
+    stage: str | None = None
+    rate: float | None = None
+    eta_s: float | None = None
+    seq: int = 0
+    events: deque = field(default_factory=lambda: deque(maxlen=512))
+
+    def snapshot(self) -> Job:
+        return Job(**{k: getattr(self, k) for k in Job.model_fields})
 
 # Ensure local imports work regardless of working directory.
 sys.path.insert(0, str(Path(__file__).parent))
@@ -61,6 +97,100 @@ import merlian as core
 
 app = FastAPI(title="Merlian Local API", version="0.1")
 
+# Query embeddings keyed by (model, pretrained, normalized query).
+TEXT_EMB_CACHE = core.LRUCache(maxsize=4096)
+# Search-as-you-type: latest sequence number per client (bounded; idle clients age out).
+INCREMENTAL_SEQ = core.LRUCache(maxsize=4096)
+INCREMENTAL_LOCK = threading.Lock()
+# Shortest cached prefix whose ranking /search/incremental reuses as a candidate set.
+INCREMENTAL_MIN_PREFIX = 3
+# Search responses keyed by index generation + normalized request (see _result_lookup).
+RESULT_CACHE = core.LRUCache(maxsize=512)
+# The SQLite OCR branch of a search runs here, overlapping the CLIP encode + scan.
+QUERY_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="merlian-ocr")
+# Result paths of recent searches by search_id (for /thumbs by search_id).
+SEARCH_RESULTS = core.LRUCache(maxsize=256)
+# Thumbnail rendering for /thumbs and the post-search prefetch.
+THUMB_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="merlian-thumb")
+# Results whose thumbnails are warmed as soon as a search returns.
+THUMB_PREFETCH = 24
+# Composed sprite sheets by content id.
+SPRITES = core.LRUCache(maxsize=32)
+# Deep rankings of recent searches by search_id, paged through by /search/more cursors.
+RANKINGS = core.LRUCache(maxsize=128, ttl=600.0)
+RANKING_DEPTH = 1000
+# CLIP candidates (plus every OCR hit) kept per search; its deep ranking is drawn from these.
+RANKING_CANDIDATES = 2 * RANKING_DEPTH
+
+
+class LatencyStats:
+    """Rolling per-stage latencies (last `window` searches) for p50/p99 reporting."""
+
+    def __init__(self, window: int = 1000):
+        self.samples: dict[str, deque] = {}
+        self.window = window
+        self.lock = threading.Lock()
+
+    def add(self, timings: dict[str, float]) -> None:
+        with self.lock:
+            for stage, ms in timings.items():
+                self.samples.setdefault(stage, deque(maxlen=self.window)).append(ms)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        with self.lock:
+            snap = {k: list(v) for k, v in self.samples.items()}
+        return {
+            stage: {
+                "n": len(v),
+                "p50_ms": round(float(core.np.percentile(v, 50)), 3),
+                "p99_ms": round(float(core.np.percentile(v, 99)), 3),
+            }
+            for stage, v in snap.items()
+            if v
+        }
+
+
+SEARCH_LATENCY = LatencyStats()
+
+
+class ReadPool:
+    """Per-thread read-only SQLite connections to the index database.
+
+    Connections stay open across requests, so each one's statement cache keeps the hot
+    queries prepared. A thread reconnects when the database file is replaced (reset /
+    re-index). Schema migrations still use a short-lived writable connection.
+    """
+
+    PRAGMAS = (
+        "PRAGMA query_only = 1",
+        "PRAGMA cache_size = -32768",     # 32 MB page cache per connection
+        "PRAGMA mmap_size = 268435456",   # read pages through a 256 MB memory map
+        "PRAGMA temp_store = MEMORY",
+    )
+
+    def __init__(self):
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.opened = 0
+
+    def get(self, db: Path) -> "core.sqlite3.Connection":
+        key = (str(db), db.stat().st_ino)
+        cur = getattr(self.local, "conn", None)
+        if cur is not None and cur[0] == key:
+            return cur[1]
+        if cur is not None:
+            cur[1].close()
+        conn = core.sqlite3.connect(db.as_uri() + "?mode=ro", uri=True, cached_statements=256)
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        self.local.conn = (key, conn)
+        with self.lock:
+            self.opened += 1
+        return conn
+
+
+DB_POOL = ReadPool()
+
 
 def _get_model(device: str, model_name: str, pretrained: str):
     key = f"{device}:{model_name}:{pretrained}"
@@ -68,7 +198,7 @@ def _get_model(device: str, model_name: str, pretrained: str):
         if key in MODEL_CACHE:
             return MODEL_CACHE[key]
 
-    model, _, _ = core.open_clip.create_model_and_transforms(
+    model, _, preprocess = core.open_clip.create_model_and_transforms(
         model_name, pretrained=pretrained
     )
     tok = core.open_clip.get_tokenizer(model_name)
@@ -76,10 +206,186 @@ def _get_model(device: str, model_name: str, pretrained: str):
     model.eval()
 
     with MODEL_LOCK:
-        MODEL_CACHE[key] = (model_name, pretrained, model, tok)
+        MODEL_CACHE[key] = (model_name, pretrained, model, tok, preprocess)
 
     return MODEL_CACHE[key]
 
+
+def _index_sig(paths) -> tuple[int, ...]:
+    """Cheap on-disk version of the index files (mtimes); the database is left out.
+
+    Database writes (standing queries, seen flags, indexer commits) do not reload the
+    index; changes that affect searches bump the generation in meta.json.
+    """
+    return tuple(
+        (p.stat().st_mtime_ns if p.exists() else 0)
+        for p in (paths.embeddings, paths.codes, paths.meta)
+    )
+
+
+@dataclass
+class IndexSnapshot:
+    """Everything a search needs from one on-disk version of the index."""
+
+    sig: tuple[int, ...]
+    paths: Any
+    meta: dict
+    store: Any          # every row
+    search_store: Any   # near-duplicate group representatives (a prefix of store)
+    paths_list: list[str]
+    path_index: dict[str, int]  # path -> search row (duplicates -> their representative)
+    signals: Any        # aligned with search_store
+
+
+def _open_index() -> IndexSnapshot | None:
+    """The current index, opened once per index generation; None if missing or inconsistent."""
+    paths = core.get_dbpaths()
+    if not paths.embeddings.exists() or not paths.meta.exists():
+        return None
+    sig = _index_sig(paths)
+    with INDEX_LOCK:
+        snap = INDEX_CACHE.get("snap")
+        if snap is not None and snap.sig == sig:
+            return snap
+
+        meta = core.json.loads(paths.meta.read_text())
+        if snap is not None and core.index_generation(meta) == core.index_generation(snap.meta):
+            # Files rewritten by an index run that changed nothing: keep the loaded index.
+            snap = INDEX_CACHE["snap"] = replace(snap, sig=sig, meta=meta)
+            return snap
+        store = core.load_store(paths, meta)
+        paths_list = list(meta.get("paths", []))
+        if store is None or len(paths_list) != store.n:
+            return None
+        conn = core.sqlite3.connect(paths.db)
+        try:
+            # Bring older databases up to the current schema (e.g. the OCR FTS layout).
+            core.ensure_schema(conn)
+        except core.sqlite3.OperationalError:
+            pass  # busy (indexer running); the indexer migrates on its own
+        n_search = core.search_row_count(meta, store.n)
+        snap = IndexSnapshot(
+            sig=sig,
+            paths=paths,
+            meta=meta,
+            store=store,
+            search_store=store.head(n_search),
+            paths_list=paths_list,
+            path_index=core.search_rows(conn, paths_list[:n_search]),
+            signals=core.load_signals(conn, paths_list[:n_search]),
+        )
+        conn.close()
+        INDEX_CACHE["snap"] = snap
+        return snap
+
+class TextEncodeBatcher:
+    """Micro-batches text encoding across concurrent requests.
+
+    Sync handlers run on a thread pool; instead of each calling encode_text with a
+    batch of one (and fighting over torch threads), they enqueue their query here.
+    A single worker waits `window_s` after the first arrival, encodes everything
+    queued as one batch per model and resolves each caller's Future. Identical
+    in-flight queries share one Future.
+    """
+
+    def __init__(self, window_s: float = 0.004, max_batch: int = 64):
+        self.window_s = window_s
+        self.max_batch = max_batch
+        self.cv = threading.Condition()
+        self.queue: list[tuple[tuple, str]] = []
+        self.inflight: dict[tuple, Future] = {}
+        self.worker: threading.Thread | None = None
+        self.batches = 0
+        self.encoded = 0
+        self.coalesced = 0
+
+    def encode(self, device: str, model_name: str, pretrained: str, query: str):
+        key = (device, model_name, pretrained, core.normalize_query(query))
+        with self.cv:
+            fut = self.inflight.get(key)
+            if fut is not None:
+                self.coalesced += 1
+            else:
+                fut = Future()
+                self.inflight[key] = fut
+                self.queue.append((key, query))
+                if self.worker is None:
+                    self.worker = threading.Thread(target=self._run, daemon=True)
+                    self.worker.start()
+                self.cv.notify()
+        return fut.result()
+
+    def _run(self) -> None:
+        while True:
+            with self.cv:
+                while not self.queue:
+                    self.cv.wait()
+                deadline = time.monotonic() + self.window_s
+                while len(self.queue) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.cv.wait(remaining)
+                batch = self.queue[: self.max_batch]
+                self.queue = self.queue[self.max_batch :]
+
+            by_model: dict[tuple, list[tuple[tuple, str]]] = {}
+            for key, query in batch:
+                by_model.setdefault(key[:3], []).append((key, query))
+
+            for (device, model_name, pretrained), items in by_model.items():
+                try:
+                    _, _, model, tokenizer, _ = _get_model(device, model_name, pretrained)
+                    vecs = core.text_embeddings(model, tokenizer, device, [q for _, q in items])
+                    results = [(key, vecs[i], None) for i, (key, _) in enumerate(items)]
+                except Exception as e:
+                    results = [(key, None, e) for key, _ in items]
+                with self.cv:
+                    self.batches += 1
+                    self.encoded += len(items)
+                    futs = [(self.inflight.pop(key), vec, err) for key, vec, err in results]
+                for fut, vec, err in futs:
+                    if err is not None:
+                        fut.set_exception(err)
+                    else:
+                        fut.set_result(vec)
+
+    def stats(self) -> dict[str, Any]:
+        with self.cv:
+            return {
+                "batches": self.batches,
+                "encoded": self.encoded,
+                "coalesced": self.coalesced,
+                "avg_batch": round(self.encoded / self.batches, 2) if self.batches else None,
+            }
+
+
+TEXT_ENCODER = TextEncodeBatcher()
+
+
+def _encode_query(device: str, model_name: str, pretrained: str, query: str):
+    """Text embedding for `query`: TEXT_EMB_CACHE first, else via the micro-batcher."""
+    key = (model_name, pretrained, core.normalize_query(query))
+    q = TEXT_EMB_CACHE.get(key)
+    if q is None:
+        q = TEXT_ENCODER.encode(device, model_name, pretrained, query)
+        TEXT_EMB_CACHE.put(key, q)
+    return q
+
+def _encode_queries(device: str, model_name: str, pretrained: str, queries: list[str]):
+    """Embeddings for many queries: cache hits reused, all misses encoded as one batch."""
+    keys = [(model_name, pretrained, core.normalize_query(q)) for q in queries]
+    vecs = [TEXT_EMB_CACHE.get(k) for k in keys]
+    missing = {k: q for k, q, v in zip(keys, queries, vecs) if v is None}
+    if missing:
+        _, _, model, tokenizer, _ = _get_model(device, model_name, pretrained)
+        enc = core.text_embeddings(model, tokenizer, device, list(missing.values()))
+        fresh = dict(zip(missing.keys(), enc))
+        for k, v in fresh.items():
+            TEXT_EMB_CACHE.put(k, v)
+        vecs = [v if v is not None else fresh[k] for k, v in zip(keys, vecs)]
+    return core.np.stack(vecs)
+
 # Dev-friendly: allow Vite dev server to call us.
 app.add_middleware(
     CORSMiddleware,
@@ -98,20 +404,89 @@ class IndexRequest(BaseModel):
     ocr: bool = True
     recent_only: bool = False
     max_items: int | None = Field(default=None, ge=1, le=5000)
+    store_tier: Literal["float32", "float16", "int8", "pq"] | None = None
+    thumbs: bool = True
 
 
 # In-memory job store (MVP)
-JOBS: dict[str, Job] = {}
+JOBS: dict[str, JobState] = {}
 JOB_LOCK = threading.Lock()
+# Signalled on every job update (wakes event streams).
+JOB_COND = threading.Condition(JOB_LOCK)
+JOB_TERMINAL = ("done", "error", "cancelled")
 JOB_PROCS: dict[str, subprocess.Popen] = {}
 
 
+class SearchFilters(BaseModel):
+    # Applied before the vector scan; every given predicate must hold.
+    folders: list[str] = Field(default_factory=list, max_length=64)
+    kinds: list[str] = Field(default_factory=list, max_length=16)
+    since: float | None = None        # unix seconds, mtime >= since
+    until: float | None = None        # unix seconds, mtime < until
+    min_quality: float | None = Field(default=None, ge=0.0, le=1.0)
+    has_ocr: bool | None = None
+
+    def to_core(self) -> "core.SearchFilter | None":
+        flt = core.SearchFilter(
+            folders=tuple(self.folders), kinds=tuple(self.kinds), since=self.since,
+            until=self.until, min_quality=self.min_quality, has_ocr=self.has_ocr,
+        )
+        return flt if flt.active else None
+
+
 class SearchRequest(BaseModel):
     query: str
     k: int = Field(default=12, ge=1, le=200)
     device: Literal["auto", "cpu", "mps"] = "auto"
     mode: Literal["clip", "ocr", "hybrid"] = "hybrid"
     ocr_weight: float = Field(default=0.55, ge=0.0, le=1.0)
+    filters: SearchFilters | None = None
+
+
+class BatchSearchRequest(BaseModel):
+    queries: list[str] = Field(min_length=1, max_length=1000)
+    k: int = Field(default=12, ge=1, le=200)
+    device: Literal["auto", "cpu", "mps"] = "auto"
+    mode: Literal["clip", "ocr", "hybrid"] = "hybrid"
+    ocr_weight: float = Field(default=0.55, ge=0.0, le=1.0)
+    filters: SearchFilters | None = None
+
+
+class SimilarRequest(BaseModel):
+    path: str
+    text: str | None = None
+    text_weight: float = Field(default=0.5, ge=0.0, le=1.0)
+    k: int = Field(default=12, ge=1, le=200)
+    device: Literal["auto", "cpu", "mps"] = "auto"
+    filters: SearchFilters | None = None
+
+
+class StandingQueryRequest(BaseModel):
+    name: str = Field(min_length=1, max_length=128)
+    query: str | None = None          # text query (CLIP)
+    like_path: str | None = None      # "anything like this": an indexed image
+    ocr: str | None = None            # words that must all appear in the OCR text
+    kinds: list[str] = Field(default_factory=list, max_length=16)
+    min_score: float | None = Field(default=None, ge=-1.0, le=1.0)
+    device: Literal["auto", "cpu", "mps"] = "auto"
+
+
+class MoreRequest(BaseModel):
+    cursor: str = Field(min_length=1, max_length=128)
+    k: int = Field(default=12, ge=1, le=200)
+
+
+class IncrementalSearchRequest(SearchRequest):
+    # Identifies one search box; a newer seq from the same client supersedes older ones.
+    client_id: str = Field(min_length=1, max_length=128)
+    seq: int = 0
+
+
+class ThumbsRequest(BaseModel):
+    paths: list[str] | None = Field(default=None, max_length=256)
+    search_id: str | None = None
+    max_px: int = Field(default=320, ge=1, le=1280)
+    limit: int = Field(default=64, ge=1, le=256)
 
 
 class OpenRequest(BaseModel):
@@ -123,7 +498,12 @@ def _normalize_path(p: str) -> Path:
     # Expand and normalize. No sandboxing yet (MVP), but we at least canonicalize.
     # Some frontend paths may accidentally append query params into this field (e.g. "...png?width=400").
     p = p.split("?", 1)[0]
-    return Path(os.path.expanduser(p)).resolve()
+    given = Path(os.path.abspath(os.path.expanduser(p)))
+    # Paths are indexed as walked, possibly under a symlinked folder; keep that spelling.
+    paths = core.get_dbpaths()
+    if paths.db.exists() and str(given) in _indexed_paths(paths):
+        return given
+    return given.resolve()
 
 
 def _require_localhost(req: Request) -> None:
@@ -132,14 +512,25 @@ def _require_localhost(req: Request) -> None:
         raise HTTPException(status_code=403, detail="localhost only")
 
 
+def _indexed_paths(paths) -> frozenset[str]:
+    """Every indexed path, loaded once per index generation."""
+    snap = _open_index()
+    sig = core.index_generation(snap.meta) if snap is not None else None
+    hit = INDEX_CACHE.get("allowlist")
+    if hit is not None and hit[0] == sig:
+        return hit[1]
+    allow = frozenset(p for (p,) in DB_POOL.get(paths.db).execute("SELECT path FROM assets"))
+    if sig is not None:  # no usable index (e.g. mid-write): read again next time
+        INDEX_CACHE["allowlist"] = (sig, allow)
+    return allow
+
+
 def _is_indexed(path: str) -> bool:
     # Only allow file operations on files that are already in the index.
     paths = core.get_dbpaths()
     if not paths.db.exists():
         return False
-    conn = core.sqlite3.connect(paths.db)
-    row = conn.execute("SELECT 1 FROM assets WHERE path=? LIMIT 1", (path,)).fetchone()
-    return row is not None
+    return path in _indexed_paths(paths)
 
 
 @app.get("/health")
@@ -157,19 +548,149 @@ def thumb(req: Request, path: str, max_px: int = 640, width: int | None = None)
     if not _is_indexed(normalized):
         raise HTTPException(status_code=403, detail="not indexed")
 
-    p = Path(normalized)
-    if not p.exists() or not p.is_file():
-        raise HTTPException(status_code=404, detail="file not found")
+    return _thumb_response(req, Path(normalized), width if width is not None else max_px)
+
 
+def _thumb_cache() -> "core.ThumbCache":
+    root = core.get_dbpaths().thumbs
+    cache = INDEX_CACHE.get("thumbs")
+    if cache is None or cache.root != root:
+        cache = INDEX_CACHE["thumbs"] = core.ThumbCache(root)
+    return cache
+
+
+def _thumb_response(req: Request, p: Path, px: int) -> Response:
+    """Cached JPEG thumbnail with ETag / Cache-Control; 304 when the client's copy is current."""
     try:
-        img = Image.open(p).convert("RGB")
-        target = width if width is not None else max_px
-        img.thumbnail((target, target))
-        buf = io.BytesIO()
-        img.save(buf, format="JPEG", quality=85)
-        return Response(content=buf.getvalue(), media_type="image/jpeg")
+        st = p.stat()
+    except OSError:
+        raise HTTPException(status_code=404, detail="file not found")
+    if not p.is_file():
+        raise HTTPException(status_code=404, detail="file not found")
+    size = core.thumb_size(max(1, int(px)))
+    key = core.thumb_key(p, size, st)
+    headers = {"ETag": f'"{key}"', "Cache-Control": "private, max-age=3600"}
+    inm = req.headers.get("if-none-match", "")
+    if inm.strip() == "*" or headers["ETag"] in [t.strip().removeprefix("W/") for t in inm.split(",")]:
+        return Response(status_code=304, headers=headers)
+    try:
+        data = _thumb_cache().get_or_render(p, size, key)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"cannot render: {e}")
+    return Response(content=data, media_type="image/jpeg", headers=headers)
+
+
+def _prefetch_thumbs(paths_list: list[str], px: int = 640) -> None:
+    """Warm the thumbnail cache for the first results in the background (size of `thumb_url`)."""
+    def run() -> None:
+        cache = _thumb_cache()
+        for p in paths_list:
+            try:
+                cache.get_or_render(Path(p), core.thumb_size(px))
+            except Exception:
+                pass
+
+    if paths_list:
+        THUMB_POOL.submit(run)
+
+
+def _batch_thumbs(req: ThumbsRequest) -> tuple[int, list[tuple[str, str, bytes]], list[str]]:
+    """(size, [(path, key, jpeg)], missing) for the paths (or search results) of a /thumbs request."""
+    if req.search_id is not None:
+        wanted = SEARCH_RESULTS.get(req.search_id)
+        if wanted is None:
+            raise HTTPException(status_code=404, detail="unknown or expired search_id")
+    elif req.paths is not None:
+        wanted = [str(_normalize_path(p)) for p in req.paths]
+    else:
+        raise HTTPException(status_code=422, detail="paths or search_id required")
+    wanted = wanted[: req.limit]
+
+    paths = core.get_dbpaths()
+    allow = _indexed_paths(paths) if paths.db.exists() else frozenset()
+    size = core.thumb_size(req.max_px)
+    cache = _thumb_cache()
+
+    def one(p: str):
+        if p not in allow:
+            return None
+        try:
+            key = core.thumb_key(Path(p), size)
+            return p, key, cache.get_or_render(Path(p), size, key)
+        except Exception:
+            return None
+
+    got = list(THUMB_POOL.map(one, wanted))
+    return size, [g for g in got if g is not None], [p for p, g in zip(wanted, got) if g is None]
+
+
+@app.post("/thumbs")
+def thumbs(http_req: Request, req: ThumbsRequest) -> Response:
+    """Many thumbnails in one multipart/mixed response (one JPEG part per path, in order).
+
+    Each part carries `Content-Location` (the equivalent /thumb URL) and `ETag`; paths that
+    are not indexed or cannot be rendered are listed in the `X-Missing` header (URL-quoted).
+    """
+    _require_localhost(http_req)
+    size, items, missing = _batch_thumbs(req)
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    for p, key, data in items:
+        body.write(
+            f"--{boundary}\r\nContent-Type: image/jpeg\r\n"
+            f"Content-Location: /thumb?path={quote(p)}&max_px={size}\r\n"
+            f'ETag: "{key}"\r\nContent-Length: {len(data)}\r\n\r\n'.encode()
+        )
+        body.write(data)
+        body.write(b"\r\n")
+    body.write(f"--{boundary}--\r\n".encode())
+    return Response(
+        content=body.getvalue(),
+        media_type=f"multipart/mixed; boundary={boundary}",
+        headers={"Cache-Control": "no-store", "X-Missing": ",".join(quote(p) for p in missing)},
+    )
+
+
+@app.post("/thumbs/sprite")
+def thumbs_sprite(http_req: Request, req: ThumbsRequest) -> dict[str, Any]:
+    """Thumbnails packed into one JPEG grid; returns its URL and each tile's offset.
+
+    Tiles are `max_px` square cells, 8 per row; `x, y, w, h` give the pixel box of each
+    thumbnail in the sheet. The sheet URL is content-addressed and can be cached forever.
+    """
+    _require_localhost(http_req)
+    size, items, missing = _batch_thumbs(req)
+    if not items:
+        return {"sprite": None, "max_px": size, "tiles": [], "missing": missing}
+    sprite_id = hashlib.sha1("".join(k for _, k, _ in items).encode()).hexdigest()
+    cols = min(8, len(items))
+    tiles = []
+    sheet = None if SPRITES.get(sprite_id) is not None else Image.new(
+        "RGB", (cols * size, -(-len(items) // cols) * size), (0, 0, 0)
+    )
+    for i, (p, _, data) in enumerate(items):
+        with Image.open(io.BytesIO(data)) as im:
+            x, y = (i % cols) * size, (i // cols) * size
+            tiles.append({"path": p, "x": x, "y": y, "w": im.width, "h": im.height})
+            if sheet is not None:
+                sheet.paste(im.convert("RGB"), (x, y))
+    if sheet is not None:
+        buf = io.BytesIO()
+        sheet.save(buf, format="JPEG", quality=core.THUMB_QUALITY)
+        SPRITES.put(sprite_id, buf.getvalue())
+    return {"sprite": f"/thumbs/sprite/{sprite_id}.jpg", "max_px": size, "tiles": tiles, "missing": missing}
+
+
+@app.get("/thumbs/sprite/{sprite_id}.jpg")
+def thumbs_sprite_image(req: Request, sprite_id: str) -> Response:
+    _require_localhost(req)
+    data = SPRITES.get(sprite_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="unknown or expired sprite")
+    return Response(
+        content=data, media_type="image/jpeg",
+        headers={"ETag": f'"{sprite_id}"', "Cache-Control": "private, max-age=31536000, immutable"},
+    )
 
 
 @app.post("/open")
@@ -289,40 +810,74 @@ def check_permissions() -> dict[str, Any]:
 
 @app.post("/suggest-queries")
 def suggest_queries() -> dict[str, Any]:
-    """Suggest relevant search queries based on indexed OCR content."""
+    """Suggest relevant search queries from the lens counts in library_stats."""
     paths = core.get_dbpaths()
     if not paths.db.exists():
         return {"suggestions": []}
 
-    conn = core.sqlite3.connect(paths.db)
-    rows = conn.execute(
-        "SELECT ocr_text FROM assets WHERE length(COALESCE(ocr_text,'')) > 20 ORDER BY mtime DESC LIMIT 500"
-    ).fetchall()
-
-    if not rows:
-        return {"suggestions": []}
+    counts = _library_stats(paths).get("lens", {})
 
-    # Score against known patterns
-    import re as _re
-    patterns = [
-        (_re.compile(r'\$\d+|total|invoice|receipt', _re.I), "receipt or invoice", 0),
-        (_re.compile(r'error|exception|traceback|failed|errno', _re.I), "error message", 0),
-        (_re.compile(r'confirm|code|verification|OTP|2FA', _re.I), "confirmation code", 0),
-        (_re.compile(r'meeting|calendar|invite|schedule|agenda', _re.I), "calendar or meeting", 0),
-        (_re.compile(r'dashboard|analytics|chart|graph|metrics', _re.I), "dashboard or chart", 0),
-        (_re.compile(r'terminal|bash|\$\s|>>>', _re.I), "terminal output", 0),
-        (_re.compile(r'order|shipping|tracking|delivered', _re.I), "order or shipping", 0),
+    scored = [
+        {"query": lens.label, "lens": lens.name, "confidence": min(1.0, counts[lens.name] / 20.0), "hits": counts[lens.name]}
+        for lens in core.LENSES if counts.get(lens.name)
     ]
+    scored.sort(key=lambda x: x["hits"], reverse=True)
+    return {"suggestions": scored[:3]}
 
-    # Count matches
-    scored = []
-    for pattern, label, _ in patterns:
-        hits = sum(1 for (txt,) in rows if pattern.search(txt or ""))
-        if hits > 0:
-            scored.append({"query": label, "confidence": min(1.0, hits / 20.0), "hits": hits})
 
-    scored.sort(key=lambda x: x["confidence"], reverse=True)
-    return {"suggestions": scored[:3]}
+@app.get("/lenses")
+def lenses() -> dict[str, Any]:
+    """Lens views (Errors, Codes, Receipts, Charts, ...) with their image counts."""
+    paths = core.get_dbpaths()
+    counts = _library_stats(paths).get("lens", {}) if paths.db.exists() else {}
+    return {"lenses": [{"lens": l.name, "label": l.label, "count": counts.get(l.name, 0)} for l in core.LENSES]}
+
+
+@app.get("/facets")
+def facets() -> dict[str, Any]:
+    """Library counts per kind, lens, root folder and month, plus OCR coverage."""
+    paths = core.get_dbpaths()
+    if not paths.db.exists():
+        return {"assets": 0, "kinds": {}, "lenses": {}, "patterns": {}, "roots": {}, "months": {}, "ocr": {}}
+    stats = _library_stats(paths)
+    total = stats.get("all", {}).get("assets", 0)
+    with_text = stats.get("ocr", {}).get("with_text", 0)
+    return {
+        "assets": total,
+        "kinds": stats.get("kind", {}),
+        "lenses": stats.get("lens", {}),
+        "patterns": stats.get("pattern", {}),  # OCR pattern hits per lens
+        "roots": stats.get("root", {}),
+        "months": dict(sorted(stats.get("month", {}).items())),
+        "ocr": {"with_text": with_text, "without_text": max(0, total - with_text)},
+    }
+
+
+@app.get("/lens/{name}")
+def lens(name: str, k: int = 60, offset: int = 0) -> dict[str, Any]:
+    """Images of one lens: OCR pattern hits first, then by zero-shot score."""
+    if name not in core.LENS_BY_NAME:
+        raise HTTPException(status_code=404, detail="unknown lens")
+    paths = core.get_dbpaths()
+    if not paths.db.exists():
+        return {"lens": name, "results": [], "next_offset": None}
+    limit, offset = max(1, min(k, 500)), max(0, offset)
+    conn = DB_POOL.get(paths.db)
+    try:
+        rows = core.lens_assets(conn, name, k=limit, offset=offset)
+    except core.sqlite3.OperationalError:
+        rows = []
+    if not rows:
+        return {"lens": name, "results": [], "next_offset": None}
+    scores = core.np.array([r[1] for r in rows], dtype="float32")
+    ranked = {
+        "top": core.np.arange(len(rows)), "scores": scores, "clip": scores,
+        "ocr": core.np.array([r[2] for r in rows], dtype="float32"), "q_tokens": [],
+    }
+    results = _enrich_results(conn, [r[0] for r in rows], [ranked])[0]
+    # A short page is the last one.
+    next_offset = offset + len(rows) if len(rows) == limit else None
+    return {"lens": name, "results": results, "next_offset": next_offset}
 
 
 @app.get("/warm-status")
@@ -383,6 +938,32 @@ def warm(device: Literal["auto", "cpu", "mps"] = "auto") -> dict[str, Any]:
     }
 
 
+def _meta_summary(paths) -> dict:
+    """meta.json without the per-image `paths` list, parsed once per version of the file."""
+    sig = paths.meta.stat().st_mtime_ns
+    hit = INDEX_CACHE.get("meta_summary")
+    if hit is not None and hit[0] == sig:
+        return hit[1]
+    meta = core.json.loads(paths.meta.read_text())
+    meta["n_paths"] = len(meta.pop("paths", []))
+    INDEX_CACHE["meta_summary"] = (sig, meta)
+    return meta
+
+
+def _library_stats(paths) -> dict[str, dict[str, int]]:
+    try:
+        return core.library_stats(DB_POOL.get(paths.db))
+    except core.sqlite3.OperationalError:
+        pass
+    # Older database: create (and fill) the stats table once.
+    conn = core.sqlite3.connect(paths.db)
+    try:
+        core.ensure_schema(conn)
+        return core.library_stats(conn)
+    finally:
+        conn.close()
+
+
 @app.get("/status")
 def status() -> dict[str, Any]:
     paths = core.get_dbpaths()
@@ -390,41 +971,59 @@ def status() -> dict[str, Any]:
     if not paths.root.exists() or not paths.meta.exists() or not paths.db.exists():
         return {"indexed": False}
 
-    meta = core.json.loads(paths.meta.read_text())
-    embs = core.load_embeddings(paths.embeddings)
-    n_embs = int(embs.shape[0]) if embs is not None else 0
+    # Counts come from library_stats; the embeddings are not opened for this.
+    meta = _meta_summary(paths)
+    stats = _library_stats(paths)
+    snap = INDEX_CACHE.get("snap")
+    store = snap.store if snap is not None and snap.sig == _index_sig(paths) else None
+    # ("index", ...) rows appear after the first index run with stats; else use meta.json.
+    n_embs = stats.get("index", {}).get("embeddings", meta["n_paths"])
 
-    conn = core.sqlite3.connect(paths.db)
-    total = conn.execute("SELECT count(*) FROM assets").fetchone()[0]
-    with_ocr = conn.execute(
-        "SELECT count(*) FROM assets WHERE length(coalesce(ocr_text,'')) > 0"
-    ).fetchone()[0]
-    last_indexed_at = conn.execute("SELECT MAX(indexed_at) FROM assets").fetchone()[0]
+    last_indexed_at = DB_POOL.get(paths.db).execute("SELECT MAX(indexed_at) FROM assets").fetchone()[0]
 
     return {
         "indexed": True,
         "root": meta.get("root"),
         "roots": meta.get("roots", [meta.get("root")] if meta.get("root") else []),
         "model": meta.get("model"),
-        "assets": int(total),
-        "with_ocr": int(with_ocr),
+        "assets": stats.get("all", {}).get("assets", 0),
+        "with_ocr": stats.get("ocr", {}).get("with_text", 0),
         "embeddings": int(n_embs),
+        "searchable": stats.get("index", {}).get("searchable", core.search_row_count(meta, n_embs)),
         "last_indexed_at": last_indexed_at,
         "data_dir": str(paths.root),
+        "store": store.stats() if store is not None else {"tier": core.store_tier(meta)},
+        "text_encoder": TEXT_ENCODER.stats(),
+        "generation": meta.get("generation", 0),
+        "epoch": meta.get("epoch"),
+        "caches": {
+            "results": RESULT_CACHE.stats(),
+            "rankings": RANKINGS.stats(),
+            "query_embeddings": TEXT_EMB_CACHE.stats(),
+            "thumbnails": _thumb_cache().mem.stats(),
+        },
+        "db_connections": DB_POOL.opened,
+        "search_latency": SEARCH_LATENCY.summary(),
     }
 
 
-def _job_update(job_id: str, **patch: Any) -> None:
-    with JOB_LOCK:
+def _job_set(j: JobState, event: str, data: dict | None = None, **patch: Any) -> None:
+    """Apply `patch` and queue an event (JOB_LOCK held)."""
+    for k, v in patch.items():
+        setattr(j, k, v)
+    j.seq += 1
+    j.events.append((j.seq, {**(data or {}), **patch, "event": event, "status": j.status}))
+    JOB_COND.notify_all()
+
+
+def _job_update(job_id: str, event: str = "status", data: dict | None = None, **patch: Any) -> None:
+    with JOB_COND:
         j = JOBS.get(job_id)
-        if not j:
-            return
-        data = j.model_dump()
-        data.update(patch)
-        JOBS[job_id] = Job(**data)
+        if j:
+            _job_set(j, event, data, **patch)
 
 
-def _run_index_job(job_id: str, folders: list[str], device: str, ocr: bool, recent_only: bool, max_items: int | None) -> None:
+def _run_index_job(job_id: str, folders: list[str], device: str, ocr: bool, recent_only: bool, max_items: int | None, store_tier: str | None = None, thumbs: bool = True) -> None:
     _job_update(job_id, status="running", started_at=time.time(), message="Starting…")
 
     # Use the CLI as a subprocess so we can parse progress without major refactors.
@@ -443,6 +1042,10 @@ def _run_index_job(job_id: str, folders: list[str], device: str, ocr: bool, rece
         cmd.append("--recent-only")
     if max_items is not None:
         cmd.extend(["--max-items", str(int(max_items))])
+    if store_tier:
+        cmd.extend(["--store-tier", store_tier])
+    cmd.append("--thumbs" if thumbs else "--no-thumbs")
+    cmd.append("--progress-json")
 
     try:
         proc = subprocess.Popen(
@@ -453,21 +1056,28 @@ def _run_index_job(job_id: str, folders: list[str], device: str, ocr: bool, rece
         )
         JOB_PROCS[job_id] = proc
 
-        # Parse progress lines like: “… processed 75/121”
-        prog_re = re.compile(r"processed\s+(\d+)/(\d+)")
-
+        # --progress-json lines: {"event": "progress" | "stage" | "done", ...}; the rest is console text.
         for line in proc.stdout or []:
             line = line.strip()
-            m = prog_re.search(line)
-            if m:
+            ev = None
+            if line.startswith("{"):
+                try:
+                    ev = core.json.loads(line)
+                except ValueError:
+                    pass
+            if ev is None:
+                if line.startswith("Done"):
+                    _job_update(job_id, "message", message=line)
+            elif ev.get("event") == "progress":
                 _job_update(
-                    job_id,
-                    processed=int(m.group(1)),
-                    total=int(m.group(2)),
-                    message=line,
+                    job_id, "progress",
+                    stage=ev.get("stage"), processed=int(ev["processed"]), total=int(ev["total"]),
+                    rate=ev.get("rate"), eta_s=ev.get("eta_s"),
                 )
-            elif line.startswith("Done.") or line.startswith("Done"):
-                _job_update(job_id, message=line)
+            elif ev.get("event") == "stage":
+                _job_update(job_id, "stage", data=ev, stage=ev.get("stage"), eta_s=None)
+            elif ev.get("event") == "done":
+                _job_update(job_id, "summary", data=ev)
 
             # cancelled?
             with JOB_LOCK:
@@ -487,7 +1097,7 @@ def _run_index_job(job_id: str, folders: list[str], device: str, ocr: bool, rece
         if st == "cancelled":
             _job_update(job_id, finished_at=time.time(), message="Cancelled")
         elif rc == 0:
-            _job_update(job_id, status="done", finished_at=time.time(), processed=JOBS[job_id].processed, total=JOBS[job_id].total)
+            _job_update(job_id, status="done", finished_at=time.time(), stage=None, rate=None, eta_s=None)
         else:
             _job_update(job_id, status="error", finished_at=time.time(), error=f"Indexing failed (code {rc})")
 
@@ -503,7 +1113,49 @@ def get_job(job_id: str) -> Job:
         j = JOBS.get(job_id)
         if not j:
             raise HTTPException(status_code=404, detail="job not found")
-        return j
+        return j.snapshot()
+
+
+@app.get("/jobs/{job_id}/events")
+def job_events(req: Request, job_id: str) -> StreamingResponse:
+    """Server-sent events for one job, pushed as the indexer reports them.
+
+    The stream opens with a `job` event (the same body as GET /jobs/{id}), then sends
+    `progress` (processed, total, rate, eta_s), `stage` (items, seconds, rate of a finished
+    stage), `summary` and `status` events, and ends once the job is done, failed or
+    cancelled. Reconnects with `Last-Event-ID` resume after that event.
+    """
+    with JOB_LOCK:
+        j = JOBS.get(job_id)
+        if not j:
+            raise HTTPException(status_code=404, detail="job not found")
+        first = j.snapshot()
+        start = j.seq
+    try:
+        start = int(req.headers.get("last-event-id", start))
+    except ValueError:
+        pass
+
+    def stream() -> Iterator[bytes]:
+        seen = start
+        yield f"id: {seen}\nevent: job\ndata: {first.model_dump_json()}\n\n".encode()
+        while True:
+            with JOB_COND:
+                JOB_COND.wait_for(lambda: j.seq > seen or j.status in JOB_TERMINAL, timeout=15.0)
+                new = [(n, e) for n, e in j.events if n > seen]
+                finished = j.status in JOB_TERMINAL
+            if not new and not finished:
+                yield b": keepalive\n\n"
+                continue
+            for n, e in new:
+                yield f"id: {n}\nevent: {e['event']}\ndata: {core.json.dumps(e)}\n\n".encode()
+                seen = n
+            if finished:
+                return
+
+    return StreamingResponse(
+        stream(), media_type="text/event-stream", headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"}
+    )
 
 
 @app.post("/jobs/{job_id}/cancel")
@@ -513,8 +1165,8 @@ def cancel_job(job_id: str) -> Job:
         if not j:
             raise HTTPException(status_code=404, detail="job not found")
         if j.status in ("done", "error"):
-            return j
-        JOBS[job_id] = Job(**{**j.model_dump(), "status": "cancelled"})
+            return j.snapshot()
+        _job_set(j, "status", status="cancelled")
 
     proc = JOB_PROCS.get(job_id)
     if proc:
@@ -536,14 +1188,14 @@ def index(req: IndexRequest) -> dict[str, Any]:
         folders = [str(Path(req.folder).expanduser())]
 
     job_id = uuid.uuid4().hex
-    job = Job(id=job_id, kind="index", status="queued", folder=folders[0] if folders else None, processed=0, total=None)
+    job = JobState(id=job_id, kind="index", status="queued", folder=folders[0] if folders else None)
 
     with JOB_LOCK:
         JOBS[job_id] = job
 
     t = threading.Thread(
         target=_run_index_job,
-        args=(job_id, folders, req.device, req.ocr, bool(req.recent_only), req.max_items),
+        args=(job_id, folders, req.device, req.ocr, bool(req.recent_only), req.max_items, req.store_tier, req.thumbs),
         daemon=True,
     )
     t.start()
@@ -553,233 +1205,707 @@ def index(req: IndexRequest) -> dict[str, Any]:
 
 @app.post("/search")
 def search(req: SearchRequest) -> dict[str, Any]:
-    paths = core.get_dbpaths()
-    if not paths.embeddings.exists() or not paths.meta.exists():
-        return {"results": []}
+    key, hit = _result_lookup(req)
+    if hit is not None:
+        return {**hit, "cached": True}
+    out = _search(req)
+    if key is not None:
+        RESULT_CACHE.put(key, out)
+    return {**out, "cached": False}
+
+
+def _result_lookup(req: SearchRequest) -> tuple[tuple | None, dict | None]:
+    """(cache key, cached response or None) for a search request.
+
+    Keys carry the index generation (bumped by the indexer whenever results can change,
+    tagged with the index epoch so a reset index never reuses an old key);
+    the cache is emptied the first time a new generation is seen. A hit whose cursor
+    ranking has expired counts as a miss so `next_cursor` stays usable.
+    """
+    snap = _open_index()
+    if snap is None:
+        return None, None
+    gen = core.index_generation(snap.meta)
+    if INDEX_CACHE.get("result_gen") != gen:
+        RESULT_CACHE.clear()
+        INDEX_CACHE["result_gen"] = gen
+    key = (
+        gen,
+        core.normalize_query(req.query),
+        req.k,
+        req.mode,
+        round(float(req.ocr_weight), 4),
+        req.filters.to_core() if req.filters else None,
+    )
+    hit = RESULT_CACHE.get(key)
+    if hit is None or (hit.get("next_cursor") and RANKINGS.get(hit["search_id"]) is None):
+        return key, None
+    SEARCH_RESULTS.put(hit["search_id"], [r["path"] for r in hit["results"]])
+    _prefetch_thumbs([r["path"] for r in hit["results"][:THUMB_PREFETCH]])
+    return key, hit
 
-    meta = core.json.loads(paths.meta.read_text())
-    embs = core.load_embeddings(paths.embeddings)
-    if embs is None:
-        return {"results": []}
 
-    # Use the same scoring code by calling the click command callback.
-    # The callback prints; we want data. So we reimplement the core scoring here in a small way.
+def _device(device: str) -> str:
+    if device == "auto":
+        return "mps" if core.torch.backends.mps.is_available() else "cpu"
+    return device
 
-    # Compute scores using core's internal logic.
-    # NOTE: This duplicates logic from core.search; kept minimal for now.
-    if req.device == "auto":
-        device = "mps" if core.torch.backends.mps.is_available() else "cpu"
-    else:
-        device = req.device
 
-    paths_list = list(meta.get("paths", []))
+def _model_id(meta: dict) -> tuple[str, str]:
+    return (
+        meta.get("model", {}).get("name", "ViT-B-32"),
+        meta.get("model", {}).get("pretrained", "laion2b_s34b_b79k"),
+    )
 
-    model_name = meta.get("model", {}).get("name", "ViT-B-32")
-    pretrained = meta.get("model", {}).get("pretrained", "laion2b_s34b_b79k")
 
-    _, _, model, tokenizer = _get_model(device, model_name, pretrained)
+def _ocr_branch(db_path: Path, q_tokens: list[str], path_index: dict[str, int]):
+    """OCR side of a search (FTS5 AND/OR, trigram fallback) on its own connection."""
+    t0 = time.perf_counter()
+    hits = core.ocr_hits(DB_POOL.get(db_path), q_tokens, path_index)
+    return hits, (time.perf_counter() - t0) * 1000.0
 
-    q = core.text_embedding(model, tokenizer, device, req.query)
-    clip_scores = (embs @ q.reshape(-1, 1)).reshape(-1)
 
-    # OCR score via existing search logic: call into SQLite.
-    q_tokens = [
-        t
-        for t in core.re.split(r"[^a-zA-Z0-9]+", req.query.lower())
-        if len(t) >= 3 or t.isdigit()
-    ]
-    ocr_scores = core.np.zeros_like(clip_scores)
+def _search(
+    req: SearchRequest, cancelled: Callable[[], bool] | None = None, candidates=None
+) -> dict[str, Any] | None:
+    """The /search pipeline. Returns None if `cancelled()` turns true between stages."""
+    out = None
+    for out in _search_stages(req, cancelled, candidates=candidates):
+        pass
+    return out
+
+
+def _search_stages(
+    req: SearchRequest, cancelled: Callable[[], bool] | None = None, partial: bool = False, candidates=None
+) -> Iterator[dict[str, Any]]:
+    """The /search pipeline as a generator; the last item is the full response.
+
+    The OCR branch runs on QUERY_POOL while this thread encodes the query and scans
+    the store; both join before fusion. Per-stage timings come back in `timings`.
+    With `partial`, a CLIP-only ranking is yielded right after the scan and the fused
+    ranking before enrichment (see _light_results). Stops early if `cancelled()`.
+    With `candidates` (sorted search rows), only those rows and this query's OCR hits
+    are scanned (see _prefix_candidates).
+    """
+    t_start = time.perf_counter()
+    snap = _open_index()
+    if snap is None:
+        yield {"results": []}
+        return
 
-    if q_tokens:
-        conn = core.sqlite3.connect(paths.db)
-        match_and = " AND ".join(q_tokens)
-        match_or = " OR ".join(q_tokens)
-        rows = conn.execute(
-            """
-            SELECT path, bm25(ocr_fts) as score
-            FROM ocr_fts
-            WHERE ocr_fts MATCH ?
-            ORDER BY score
-            LIMIT 2000
-            """,
-            (match_and,),
-        ).fetchall()
-        if not rows and len(q_tokens) > 1:
-            rows = conn.execute(
-                """
-                SELECT path, bm25(ocr_fts) as score
-                FROM ocr_fts
-                WHERE ocr_fts MATCH ?
-                ORDER BY score
-                LIMIT 2000
-                """,
-                (match_or,),
-            ).fetchall()
-
-        if rows:
-            raw = core.np.array([float(r[1]) for r in rows], dtype="float32")
-            best = float(raw.min())
-            worst = float(raw.max())
-            denom = max(1e-6, worst - best)
-            score_map = {}
-            for (p, s) in rows:
-                s = float(s)
-                norm = 1.0 - ((s - best) / denom)
-                score_map[str(p)] = float(norm)
-            for i, p in enumerate(paths_list):
-                v = score_map.get(p)
-                if v is not None:
-                    ocr_scores[i] = v
-        else:
-            digit_tokens = [t for t in q_tokens if t.isdigit()]
-            if digit_tokens:
-                clauses = " OR ".join(["ocr_text LIKE ?" for _ in digit_tokens])
-                like_args = [f"%{t}%" for t in digit_tokens]
-                like_rows = conn.execute(
-                    f"SELECT path FROM assets WHERE {clauses} LIMIT 2000",
-                    tuple(like_args),
-                ).fetchall()
-                for (p,) in like_rows:
-                    try:
-                        i = paths_list.index(str(p))
-                        ocr_scores[i] = max(ocr_scores[i], 0.95)
-                    except ValueError:
-                        pass
+    q_tokens = core.query_tokens(req.query)
+    ocr_fut = QUERY_POOL.submit(_ocr_branch, snap.paths.db, q_tokens, snap.path_index)
 
-    if req.mode == "clip":
-        scores = clip_scores
-    elif req.mode == "ocr":
-        scores = ocr_scores
-    else:
-        # hybrid — per-asset OCR weighting based on textiness (1.1)
-        conn_sig = core.sqlite3.connect(paths.db)
-        base_w = float(req.ocr_weight)
-
-        # Build per-asset arrays for quality signals
-        n_assets = len(paths_list)
-        textiness_arr = core.np.full(n_assets, 0.0, dtype="float32")
-        quality_arr = core.np.full(n_assets, 0.5, dtype="float32")
-        mtime_arr = core.np.full(n_assets, 0.0, dtype="float32")
-        dup_group_arr: list[str] = [""] * n_assets
-
-        ph = ",".join(["?"] * n_assets) if n_assets else ""
-        if n_assets:
-            rows_sig = conn_sig.execute(
-                f"SELECT path, COALESCE(textiness,0), COALESCE(quality_score,0.5), COALESCE(mtime,0), COALESCE(dup_group,'') FROM assets WHERE path IN ({ph})",
-                tuple(paths_list),
-            ).fetchall()
-            sig_map = {r[0]: r[1:] for r in rows_sig}
-            for i, p in enumerate(paths_list):
-                vals = sig_map.get(p)
-                if vals:
-                    textiness_arr[i] = float(vals[0])
-                    quality_arr[i] = float(vals[1])
-                    mtime_arr[i] = float(vals[2])
-                    dup_group_arr[i] = str(vals[3])
-
-        # 1.1: Per-asset OCR weight based on textiness
-        q_lower = req.query.lower()
-        has_digits = any(ch.isdigit() for ch in req.query)
-        texty_keywords = [
-            "error", "code", "http", "forbidden", "denied",
-            "invoice", "receipt", "total", "$", "usd", "cad",
-        ]
-        looks_texty = has_digits or any(k in q_lower for k in texty_keywords)
-        if looks_texty:
-            base_w = max(base_w, 0.80)
-
-        w_per = core.np.clip(base_w + 0.25 * textiness_arr, 0.0, 1.0)
-        scores = (1.0 - w_per) * clip_scores + w_per * ocr_scores
-
-        # 1.2: Quality score dampening
-        scores *= (0.3 + 0.7 * quality_arr)
-
-        # 1.3: Recency bias
-        import time as _time
-        now_ts = _time.time()
-        days_ago = (now_ts - mtime_arr) / 86400.0
-        recency = 1.0 + 0.15 * core.np.clip(1.0 - days_ago / 365.0, 0.0, 1.0)
-        scores *= recency
-
-    # 1.4: Deduplication via dup_group — pull extra candidates, then deduplicate
-    if req.mode == "hybrid":
-        # Get more candidates than needed, then deduplicate
-        candidate_k = min(len(scores), req.k * 3)
-        all_sorted = core.np.argsort(-scores)[:candidate_k]
-        seen_groups: set[str] = set()
-        topk_list: list[int] = []
-        for idx in all_sorted:
-            dg = dup_group_arr[int(idx)]
-            if dg and dg in seen_groups:
-                continue
-            if dg:
-                seen_groups.add(dg)
-            topk_list.append(int(idx))
-            if len(topk_list) >= req.k:
-                break
-        topk = core.np.array(topk_list, dtype=int)
-    else:
-        topk = core.np.argsort(-scores)[: req.k]
+    t0 = time.perf_counter()
+    model_name, pretrained = _model_id(snap.meta)
+    q = _encode_query(_device(req.device), model_name, pretrained, req.query)
+    t1 = time.perf_counter()
+    if cancelled and cancelled():
+        ocr_fut.cancel()
+        return
+    rows = core.filter_rows(snap.signals, req.filters.to_core() if req.filters else None)
+    if candidates is not None:
+        hit_rows = ocr_fut.result()[0][0]
+        rows = core.np.union1d(candidates, hit_rows if rows is None else core.np.intersect1d(hit_rows, rows))
+    clip_scores = snap.search_store.scores(q, rerank=max(core.STORE_RERANK, req.k * 5), rows=rows)
+    t2 = time.perf_counter()
+
+    conn = DB_POOL.get(snap.paths.db)
+    if partial and req.mode != "clip":
+        none = (core.np.zeros(0, dtype=core.np.int64), core.np.zeros(0, dtype="float32"))
+        early = core.score_query(
+            req.query, clip_scores, conn, snap.path_index, snap.signals, "clip", req.ocr_weight, req.k,
+            hits=none, rows=rows,
+        )
+        yield {"stage": "clip", "results": _light_results(conn, snap.paths_list, early),
+               "elapsed_ms": round((time.perf_counter() - t_start) * 1000.0, 3)}
+
+    hits, ocr_ms = ocr_fut.result()
+    t3 = time.perf_counter()
+    ranked = core.score_query(
+        req.query, clip_scores, conn, snap.path_index, snap.signals, req.mode, req.ocr_weight, req.k,
+        hits=hits, rows=rows,
+    )
+    t4 = time.perf_counter()
 
-    # Pull OCR preview + metadata for just the top results.
-    conn = core.sqlite3.connect(paths.db)
-    top_paths = [paths_list[int(i)] for i in topk]
-    ph = ",".join(["?"] * len(top_paths)) if top_paths else ""
+    if cancelled and cancelled():
+        return
+    if partial:
+        yield {"stage": "ranked", "results": _light_results(conn, snap.paths_list, ranked),
+               "matched_tokens": ranked["q_tokens"],
+               "elapsed_ms": round((time.perf_counter() - t_start) * 1000.0, 3)}
+
+    results = _enrich_results(conn, snap.paths_list, [ranked])[0]
+    t5 = time.perf_counter()
+    search_id = uuid.uuid4().hex
+    SEARCH_RESULTS.put(search_id, [r["path"] for r in results])
+    _prefetch_thumbs([r["path"] for r in results[:THUMB_PREFETCH]])
+    cand_rows, cand_clip = _ranking_candidates(clip_scores, rows, hits)
+    RANKINGS.put(search_id, {
+        "generation": core.index_generation(snap.meta),
+        "lock": threading.Lock(),
+        "req": req, "rows": cand_rows, "clip": cand_clip, "hits": hits,
+    })
+
+    timings = {
+        "encode_ms": (t1 - t0) * 1000.0,
+        "scan_ms": (t2 - t1) * 1000.0,
+        "ocr_ms": ocr_ms,
+        "ocr_wait_ms": (t3 - t2) * 1000.0,  # time the CLIP side spent waiting on OCR
+        "fuse_ms": (t4 - t3) * 1000.0,
+        "enrich_ms": (t5 - t4) * 1000.0,
+        "total_ms": (t5 - t_start) * 1000.0,
+    }
+    SEARCH_LATENCY.add(timings)
+    yield {
+        "results": results,
+        "search_id": search_id,
+        "next_cursor": f"{search_id}:{len(results)}" if len(results) == req.k else None,
+        "matched_tokens": ranked["q_tokens"],
+        "timings": {k: round(v, 3) for k, v in timings.items()},
+    }
+
+
+def _ranking_candidates(clip_scores, rows, hits) -> tuple[Any, Any]:
+    """(sorted search rows, their CLIP scores): the CLIP top RANKING_CANDIDATES plus every OCR hit.
+
+    `clip_scores` covers `rows` (a filter's rows) when given, else every search row.
+    """
+    np = core.np
+    n = len(clip_scores)
+    c = min(n, RANKING_CANDIDATES)
+    local = np.argpartition(-clip_scores, c - 1)[:c] if c < n else np.arange(n)
+    hit_idx = hits[0]
+    if rows is not None:
+        pos = np.minimum(np.searchsorted(rows, hit_idx), max(0, n - 1))
+        hit_idx = pos[rows[pos] == hit_idx] if n else hit_idx[:0]
+    local = np.union1d(local, hit_idx).astype(np.int64)
+    return (local if rows is None else rows[local]), clip_scores[local]
+
+
+def _deep_ranking(snap: IndexSnapshot, entry: dict) -> dict[str, Any]:
+    """Top RANKING_DEPTH of a search (same ranking as its first page), from its candidates."""
+    req = entry["req"]
+    ranked = core.score_query(
+        req.query, entry["clip"], None, snap.path_index, snap.signals, req.mode, req.ocr_weight, RANKING_DEPTH,
+        hits=entry["hits"], rows=entry["rows"],
+    )
+    top = ranked["top"]
+    return {
+        "paths": [snap.paths_list[int(i)] for i in top],
+        "scores": ranked["scores"][top], "clip": ranked["clip"][top], "ocr": ranked["ocr"][top],
+        "q_tokens": ranked["q_tokens"],
+    }
+
+
+def _entry_ranking(entry: dict, snap: IndexSnapshot) -> dict[str, Any]:
+    """The deep ranking of a RANKINGS entry, computed at most once (by its first /search/more).
+
+    `snap` must be of the entry's generation; searches only keep their compact candidate set.
+    """
+    with entry["lock"]:
+        if "deep" not in entry:
+            entry["deep"] = _deep_ranking(snap, entry)
+        return entry["deep"]
+
+
+@app.post("/search/more")
+def search_more(req: MoreRequest) -> dict[str, Any]:
+    """The next page of an earlier search, sliced from its cached ranking.
+
+    `cursor` comes from `next_cursor` of /search (or a previous page). No query encoding,
+    scan or fusion runs here. A cursor expires after 10 minutes or when the index changes
+    (410); the client then searches again.
+    """
+    search_id, _, off = req.cursor.partition(":")
+    try:
+        offset = max(0, int(off))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bad cursor")
+    entry = RANKINGS.get(search_id)
+    if entry is None:
+        raise HTTPException(status_code=410, detail="cursor expired")
+    snap = _open_index()
+    if snap is None or core.index_generation(snap.meta) != entry["generation"]:
+        raise HTTPException(status_code=410, detail="index changed")
+    deep = _entry_ranking(entry, snap)
+
+    page = slice(offset, offset + req.k)
+    page_paths = deep["paths"][page]
+    end = offset + len(page_paths)
+    next_cursor = f"{search_id}:{end}" if end < len(deep["paths"]) else None
+    if not page_paths:
+        return {"results": [], "search_id": search_id, "next_cursor": None}
+    ranked = {
+        "top": core.np.arange(len(page_paths)), "scores": deep["scores"][page], "clip": deep["clip"][page],
+        "ocr": deep["ocr"][page], "q_tokens": deep["q_tokens"],
+    }
+    results = _enrich_results(DB_POOL.get(snap.paths.db), page_paths, [ranked])[0]
+    return {"results": results, "search_id": search_id, "next_cursor": next_cursor, "matched_tokens": deep["q_tokens"]}
+
+
+@app.post("/search/stream")
+def search_stream(req: SearchRequest) -> StreamingResponse:
+    """/search as NDJSON: a CLIP-only ranking as soon as the scan is done, then the
+    fused ranking, then the enriched results (`"stage": "final"`, same body as /search).
+
+    Early stages carry `path`, scores, `thumb_url` and the stored size/mtime only, so
+    the UI can lay out and paint tiles and update them in place as later lines arrive.
+    """
+    def lines() -> Iterator[bytes]:
+        key, hit = _result_lookup(req)
+        if hit is not None:
+            yield (core.json.dumps({**hit, "stage": "final", "cached": True}) + "\n").encode()
+            return
+        for out in _search_stages(req, partial=True):
+            if "stage" not in out:
+                if key is not None:
+                    RESULT_CACHE.put(key, out)
+                out = {**out, "stage": "final", "cached": False}
+            yield (core.json.dumps(out) + "\n").encode()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers={"Cache-Control": "no-store"})
+
+
+def _light_results(conn, paths_list: list[str], ranked: dict) -> list[dict[str, Any]]:
+    """Ranked rows with stored metadata only (one indexed lookup, no OCR evidence or file I/O)."""
+    top = [paths_list[int(i)] for i in ranked["top"]]
+    info: dict[str, tuple] = {}
+    if top:
+        ph = ",".join(["?"] * len(top))
+        for p, w, h, mt, sz in conn.execute(
+            f"SELECT path, width, height, mtime, size_bytes FROM assets WHERE path IN ({ph})", tuple(top)
+        ):
+            info[p] = (w, h, mt, sz)
+    out = []
+    for idx_id, p in zip(ranked["top"], top):
+        w, h, mt, sz = info.get(p, (None, None, 0, 0))
+        out.append({
+            "path": p,
+            "score": float(ranked["scores"][int(idx_id)]),
+            "clip": float(ranked["clip"][int(idx_id)]),
+            "ocr": float(ranked["ocr"][int(idx_id)]),
+            "width": w,
+            "height": h,
+            "file_size": sz,
+            "created_at": mt,
+            "folder": str(Path(p).parent),
+            "thumb_url": f"/thumb?path={p}",
+        })
+    return out
+
+
+def _enrich_results(conn, paths_list: list[str], ranked_list: list[dict]) -> list[list[dict[str, Any]]]:
+    """Result rows (OCR evidence + file metadata) for each ranked query.
+
+    Matching OCR lines (text, highlight spans, normalized box) come from the line-level
+    FTS index; results without a matching line get a short leading preview instead.
+    """
+    top_paths = sorted({paths_list[int(i)] for r in ranked_list for i in r["top"]})
     ocr_preview: dict[str, str] = {}
     asset_meta: dict[str, dict] = {}
     if top_paths:
+        ph = ",".join(["?"] * len(top_paths))
         rows = conn.execute(
-            f"SELECT path, COALESCE(ocr_text,''), size_bytes, mtime, width, height FROM assets WHERE path IN ({ph})",
+            f"""
+            SELECT path, substr(COALESCE(ocr_text,''), 1, 301), size_bytes, mtime, width, height,
+                   (SELECT count(*) FROM assets g WHERE g.group_id = a.group_id)
+            FROM assets a WHERE path IN ({ph})
+            """,
             tuple(top_paths),
         ).fetchall()
-        for p, txt, sz, mt, aw, ah in rows:
+        for p, txt, sz, mt, aw, ah, n_group in rows:
             t = (txt or "").replace("\n", " ").strip()
             if len(t) > 300:
                 t = t[:300] + "…"
             ocr_preview[str(p)] = t
-            asset_meta[str(p)] = {"file_size": sz, "mtime": mt, "db_width": aw, "db_height": ah}
+            asset_meta[str(p)] = {
+                "file_size": sz, "mtime": mt, "db_width": aw, "db_height": ah,
+                "duplicates": max(0, int(n_group) - 1),
+            }
 
-    results = []
-    for idx_id in topk:
-        p = paths_list[int(idx_id)]
-        meta_info = asset_meta.get(p, {})
-        w = meta_info.get("db_width")
-        h = meta_info.get("db_height")
-        if not w or not h:
-            try:
-                with Image.open(p) as im:
-                    w, h = im.size
-            except Exception:
-                pass
+    out = []
+    for ranked in ranked_list:
+        q_tokens = ranked["q_tokens"]
+        evidence = core.ocr_evidence(conn, [paths_list[int(i)] for i in ranked["top"]], q_tokens)
+        results = []
+        for idx_id in ranked["top"]:
+            p = paths_list[int(idx_id)]
+            meta_info = asset_meta.get(p, {})
+            w = meta_info.get("db_width")
+            h = meta_info.get("db_height")
+            if not w or not h:
+                try:
+                    with Image.open(p) as im:
+                        w, h = im.size
+                except Exception:
+                    pass
+
+            # Matched tokens + preview from the evidence lines when there are any.
+            lines = evidence.get(p, [])
+            if lines:
+                hit = {ln["text"][a:b].lower() for ln in lines for a, b in ln["spans"]}
+                matched = [t for t in q_tokens if any(t in h or core._fuzzy_sim(t, h) >= core.FUZZY_MIN_SIM for h in hit)]
+                preview = " … ".join(ln["text"] for ln in lines)
+            else:
+                preview = ocr_preview.get(p, "")
+                matched = [t for t in q_tokens if t in preview.lower()] if q_tokens else []
+
+            results.append(
+                {
+                    "path": p,
+                    "score": float(ranked["scores"][int(idx_id)]),
+                    "clip": float(ranked["clip"][int(idx_id)]),
+                    "ocr": float(ranked["ocr"][int(idx_id)]),
+                    "ocr_preview": preview,
+                    "ocr_lines": lines,
+                    "matched_tokens": matched,
+                    "width": w,
+                    "height": h,
+                    "file_size": meta_info.get("file_size", 0),
+                    "created_at": meta_info.get("mtime", 0),
+                    "folder": str(Path(p).parent),
+                    "duplicates": meta_info.get("duplicates", 0),
+                    "thumb_url": f"/thumb?path={p}",
+                }
+            )
+        out.append(results)
+    return out
+
+
+@app.post("/search/batch")
+def search_batch(req: BatchSearchRequest) -> dict[str, Any]:
+    """Run many queries in one call.
+
+    All queries are encoded in one batch and scored with one matrix-matrix product
+    per SEARCH_BATCH queries; ranking is the same hybrid OCR/quality logic as /search.
+    """
+    snap = _open_index()
+    if snap is None:
+        return {"results": [{"query": q, "results": [], "matched_tokens": []} for q in req.queries]}
+
+    device = _device(req.device)
+    model_name, pretrained = _model_id(snap.meta)
+    Q = _encode_queries(device, model_name, pretrained, req.queries)
+
+    conn = DB_POOL.get(snap.paths.db)
+    rows = core.filter_rows(snap.signals, req.filters.to_core() if req.filters else None)
+    out: list[dict[str, Any]] = []
+    for s in range(0, len(req.queries), core.SEARCH_BATCH):
+        chunk = req.queries[s : s + core.SEARCH_BATCH]
+        clip_mat = snap.search_store.scores_batch(
+            Q[s : s + len(chunk)], rerank=max(core.STORE_RERANK, req.k * 5), rows=rows
+        )
+        ranked_list = [
+            core.score_query(
+                query, clip_mat[j], conn, snap.path_index, snap.signals, req.mode, req.ocr_weight, req.k, rows=rows
+            )
+            for j, query in enumerate(chunk)
+        ]
+        for query, ranked, results in zip(chunk, ranked_list, _enrich_results(conn, snap.paths_list, ranked_list)):
+            out.append({"query": query, "results": results, "matched_tokens": ranked["q_tokens"]})
+
+    return {"results": out}
+
+
+@app.post("/search/incremental")
+def search_incremental(req: IncrementalSearchRequest) -> dict[str, Any]:
+    """Search-as-you-type.
+
+    The UI sends one request per keystroke with an increasing `seq`. A request that
+    has been overtaken by a newer one from the same client stops at the next stage
+    boundary and answers `{"superseded": true}`; repeated queries (e.g. after a
+    backspace) are answered from the result cache. A query that extends a cached one
+    (the next keystroke) only scans that query's ranking plus its own OCR hits, and
+    reports the prefix as `"prefix"`; such answers are not cached.
+    """
+    with INCREMENTAL_LOCK:
+        latest = INCREMENTAL_SEQ.get(req.client_id, -1)
+        if req.seq < latest:
+            return {"superseded": True, "seq": req.seq}
+        INCREMENTAL_SEQ.put(req.client_id, req.seq)
+
+    def cancelled() -> bool:
+        return INCREMENTAL_SEQ.peek(req.client_id, -1) > req.seq
+
+    key, hit = _result_lookup(req)
+    if hit is not None:
+        return {**hit, "seq": req.seq, "cached": True}
+
+    prefix, candidates = _prefix_candidates(key)
+    out = _search(req, cancelled=cancelled, candidates=candidates)
+    if out is None:
+        return {"superseded": True, "seq": req.seq}
+    if prefix is not None:
+        return {**out, "seq": req.seq, "cached": False, "prefix": prefix}
+    if key is not None:
+        RESULT_CACHE.put(key, out)
+    return {**out, "seq": req.seq, "cached": False}
+
+
+def _prefix_candidates(key: tuple | None) -> tuple[str | None, Any]:
+    """(prefix, sorted search rows) from the longest cached prefix of the query in `key`.
+
+    The rows are the prefix search's ranking candidates (see _ranking_candidates);
+    (None, None) when no prefix of at least INCREMENTAL_MIN_PREFIX characters is cached.
+    """
+    if key is None:
+        return None, None
+    gen, query, *rest = key
+    for n in range(len(query) - 1, INCREMENTAL_MIN_PREFIX - 1, -1):
+        hit = RESULT_CACHE.peek((gen, query[:n], *rest))
+        entry = RANKINGS.peek(hit["search_id"]) if hit is not None else None
+        if entry is None or entry["generation"] != gen:
+            continue
+        if not len(entry["rows"]):
+            continue
+        return query[:n], entry["rows"]
+    return None, None
 
-        # Compute matched tokens for highlighting
-        ocr_text_full = ocr_preview.get(p, "")
-        matched = [t for t in q_tokens if t in ocr_text_full.lower()] if q_tokens else []
-
-        # File metadata for sidebar
-        file_path = Path(p)
-        folder_path = str(file_path.parent)
-        file_size = meta_info.get("file_size", 0)
-        created_at = meta_info.get("mtime", 0)
-
-        results.append(
-            {
-                "path": p,
-                "score": float(scores[int(idx_id)]),
-                "clip": float(clip_scores[int(idx_id)]),
-                "ocr": float(ocr_scores[int(idx_id)]),
-                "ocr_preview": ocr_preview.get(p, ""),
-                "matched_tokens": matched,
-                "width": w,
-                "height": h,
-                "file_size": file_size,
-                "created_at": created_at,
-                "folder": folder_path,
-                "thumb_url": f"/thumb?path={p}",
-            }
+
+@app.post("/similar")
+def similar(req: SimilarRequest) -> dict[str, Any]:
+    """More like this: nearest neighbors of an indexed image, from its stored embedding.
+
+    Nothing is re-encoded unless `text` is given; then the text query's scores are blended
+    in with `text_weight`. The image's own near-duplicate group is left out.
+    """
+    snap = _open_index()
+    if snap is None:
+        return {"results": []}
+    p = str(_normalize_path(req.path))
+    row = core.example_row(snap.paths_list, snap.path_index, snap.search_store.n, p)
+    if row is None:
+        raise HTTPException(status_code=404, detail="not indexed")
+    return _similar(snap, snap.store.vector(row), req.text, req.text_weight, req.k, req.filters, req.device, exclude=snap.path_index[p])
+
+
+@app.post("/similar/image")
+async def similar_image(
+    req: Request, text: str | None = None, text_weight: float = 0.5, k: int = 12, device: Literal["auto", "cpu", "mps"] = "auto"
+) -> dict[str, Any]:
+    """Query-by-example for an image that is not in the index (raw image bytes as the body).
+
+    The image goes through the CLIP image encoder, then ranks like /similar.
+    """
+    data = await req.body()
+    if not data:
+        raise HTTPException(status_code=400, detail="empty body")
+    try:
+        with Image.open(io.BytesIO(data)) as im:
+            img = im.convert("RGB")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"cannot read image: {e}")
+    snap = _open_index()
+    if snap is None:
+        return {"results": []}
+    dev = _device(device)
+    model_name, pretrained = _model_id(snap.meta)
+
+    def encode():
+        _, _, model, _, preprocess = _get_model(dev, model_name, pretrained)
+        return core.image_embedding(model, preprocess, dev, img)
+
+    vec = await run_in_threadpool(encode)
+    return await run_in_threadpool(
+        _similar, snap, vec, text, min(1.0, max(0.0, text_weight)), max(1, min(k, 200)), None, device, None
+    )
+
+
+def _similar(snap: IndexSnapshot, vec, text: str | None, text_weight: float, k: int,
+             filters: SearchFilters | None, device: str, exclude: int | None) -> dict[str, Any]:
+    """Rank the search rows by similarity to `vec` (optionally blended with `text`) and enrich the top k."""
+    t0 = time.perf_counter()
+    rows = core.filter_rows(snap.signals, filters.to_core() if filters else None)
+    t_vec = _encode_query(_device(device), *_model_id(snap.meta), text) if text else None
+    scores = core.similarity_scores(
+        snap.search_store, vec, t_vec, text_weight, rerank=max(core.STORE_RERANK, (k + 1) * 5), rows=rows
+    )
+    none = (core.np.zeros(0, dtype=core.np.int64), core.np.zeros(0, dtype="float32"))
+    ranked = core.score_query(
+        text or "", scores, None, snap.path_index, snap.signals, "clip", 0.0, k + 1, hits=none, rows=rows
+    )
+    ranked["top"] = core.np.array([i for i in ranked["top"] if i != exclude][:k], dtype=int)
+    results = _enrich_results(DB_POOL.get(snap.paths.db), snap.paths_list, [ranked])[0]
+    return {"results": results, "timings": {"total_ms": round((time.perf_counter() - t0) * 1000.0, 3)}}
+
+
+@app.get("/related")
+def related(path: str, k: int = 20) -> dict[str, Any]:
+    """Related images from the precomputed neighbor graph (one keyed read, no scan)."""
+    p_norm = str(_normalize_path(path))
+    paths = core.get_dbpaths()
+    if not paths.db.exists():
+        return {"path": p_norm, "results": []}
+    conn = DB_POOL.get(paths.db)
+    row = conn.execute("SELECT id, COALESCE(group_id, id) FROM assets WHERE path=?", (p_norm,)).fetchone()
+    if row is None:
+        raise HTTPException(status_code=404, detail="not indexed")
+    try:
+        # Group members share their representative's neighbors.
+        nbrs = core.related_assets(conn, row[1], max(1, min(k, core.KNN_K)))
+    except core.sqlite3.OperationalError:
+        nbrs = []
+    if not nbrs:
+        return {"path": p_norm, "results": []}
+    scores = core.np.array([s for _, s in nbrs], dtype="float32")
+    ranked = {
+        "top": core.np.arange(len(nbrs)), "scores": scores, "clip": scores,
+        "ocr": core.np.zeros(len(nbrs), dtype="float32"), "q_tokens": [],
+    }
+    return {"path": p_norm, "results": _enrich_results(conn, [p for p, _ in nbrs], [ranked])[0]}
+
+
+# ── Standing queries ──────────────────────────────────────────────────────────
+
+
+@app.get("/standing-queries")
+def list_standing_queries() -> dict[str, Any]:
+    """Saved searches with their unseen match counts."""
+    paths = core.get_dbpaths()
+    if not paths.db.exists():
+        return {"queries": []}
+    conn = DB_POOL.get(paths.db)
+    try:
+        qs = core.standing_queries(conn)
+        unseen = dict(conn.execute("SELECT query_id, count(*) FROM standing_matches WHERE seen = 0 GROUP BY query_id"))
+    except core.sqlite3.OperationalError:
+        return {"queries": []}
+    return {"queries": [
+        {"id": q.id, "name": q.name, "query": q.query, "ocr": q.fts, "kinds": list(q.kinds),
+         "min_score": q.min_score, "unseen": unseen.get(q.id, 0)}
+        for q in qs
+    ]}
+
+
+@app.post("/standing-queries")
+def create_standing_query(req: StandingQueryRequest) -> dict[str, Any]:
+    """Save a search; every later index run records the new images that match it.
+
+    `query` is encoded once here; `like_path` uses the image's stored embedding.
+    """
+    if req.query and req.like_path:
+        raise HTTPException(status_code=422, detail="use only one of query or like_path")
+    snap = _open_index()
+    if snap is None:
+        raise HTTPException(status_code=409, detail="no index")
+    vec = None
+    if req.like_path:
+        p = str(_normalize_path(req.like_path))
+        row = core.example_row(snap.paths_list, snap.path_index, snap.search_store.n, p)
+        if row is None:
+            raise HTTPException(status_code=404, detail="not indexed")
+        vec = snap.store.vector(row)
+    elif req.query:
+        vec = _encode_query(_device(req.device), *_model_id(snap.meta), req.query)
+    min_score = req.min_score
+    if min_score is None and vec is not None:
+        min_score = core.STANDING_EXAMPLE_MIN if req.like_path else core.STANDING_TEXT_MIN
+    conn = core.sqlite3.connect(snap.paths.db)
+    try:
+        core.ensure_schema(conn)
+        qid = core.save_standing_query(
+            conn, req.name, req.query or (str(_normalize_path(req.like_path)) if req.like_path else None),
+            vec, req.ocr, req.kinds, min_score,
         )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    finally:
+        conn.close()
+    return {"id": qid, "name": req.name}
 
-    return {"results": results, "matched_tokens": q_tokens}
+
+@app.delete("/standing-queries/{name}")
+def delete_standing_query(name: str) -> dict[str, Any]:
+    conn = core.sqlite3.connect(core.get_dbpaths().db)
+    try:
+        core.ensure_schema(conn)
+        n = conn.execute("DELETE FROM standing_queries WHERE name = ?", (name,)).rowcount
+        conn.commit()
+    finally:
+        conn.close()
+    if not n:
+        raise HTTPException(status_code=404, detail="unknown standing query")
+    return {"deleted": name}
+
+
+@app.get("/standing-queries/matches")
+def standing_query_matches(name: str | None = None, unseen: bool = False, limit: int = 100) -> dict[str, Any]:
+    """New images matched by standing queries (all, or `name`), newest first."""
+    paths = core.get_dbpaths()
+    if not paths.db.exists():
+        return {"results": []}
+    conn = DB_POOL.get(paths.db)
+    try:
+        qid = None
+        if name:
+            row = conn.execute("SELECT id FROM standing_queries WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                raise HTTPException(status_code=404, detail="unknown standing query")
+            qid = row[0]
+        rows = core.standing_matches(conn, qid, unseen, max(1, min(limit, 500)))
+    except core.sqlite3.OperationalError:
+        rows = []
+    if not rows:
+        return {"results": []}
+    scores = core.np.array([r[2] for r in rows], dtype="float32")
+    ranked = {
+        "top": core.np.arange(len(rows)), "scores": scores, "clip": scores,
+        "ocr": core.np.zeros(len(rows), dtype="float32"), "q_tokens": [],
+    }
+    results = _enrich_results(conn, [r[1] for r in rows], [ranked])[0]
+    for res, (qname, _, _, at, seen) in zip(results, rows):
+        res.update({"standing_query": qname, "matched_at": at, "seen": bool(seen)})
+    return {"results": results}
+
+
+@app.post("/standing-queries/matches/seen")
+def mark_standing_matches_seen(name: str | None = None) -> dict[str, Any]:
+    """Mark the matches of `name` (or of every standing query) as seen."""
+    conn = core.sqlite3.connect(core.get_dbpaths().db)
+    try:
+        core.ensure_schema(conn)
+        if name:
+            n = conn.execute(
+                "UPDATE standing_matches SET seen = 1 WHERE seen = 0 AND query_id = (SELECT id FROM standing_queries WHERE name = ?)",
+                (name,),
+            ).rowcount
+        else:
+            n = conn.execute("UPDATE standing_matches SET seen = 1 WHERE seen = 0").rowcount
+        conn.commit()
+    finally:
+        conn.close()
+    return {"marked": n}
+
+
+@app.get("/duplicates")
+def duplicates(path: str) -> dict[str, Any]:
+    """Expand a result's near-duplicate group (search returns only its representative)."""
+    p_norm = str(_normalize_path(path))
+    paths = core.get_dbpaths()
+    if not paths.db.exists():
+        return {"path": p_norm, "representative": None, "members": []}
+    conn = DB_POOL.get(paths.db)
+    row = conn.execute("SELECT group_id FROM assets WHERE path=?", (p_norm,)).fetchone()
+    if row is None:
+        raise HTTPException(status_code=404, detail="not indexed")
+    if row[0] is None:
+        return {"path": p_norm, "representative": p_norm, "members": []}
+    rows = conn.execute(
+        """
+        SELECT path, id = group_id, mtime, quality_score FROM assets
+        WHERE group_id = ? ORDER BY id = group_id DESC, quality_score DESC, mtime DESC
+        """,
+        (row[0],),
+    ).fetchall()
+    return {
+        "path": p_norm,
+        "representative": next((r[0] for r in rows if r[1]), p_norm),
+        "members": [
+            {"path": r[0], "created_at": r[2], "thumb_url": f"/thumb?path={r[0]}"}
+            for r in rows if not r[1]
+        ],
+    }
 
 
 # ── Demo search (pre-computed, no live index needed) ──────────────────────────
@@ -818,17 +1944,12 @@ def demo_search(req: SearchRequest):
         device = req.device
     model_name = "ViT-B-32"
     pretrained = "laion2b_s34b_b79k"
-    _, _, model, tokenizer = _get_model(device, model_name, pretrained)
 
-    # Encode query with CLIP
-    tokens = tokenizer([req.query])
-    with core.torch.no_grad():
-        text_features = model.encode_text(tokens.to(device))
-    text_features = text_features.cpu().numpy().astype("float32")
-    text_features /= core.np.linalg.norm(text_features, axis=1, keepdims=True)
+    # Encode query with CLIP (cached per normalized query)
+    text_features = _encode_query(device, model_name, pretrained, req.query)
 
     # CLIP similarity
-    clip_scores = (DEMO_EMBEDDINGS @ text_features.T).flatten()
+    clip_scores = DEMO_EMBEDDINGS @ text_features
 
     # OCR scoring
     q_lower = req.query.lower()
@@ -890,7 +2011,7 @@ def demo_search(req: SearchRequest):
 
 
 @app.get("/demo-thumb")
-def demo_thumb(path: str, width: int = 400) -> Response:
+def demo_thumb(req: Request, path: str, width: int = 400) -> Response:
     # Serve thumbnail from demo-dataset directory
     safe_path = path.replace("..", "").lstrip("/")
     full_path = DEMO_DIR / safe_path
@@ -901,14 +2022,7 @@ def demo_thumb(path: str, width: int = 400) -> Response:
         full_path.resolve().relative_to(DEMO_DIR.resolve())
     except ValueError:
         raise HTTPException(status_code=403, detail="forbidden")
-    try:
-        img = Image.open(full_path).convert("RGB")
-        img.thumbnail((width, width))
-        buf = io.BytesIO()
-        img.save(buf, format="JPEG", quality=85)
-        return Response(content=buf.getvalue(), media_type="image/jpeg")
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"cannot render: {e}")
+    return _thumb_response(req, full_path, width)
 
 
 # Static file serving: serve built frontend from FastAPI when MERLIAN_SERVE_FRONTEND=1
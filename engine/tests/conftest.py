@@ -0,0 +1,89 @@
+"""Shared fixtures: a tiny fake CLIP model and a throwaway data dir."""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+import torch
+from click.testing import CliRunner
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import merlian as core  # noqa: E402
+
+
+class _Tokenizer:
+    def __call__(self, texts):
+        return torch.tensor([[sum(map(ord, t)) % 97 + 1] for t in texts], dtype=torch.float32)
+
+
+class _Model(torch.nn.Module):
+    """Tiny deterministic stand-in for CLIP (no weights to download)."""
+
+    def __init__(self):
+        super().__init__()
+        g = torch.Generator().manual_seed(0)
+        self.img = torch.randn(3 * 4 * 4, 32, generator=g)
+        self.txt = torch.randn(1, 32, generator=g)
+
+    def encode_image(self, x):
+        return torch.nn.functional.adaptive_avg_pool2d(x, 4).reshape(x.shape[0], -1) @ self.img + 0.01
+
+    def encode_text(self, t):
+        return t @ self.txt + 0.01
+
+
+def _preprocess(img):
+    return torch.from_numpy(np.asarray(img.resize((16, 16)), dtype="float32") / 255.0).permute(2, 0, 1)
+
+
+def _sidecar_ocr(p: Path):
+    """OCR stand-in: one line per row of a `<image>.txt` sidecar, if present."""
+    txt = Path(p).with_suffix(".txt")
+    if not txt.exists():
+        return []
+    return [(line, (0.0, 0.0, 1.0, 1.0)) for line in txt.read_text().splitlines() if line.strip()]
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    data = tmp_path / "data"
+    data.mkdir()
+    monkeypatch.setattr(core, "app_dir", lambda: data)
+    monkeypatch.setattr(core, "ocr_lines_apple_vision", _sidecar_ocr)
+    monkeypatch.setattr(core.open_clip, "create_model_and_transforms", lambda *a, **kw: (_Model(), None, _preprocess))
+    monkeypatch.setattr(core.open_clip, "get_tokenizer", lambda name: _Tokenizer())
+    from fastapi.testclient import TestClient
+
+    import server
+
+    return CliRunner(), TestClient(server.app)
+
+
+@pytest.fixture
+def library(tmp_path):
+    """Write solid-colour PNGs into `tmp_path/name`; `ocr` maps file index -> sidecar text."""
+
+    def make(name: str, colors, ocr=None) -> Path:
+        root = tmp_path / name
+        root.mkdir(parents=True)
+        for i, c in enumerate(colors):
+            Image.new("RGB", (64, 48), c).save(root / f"img{i}.png")
+        for i, text in (ocr or {}).items():
+            (root / f"img{i}.txt").write_text(text)
+        return root
+
+    return make
+
+
+@pytest.fixture
+def index(engine):
+    runner, _ = engine
+
+    def run(folder: Path, *args: str):
+        res = runner.invoke(core.cli, ["index", str(folder), "--device", "cpu", *(args or ("--no-ocr",))])
+        assert res.exit_code == 0, res.output
+        return res
+
+    return run
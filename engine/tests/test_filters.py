@@ -0,0 +1,107 @@
+"""Search filters: kind, folder, date and OCR-only, in filter_rows and /search."""
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+from PIL import Image
+
+import merlian as core
+
+DAY = 86400.0
+
+
+def _write(folder, n, rng, mtime, ocr=None):
+    folder.mkdir(parents=True)
+    for i in range(n):
+        p = folder / f"img{i}.png"
+        # Random 4x4 colour blocks, so no two images collapse into one near-duplicate group.
+        blocks = rng.integers(0, 256, (4, 4, 3), dtype=np.uint8)
+        Image.fromarray(blocks).resize((64, 48), Image.NEAREST).save(p)
+        os.utime(p, (mtime, mtime))
+        if ocr:
+            (folder / f"img{i}.txt").write_text(f"{ocr} {i}")
+
+
+def _library(root):
+    """shots/ (old), shots2/ (new), screenshots/ (new, with OCR text)."""
+    rng = np.random.default_rng(0)
+    now = time.time()
+    _write(root / "shots", 4, rng, now - 400 * DAY)
+    _write(root / "shots2", 4, rng, now - 2 * DAY)
+    _write(root / "screenshots", 3, rng, now - 2 * DAY, ocr="invoice total")
+    return now
+
+
+def _rows(lib, flt):
+    paths = core.get_dbpaths()
+    paths_list = json.loads(paths.meta.read_text())["paths"]
+    conn = sqlite3.connect(paths.db)
+    try:
+        sig = core.load_signals(conn, paths_list)
+    finally:
+        conn.close()
+    rows = core.filter_rows(sig, flt)
+    keep = range(len(paths_list)) if rows is None else rows
+    return {os.path.relpath(paths_list[i], lib) for i in keep}
+
+
+def _names(folder, n):
+    return {f"{folder}/img{i}.png" for i in range(n)}
+
+
+def test_filter_rows_predicates(engine, index, tmp_path):
+    lib = tmp_path / "lib"
+    now = _library(lib)
+    index(lib, "--ocr")
+    F = core.SearchFilter
+
+    assert _rows(lib, F(kinds=("screenshot",))) == _names("screenshots", 3)
+    assert _rows(lib, F(has_ocr=True)) == _names("screenshots", 3)
+    assert _rows(lib, F(has_ocr=False)) == _names("shots", 4) | _names("shots2", 4)
+    assert _rows(lib, F(since=now - 30 * DAY)) == _names("shots2", 4) | _names("screenshots", 3)
+    assert _rows(lib, F(until=now - 30 * DAY)) == _names("shots", 4)
+    assert _rows(lib, F(since=now - 30 * DAY, has_ocr=False)) == _names("shots2", 4)
+    assert _rows(lib, F(kinds=("photo",))) == set()
+
+
+def test_folder_filter_matches_whole_resolved_components(engine, index, tmp_path, monkeypatch):
+    lib = tmp_path / "lib"
+    _library(lib)
+    index(lib)
+    F = core.SearchFilter
+
+    # `/lib/shots` must not pick up the sibling `/lib/shots2`.
+    assert _rows(lib, F(folders=(str(lib / "shots"),))) == _names("shots", 4)
+    assert _rows(lib, F(folders=(str(lib / "shots") + os.sep,))) == _names("shots", 4)
+    assert _rows(lib, F(folders=(str(lib),))) == _names("shots", 4) | _names("shots2", 4) | _names("screenshots", 3)
+
+    monkeypatch.setenv("HOME", str(tmp_path))
+    assert _rows(lib, F(folders=("~/lib/shots2",))) == _names("shots2", 4)
+
+    monkeypatch.chdir(tmp_path)
+    assert _rows(lib, F(folders=("lib/screenshots",))) == _names("screenshots", 3)
+
+    (tmp_path / "alias").symlink_to(lib)
+    assert _rows(lib, F(folders=(str(tmp_path / "alias" / "shots"),))) == _names("shots", 4)
+    assert _rows(lib, F(folders=(str(lib / "shots" / ".." / "shots2"),))) == _names("shots2", 4)
+
+
+def test_search_endpoint_applies_filters(engine, index, tmp_path):
+    _, client = engine
+    lib = tmp_path / "lib"
+    now = _library(lib)
+    index(lib, "--ocr")
+
+    def search(**filters):
+        body = {"query": "invoice total", "k": 20, "device": "cpu", "filters": filters}
+        res = client.post("/search", json=body)
+        assert res.status_code == 200, res.text
+        return {os.path.relpath(r["path"], lib) for r in res.json()["results"]}
+
+    assert search(folders=[str(lib / "shots")]) == _names("shots", 4)
+    assert search(kinds=["screenshot"]) == _names("screenshots", 3)
+    assert search(has_ocr=True) == _names("screenshots", 3)
+    assert search(since=now - 30 * DAY, has_ocr=False) == _names("shots2", 4)
+    assert search(folders=[str(lib / "shots")], has_ocr=True) == set()
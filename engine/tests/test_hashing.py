@@ -0,0 +1,68 @@
+"""HammingIndex against brute force, and hashing from paths vs decoded images."""
+import numpy as np
+import pytest
+from PIL import Image
+
+import merlian as core
+
+
+def _hashes(n, rng, bases=60, max_flip=5):
+    """Clusters of near-duplicate 64-bit hashes (each a base with a few bits flipped)."""
+    base = rng.integers(0, 2**63, bases, dtype=np.uint64) * np.uint64(2) + rng.integers(0, 2, bases, dtype=np.uint64)
+    out = base[rng.integers(0, bases, n)]
+    for i in range(n):
+        for b in rng.choice(64, rng.integers(0, max_flip + 1), replace=False):
+            out[i] ^= np.uint64(1) << np.uint64(int(b))
+    return out
+
+
+def _brute_pairs(h, d):
+    dist = core.popcount64(h[:, None] ^ h[None, :])
+    i, j = np.nonzero(np.triu(dist <= d, k=1))
+    return {(int(a), int(b)) for a, b in zip(i, j)}
+
+
+@pytest.mark.parametrize("max_dist", [1, 3, 5])
+def test_pairs_match_brute_force(max_dist):
+    h = _hashes(1500, np.random.default_rng(max_dist))
+    idx = core.HammingIndex(h, max_dist=max_dist)
+    for d in range(max_dist + 1):
+        assert set(map(tuple, idx.pairs(d).tolist())) == _brute_pairs(h, d)
+
+
+def test_query_matches_brute_force():
+    rng = np.random.default_rng(7)
+    h = _hashes(2000, rng)
+    idx = core.HammingIndex(h, max_dist=4)
+    for q in list(h[:50]) + list(rng.integers(0, 2**63, 20, dtype=np.uint64)):
+        for d in (0, 2, 4):
+            want = np.flatnonzero(core.popcount64(h ^ q) <= d)
+            np.testing.assert_array_equal(idx.query(int(q), d), want)
+
+
+def test_long_runs_are_checked_all_pairs():
+    # Every hash shares its low 16 bits, so chunk 0 is one run far longer than WINDOW.
+    rng = np.random.default_rng(11)
+    h = (_hashes(3000, rng, bases=30) & ~np.uint64(0xFFFF)) | np.uint64(0x1234)
+    idx = core.HammingIndex(h, max_dist=3)
+    assert set(map(tuple, idx.pairs().tolist())) == _brute_pairs(h, 3)
+
+
+def test_degenerate_runs_stay_bounded(monkeypatch):
+    # Past MAX_RUN only the window comparisons run: no false pairs, just possibly fewer.
+    monkeypatch.setattr(core.HammingIndex, "MAX_RUN", 256)
+    h = np.zeros(600, dtype=np.uint64)
+    h[::2] = np.uint64(0xF)
+    got = set(map(tuple, core.HammingIndex(h, max_dist=3).pairs().tolist()))
+    assert got and got <= _brute_pairs(h, 3)
+
+
+@pytest.mark.parametrize("kind", core.HASH_KINDS)
+def test_hash_from_image_matches_path(tmp_path, kind):
+    rng = np.random.default_rng(0)
+    for i in range(5):
+        p = tmp_path / f"{i}.png"
+        Image.fromarray(rng.integers(0, 255, (40, 56, 3), dtype=np.uint8)).save(p)
+        with Image.open(p) as img:
+            img.load()
+            assert core.perceptual_hash(img, kind) == core.perceptual_hash(p, kind)
@@ -0,0 +1,106 @@
+"""Incremental related-images graph stays equal to a brute-force kNN across re-indexes."""
+import json
+import sqlite3
+
+import numpy as np
+from PIL import Image
+
+import merlian as core
+
+
+def _unit(x):
+    return (x / np.linalg.norm(x, axis=1, keepdims=True)).astype(np.float32)
+
+
+def _add_assets(conn, paths):
+    conn.executemany(
+        "INSERT INTO assets(path, mtime, size_bytes, indexed_at) VALUES (?, 0, 0, '')", [(p,) for p in paths]
+    )
+
+
+def _check_graph(conn, paths, embs, k=core.KNN_K, tol=2e-3):
+    """Every stored list is the brute-force top-k.
+
+    Scores are stored as float16, so neighbors closer than that may swap places (or
+    trade the k-th slot); anything else must match.
+    """
+    ids = dict(conn.execute("SELECT path, id FROM assets"))
+    assert conn.execute("SELECT COUNT(*) FROM asset_knn").fetchone()[0] == len(paths)
+    row = {p: i for i, p in enumerate(paths)}
+    S = embs @ embs.T
+    np.fill_diagonal(S, -np.inf)
+    for i, p in enumerate(paths):
+        got = core.related_assets(conn, ids[p], k)
+        kth = np.sort(S[i])[-k]
+        nb = [row[q] for q, _ in got]
+        assert len(set(nb)) == k and i not in nb, p
+        assert (S[i, nb] >= kth - tol).all(), p
+        np.testing.assert_allclose([s for _, s in got], S[i, nb], atol=tol)
+        assert all(a >= b for (_, a), (_, b) in zip(got, got[1:])), p
+
+
+def test_update_knn_matches_brute_force_after_reindex():
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((25, 32))
+
+    def sample(m):
+        return _unit(centers[rng.integers(0, 25, m)] + 0.5 * rng.standard_normal((m, 32)))
+
+    conn = sqlite3.connect(":memory:")
+    core.ensure_schema(conn)
+    paths = [f"/lib/{i}.png" for i in range(600)]
+    embs = sample(600)
+    _add_assets(conn, paths)
+    assert core.update_knn(conn, paths, len(paths), embs, set(paths)) == 600
+    _check_graph(conn, paths, embs)
+
+    # Re-index: some files edited, some deleted, some new.
+    edited = rng.choice(600, 20, replace=False)
+    embs[edited] = sample(20)
+    gone = set(rng.choice(np.setdiff1d(np.arange(600), edited), 15, replace=False).tolist())
+    conn.executemany("DELETE FROM assets WHERE path = ?", [(paths[i],) for i in gone])
+    keep = [i for i in range(600) if i not in gone]
+    new = [f"/lib/new{i}.png" for i in range(30)]
+    _add_assets(conn, new)
+    paths = [paths[i] for i in keep] + new
+    embs = np.vstack([embs[keep], sample(30)])
+    changed = {f"/lib/{i}.png" for i in edited.tolist()} | set(new)
+
+    rewritten = core.update_knn(conn, paths, len(paths), embs, changed)
+    assert rewritten < len(paths)  # untouched lists are left alone
+    _check_graph(conn, paths, embs)
+
+    # A no-op re-index rewrites nothing.
+    assert core.update_knn(conn, paths, len(paths), embs, set()) == 0
+    _check_graph(conn, paths, embs)
+
+
+def _blocks(folder, names, rng):
+    folder.mkdir(parents=True, exist_ok=True)
+    for name in names:
+        px = rng.integers(0, 256, (4, 4, 3), dtype=np.uint8)
+        Image.fromarray(px).resize((64, 48), Image.NEAREST).save(folder / name)
+
+
+def test_related_endpoint_after_incremental_index(engine, index, tmp_path):
+    _, client = engine
+    rng = np.random.default_rng(5)
+    lib = tmp_path / "lib"
+    _blocks(lib, [f"a{i}.png" for i in range(30)], rng)
+    index(lib)
+    _blocks(lib, [f"b{i}.png" for i in range(10)], rng)
+    (lib / "a3.png").unlink()
+    index(lib)
+
+    paths = core.get_dbpaths()
+    meta = json.loads(paths.meta.read_text())
+    reps = meta["paths"][: meta["n_reps"]]
+    embs = np.load(paths.embeddings)[: meta["n_reps"]]
+    assert len(reps) == 39 and not any(p.endswith("/a3.png") for p in reps)
+    S = embs @ embs.T
+    np.fill_diagonal(S, -np.inf)
+    k = 5
+    for i, p in enumerate(reps):
+        got = [r["path"] for r in client.get("/related", params={"path": p, "k": k}).json()["results"]]
+        want = {reps[j] for j in np.flatnonzero(S[i] >= np.sort(S[i])[-k] - 2e-3)}
+        assert len(got) == k and set(got) <= want, p
@@ -0,0 +1,31 @@
+"""OCR scores stay in 0..1, including bm25 ties."""
+import json
+import sqlite3
+
+import numpy as np
+
+import merlian as core
+
+
+def test_ocr_hits_are_clipped_to_unit_range(engine, library, index):
+    text = "invoice 4412 total due"
+    ocr = {i: f"receipt {i} coffee" for i in range(40)}
+    ocr.update({0: text, 1: text, 2: text, 3: "invoice"})
+    lib = library("docs", [(250, 250, 250)] * 40, ocr=ocr)
+    index(lib, "--ocr")
+
+    paths = core.get_dbpaths()
+    path_index = {p: i for i, p in enumerate(json.loads(paths.meta.read_text())["paths"])}
+    conn = sqlite3.connect(paths.db)
+    try:
+        for tokens in (["invoice"], ["invoice", "4412"], ["receipt"], ["4412"]):
+            idx, scores = core.ocr_hits(conn, tokens, path_index)
+            assert len(idx)
+            assert scores.dtype == np.float32
+            assert scores.min() >= 0.0 and scores.max() <= 1.0
+            assert (scores == 1.0).any()
+        # Three identical documents tie for best; float32 rounding must not lift them past 1.
+        idx, scores = core.ocr_hits(conn, ["4412"], path_index)
+        assert scores.tolist() == [1.0, 1.0, 1.0]
+    finally:
+        conn.close()
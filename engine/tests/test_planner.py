@@ -0,0 +1,76 @@
+"""The hybrid planner must return exactly the dense top-k."""
+import time
+
+import numpy as np
+import pytest
+
+import merlian as core
+
+
+def _signals(n, rng):
+    now = time.time()
+    return core.AssetSignals(
+        textiness=rng.random(n).astype("float32"),
+        quality=rng.random(n).astype("float32"),
+        mtime=(now - rng.random(n) * 3 * 365 * 86400).astype("float64"),
+    )
+
+
+def _hits(n, m, rng):
+    idx = np.sort(rng.choice(n, m, replace=False))
+    return idx, rng.random(m).astype("float32")
+
+
+def _both(query, clip, sig, hits, k, rows=None):
+    run = lambda planner: core.score_query(  # noqa: E731
+        query, clip, None, {}, sig, "hybrid", 0.35, k, planner=planner, hits=hits, rows=rows
+    )
+    return run(True), run(False)
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("query", ["sunset over water", "invoice 4412"])
+def test_planner_matches_dense(seed, query):
+    rng = np.random.default_rng(seed)
+    n = 20000
+    sig = _signals(n, rng)
+    clip = rng.normal(0.2, 0.05, n).astype("float32")
+    hits = _hits(n, 300, rng)
+    for k in (1, 10, 60, 500):
+        planned, dense = _both(query, clip, sig, hits, k)
+        np.testing.assert_array_equal(planned["top"], dense["top"])
+        np.testing.assert_allclose(
+            planned["scores"][planned["top"]], dense["scores"][dense["top"]], rtol=1e-6
+        )
+
+
+def test_planner_is_used_and_falls_back():
+    rng = np.random.default_rng(0)
+    n = 5000
+    sig = _signals(n, rng)
+    hits = _hits(n, 50, rng)
+
+    # A clear CLIP head: the bound is met with the first candidate set.
+    clip = rng.normal(0.1, 0.02, n).astype("float32")
+    clip[rng.choice(n, 100, replace=False)] += 0.3
+    planned, dense = _both("a dog", clip, sig, hits, 20)
+    assert planned["planned"] and not dense["planned"]
+    np.testing.assert_array_equal(planned["top"], dense["top"])
+
+    # Flat CLIP scores and k near n: no candidate set short of everything is safe.
+    flat = np.full(n, 0.2, dtype="float32")
+    planned, dense = _both("a dog", flat, sig, hits, n - 10)
+    assert not planned["planned"]
+    np.testing.assert_array_equal(planned["top"], dense["top"])
+
+
+def test_planner_matches_dense_under_filter():
+    rng = np.random.default_rng(3)
+    n = 12000
+    sig = _signals(n, rng)
+    hits = _hits(n, 200, rng)
+    rows = np.sort(rng.choice(n, 4000, replace=False))
+    clip = rng.normal(0.2, 0.05, len(rows)).astype("float32")
+    planned, dense = _both("receipt total", clip, sig, hits, 40, rows=rows)
+    np.testing.assert_array_equal(planned["top"], dense["top"])
+    assert np.isin(planned["top"], rows).all()
@@ -0,0 +1,23 @@
+"""Result cache must not survive `merlian reset` + re-index."""
+from pathlib import Path
+
+import merlian as core
+
+
+def test_reset_reindex_does_not_serve_old_results(engine, library, index):
+    runner, client = engine
+    old = library("old", [(200, 30, 30), (30, 200, 30), (30, 30, 200)])
+    new = library("new", [(240, 240, 40), (40, 240, 240), (240, 40, 240)])
+    body = {"query": "red square", "k": 3, "device": "cpu"}
+
+    index(old)
+    assert client.post("/search", json=body).json()["cached"] is False
+    assert client.post("/search", json=body).json()["cached"] is True
+
+    assert runner.invoke(core.cli, ["reset"]).exit_code == 0
+    index(new)
+
+    out = client.post("/search", json=body).json()
+    assert out["cached"] is False
+    assert out["results"]
+    assert all(Path(r["path"]).parent == new.resolve() for r in out["results"])
@@ -0,0 +1,91 @@
+"""Standing queries match only newly indexed images, and mark-seen clears them."""
+import json
+import os
+
+import numpy as np
+from PIL import Image
+
+import merlian as core
+
+
+def _blocks(path, rng, ocr=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    px = rng.integers(0, 256, (4, 4, 3), dtype=np.uint8)
+    Image.fromarray(px).resize((64, 48), Image.NEAREST).save(path)
+    if ocr:
+        path.with_suffix(".txt").write_text(ocr)
+
+
+def _cli(runner, *args):
+    res = runner.invoke(core.cli, list(args))
+    assert res.exit_code == 0, res.output
+    return res.output
+
+
+def _matches(runner, *args):
+    out = _cli(runner, "watch", "matches", "--json", *args)
+    return {(m["query"], os.path.basename(m["path"]), m["seen"]) for m in map(json.loads, out.splitlines())}
+
+
+def _setup(engine, index, tmp_path):
+    runner, _ = engine
+    rng = np.random.default_rng(2)
+    lib = tmp_path / "lib"
+    for i in range(6):
+        _blocks(lib / f"a{i}.png", rng, ocr="invoice 99" if i == 1 else None)
+    index(lib, "--ocr")
+
+    _cli(runner, "watch", "add", "invoices", "--ocr", "invoice")
+    _cli(runner, "watch", "add", "like-a0", "--like", str(lib / "a0.png"), "--min-score", "0.99", "--device", "cpu")
+    _cli(runner, "watch", "add", "shots", "--query", "anything", "--kind", "screenshot",
+         "--min-score", "-1", "--device", "cpu")
+    # Existing images are never matched retroactively.
+    assert _matches(runner) == set()
+
+    _blocks(lib / "b0.png", rng, ocr="invoice 12")
+    Image.open(lib / "a0.png").save(lib / "b1.png")  # same pixels as a0
+    _blocks(lib / "b2.png", rng)
+    _blocks(lib / "screenshots" / "s0.png", rng)
+    index(lib, "--ocr")
+    return runner, lib
+
+
+def test_reindex_records_matches_and_mark_seen(engine, index, tmp_path):
+    runner, lib = _setup(engine, index, tmp_path)
+    want = {("invoices", "b0.png", False), ("like-a0", "b1.png", False), ("shots", "s0.png", False)}
+    assert _matches(runner, "--unseen") == want
+    assert _matches(runner, "invoices") == {("invoices", "b0.png", False)}
+
+    # A re-index with nothing new adds nothing.
+    index(lib, "--ocr")
+    assert _matches(runner) == want
+
+    assert _matches(runner, "invoices", "--mark-seen") == {("invoices", "b0.png", False)}
+    assert _matches(runner, "--unseen") == want - {("invoices", "b0.png", False)}
+    assert ("invoices", "b0.png", True) in _matches(runner)
+
+    # A modified image is checked again and comes back unseen.
+    os.utime(lib / "b0.png", (1e9, 1e9))
+    index(lib, "--ocr")
+    assert ("invoices", "b0.png", False) in _matches(runner, "--unseen")
+
+
+def test_standing_query_endpoints(engine, index, tmp_path):
+    _, client = engine
+    _setup(engine, index, tmp_path)
+
+    listed = {q["name"]: q["unseen"] for q in client.get("/standing-queries").json()["queries"]}
+    assert listed == {"invoices": 1, "like-a0": 1, "shots": 1}
+
+    res = client.get("/standing-queries/matches", params={"name": "like-a0"}).json()["results"]
+    assert [os.path.basename(r["path"]) for r in res] == ["b1.png"]
+    assert res[0]["standing_query"] == "like-a0" and res[0]["seen"] is False
+
+    assert client.post("/standing-queries/matches/seen", params={"name": "like-a0"}).json() == {"marked": 1}
+    unseen = client.get("/standing-queries/matches", params={"unseen": True}).json()["results"]
+    assert {r["standing_query"] for r in unseen} == {"invoices", "shots"}
+    assert client.post("/standing-queries/matches/seen").json() == {"marked": 2}
+    assert client.get("/standing-queries/matches", params={"unseen": True}).json()["results"] == []
+
+    assert client.delete("/standing-queries/shots").status_code == 200
+    assert client.get("/standing-queries/matches", params={"name": "shots"}).status_code == 404
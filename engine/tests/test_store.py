@@ -0,0 +1,92 @@
+"""Compressed store tiers: exact re-rank recall and codes round-trip."""
+import numpy as np
+import pytest
+
+import merlian as core
+
+
+def _embeddings(n=3000, dim=64, clusters=40, seed=0):
+    """Clustered unit vectors, closer to real CLIP neighbourhoods than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim))
+    x = centers[rng.integers(0, clusters, n)] + 0.35 * rng.standard_normal((n, dim))
+    return (x / np.linalg.norm(x, axis=1, keepdims=True)).astype(np.float32)
+
+
+def _queries(embs, m=25, seed=1):
+    rng = np.random.default_rng(seed)
+    q = embs[rng.choice(len(embs), m, replace=False)] + 0.2 * rng.standard_normal((m, embs.shape[1]))
+    return (q / np.linalg.norm(q, axis=1, keepdims=True)).astype(np.float32)
+
+
+def _top(scores, k):
+    return np.argsort(-scores, kind="stable")[:k]
+
+
+@pytest.mark.parametrize("tier", core.STORE_TIERS)
+def test_rerank_recovers_exact_top_k(tier):
+    embs = _embeddings()
+    store = core.EmbeddingStore(tier, embs, core.encode_store(embs, tier) if tier != "float32" else None)
+    k = 20
+    for q in _queries(embs):
+        exact = embs @ q
+        got = store.scores(q)
+        assert set(_top(got, k)) == set(_top(exact, k))
+        top = _top(got, k)
+        np.testing.assert_allclose(got[top], exact[top], rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize("tier", core.STORE_TIERS)
+def test_rows_subset_matches_full_scan(tier):
+    embs = _embeddings()
+    store = core.EmbeddingStore(tier, embs, core.encode_store(embs, tier) if tier != "float32" else None)
+    rows = np.arange(0, len(embs), 7)
+    q = _queries(embs, m=1)[0]
+    got = store.scores(q, rows=rows)
+    assert got.shape == (len(rows),)
+    exact = embs[rows] @ q
+    assert set(_top(got, 10)) == set(_top(exact, 10))
+
+
+def test_compressed_tiers_shrink_resident_bytes():
+    embs = _embeddings()
+    sizes = {
+        t: core.EmbeddingStore(t, embs, core.encode_store(embs, t) if t != "float32" else None).resident_bytes
+        for t in core.STORE_TIERS
+    }
+    assert sizes["float32"] > sizes["float16"] > sizes["int8"] > sizes["pq"]
+
+
+def test_head_shares_scan_stats():
+    embs = _embeddings(n=500)
+    store = core.EmbeddingStore("int8", embs, core.encode_store(embs, "int8"))
+    store.scores(embs[0])
+    store.head(100).scores(embs[0])
+    assert store.stats()["scans"] == 2
+
+
+def test_codes_round_trip_and_stale_fallback(tmp_path):
+    paths = core.DbPaths(
+        root=tmp_path,
+        db=tmp_path / "merlian.sqlite",
+        embeddings=tmp_path / "embeddings.npy",
+        codes=tmp_path / "embeddings.codes.npz",
+        meta=tmp_path / "meta.json",
+        thumbs=tmp_path / "thumbs",
+    )
+    embs = _embeddings(n=600)
+    np.save(paths.embeddings, embs)
+    core.save_store_codes(paths, embs, "pq")
+    meta = {"store": {"tier": "pq"}}
+
+    store = core.load_store(paths, meta)
+    assert store.tier == "pq"
+    q = _queries(embs, m=1)[0]
+    assert set(_top(store.scores(q), 10)) == set(_top(embs @ q, 10))
+
+    # Codes written for a different row count are ignored, not misread.
+    np.save(paths.embeddings, np.vstack([embs, embs[:5]]))
+    assert core.load_store(paths, meta).tier == "float32"
+    # A tier the codes were not built for also falls back.
+    np.save(paths.embeddings, embs)
+    assert core.load_store(paths, {"store": {"tier": "int8"}}).tier == "float32"